@@ -0,0 +1,326 @@
+import os
+import json
+import time
+import html
+import smtplib
+import logging
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from email.message import EmailMessage
+from typing import Any, Callable, Dict, List, Optional, Type
+from agents.notifier import create_embed, send_embeds, validate_webhook_url
+from utils.retry import get_http_session
+
+logger = logging.getLogger(__name__)
+
+# Canales de notificación configurados (si no existe, se usa solo DISCORD_WEBHOOK_URL)
+NOTIFIER_CHANNELS_FILE = os.getenv("NOTIFIER_CHANNELS_FILE", "canales.json")
+# Convocatorias por mensaje de Slack (3 bloques cada una, máximo 50 bloques)
+SLACK_ITEMS_PER_MESSAGE = 15
+
+CHANNEL_TYPES: Dict[str, Type["NotificationChannel"]] = {}
+
+def register_channel(name: str) -> Callable[[Type["NotificationChannel"]], Type["NotificationChannel"]]:
+    """
+    Decorator para registrar un tipo de canal.
+
+    Un canal se usa con "type": "<name>" en canales.json; el resto de
+    claves se pasan al canal como configuración.
+    """
+    def decorator(cls: Type["NotificationChannel"]) -> Type["NotificationChannel"]:
+        CHANNEL_TYPES[name] = cls
+        return cls
+    return decorator
+
+class NotificationChannel(ABC):
+    """
+    Canal de notificación (clase base abstracta).
+
+    Cada canal declara un `format`: el elemento de cada convocatoria se
+    construye una sola vez por formato (format_item) y lo comparten todos
+    los canales de ese formato. send() recibe los elementos ya construidos
+    y devuelve si se entregó cada uno.
+
+    Un canal `digest` recibe todas sus convocatorias pendientes de la
+    ejecución en un solo send(), al vaciar el outbox al final.
+
+    Configuración común:
+        fuentes: solo notificar convocatorias de estas fuentes
+        excluir_fuentes: no notificar convocatorias de estas fuentes
+    """
+
+    format = ""
+    digest = False
+
+    def __init__(self, name: str, config: Dict[str, Any]):
+        self.name = name
+        self.config = config
+        self.fuentes = set(config.get("fuentes") or [])
+        self.excluir_fuentes = set(config.get("excluir_fuentes") or [])
+
+    def accepts(self, convocatoria: Dict[str, Any]) -> bool:
+        fuente = convocatoria.get("fuente", "")
+        if self.fuentes and fuente not in self.fuentes:
+            return False
+        return fuente not in self.excluir_fuentes
+
+    @abstractmethod
+    def format_item(self, convocatoria: Dict[str, Any]) -> Any:
+        """Elemento a enviar para una convocatoria, compartido por los canales del mismo formato."""
+
+    @abstractmethod
+    def send(self, items: List[Any]) -> List[bool]:
+        """Envía los elementos y devuelve si se entregó cada uno."""
+
+def _secret(config: Dict[str, Any], key: str) -> str:
+    """Valor de configuración, directo o leído de la variable de entorno `<key>_env`."""
+    if config.get(f"{key}_env"):
+        return os.getenv(config[f"{key}_env"], "")
+    return config.get(key, "")
+
+@register_channel("discord")
+class DiscordChannel(NotificationChannel):
+    """Webhook de Discord con embeds agrupados (webhook_url o webhook_url_env)."""
+
+    format = "discord"
+
+    def __init__(self, name: str, config: Dict[str, Any]):
+        super().__init__(name, config)
+        self.webhook_url = _secret(config, "webhook_url")
+
+    def format_item(self, convocatoria: Dict[str, Any]) -> Dict[str, Any]:
+        return create_embed(convocatoria)
+
+    def send(self, items: List[Any]) -> List[bool]:
+        if not validate_webhook_url(self.webhook_url):
+            logger.error(f"Webhook de Discord no configurado o inválido para el canal {self.name}")
+            return [False] * len(items)
+        return send_embeds(self.webhook_url, items)
+
+@register_channel("slack")
+class SlackChannel(NotificationChannel):
+    """Webhook entrante compatible con Slack (webhook_url o webhook_url_env)."""
+
+    format = "slack"
+
+    def __init__(self, name: str, config: Dict[str, Any]):
+        super().__init__(name, config)
+        self.webhook_url = _secret(config, "webhook_url")
+
+    def format_item(self, convocatoria: Dict[str, Any]) -> List[Dict[str, Any]]:
+        titulo = convocatoria.get("titulo", "Convocatoria sin título")
+        url = convocatoria.get("url", "")
+        return [
+            {"type": "section", "text": {"type": "mrkdwn", "text": f"*<{url}|{titulo[:200]}>*\n{convocatoria.get('resumen', '')[:2800]}"}},
+            {"type": "context", "elements": [{"type": "mrkdwn", "text": f"Fuente: {convocatoria.get('fuente', '').upper()} • FundBot"}]},
+            {"type": "divider"}
+        ]
+
+    def send(self, items: List[Any]) -> List[bool]:
+        if not self.webhook_url:
+            logger.error(f"Webhook de Slack no configurado para el canal {self.name}")
+            return [False] * len(items)
+
+        delivered = []
+        for start in range(0, len(items), SLACK_ITEMS_PER_MESSAGE):
+            group = items[start:start + SLACK_ITEMS_PER_MESSAGE]
+            payload = {
+                "text": f"{len(group)} nuevas convocatorias",
+                "blocks": [block for item in group for block in item]
+            }
+            try:
+                response = get_http_session().post(self.webhook_url, json=payload, timeout=30)
+                ok = response.status_code == 200
+                if not ok:
+                    logger.error(f"Error Slack {response.status_code}: {response.text[:200]}")
+            except Exception as e:
+                logger.error(f"Error enviando mensaje a Slack: {e}")
+                ok = False
+            delivered.extend([ok] * len(group))
+        return delivered
+
+@register_channel("email")
+class EmailDigestChannel(NotificationChannel):
+    """
+    Resumen por correo con todas las convocatorias pendientes de la ejecución.
+
+    Configuración: to (lista de destinatarios), subject (opcional). El
+    servidor se toma de SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASSWORD y
+    SMTP_FROM.
+    """
+
+    format = "email"
+    # Un solo correo por ejecución, también en modo streaming
+    digest = True
+
+    def format_item(self, convocatoria: Dict[str, Any]) -> Dict[str, str]:
+        titulo = convocatoria.get("titulo", "Convocatoria sin título")
+        url = convocatoria.get("url", "")
+        resumen = convocatoria.get("resumen", "")
+        fuente = convocatoria.get("fuente", "")
+        return {
+            "text": f"- {titulo} ({fuente})\n  {url}\n  {resumen}\n",
+            "html": (
+                f'<li><a href="{html.escape(url)}"><b>{html.escape(titulo)}</b></a> '
+                f"<small>({html.escape(fuente)})</small><br>{html.escape(resumen)}</li>"
+            )
+        }
+
+    def send(self, items: List[Any]) -> List[bool]:
+        host = os.getenv("SMTP_HOST")
+        to = self.config.get("to") or []
+        if not host or not to:
+            logger.error(f"SMTP_HOST o destinatarios no configurados para el canal {self.name}")
+            return [False] * len(items)
+
+        message = EmailMessage()
+        message["Subject"] = self.config.get("subject", f"FundBot: {len(items)} nuevas convocatorias")
+        message["From"] = os.getenv("SMTP_FROM", os.getenv("SMTP_USER", "fundbot@localhost"))
+        message["To"] = ", ".join(to)
+        message.set_content("\n".join(item["text"] for item in items))
+        message.add_alternative(f"<ul>{''.join(item['html'] for item in items)}</ul>", subtype="html")
+
+        try:
+            with smtplib.SMTP(host, int(os.getenv("SMTP_PORT", "587")), timeout=30) as smtp:
+                if os.getenv("SMTP_STARTTLS", "true").lower() in ("1", "true", "yes"):
+                    smtp.starttls()
+                if os.getenv("SMTP_USER"):
+                    smtp.login(os.getenv("SMTP_USER"), os.getenv("SMTP_PASSWORD", ""))
+                smtp.send_message(message)
+            return [True] * len(items)
+        except Exception as e:
+            logger.error(f"Error enviando resumen por correo ({self.name}): {e}")
+            return [False] * len(items)
+
+@register_channel("file")
+class FileChannel(NotificationChannel):
+    """Añade cada convocatoria como una línea JSON a un fichero (path)."""
+
+    format = "jsonl"
+    _lock = threading.Lock()
+
+    def format_item(self, convocatoria: Dict[str, Any]) -> str:
+        return json.dumps(convocatoria, ensure_ascii=False)
+
+    def send(self, items: List[Any]) -> List[bool]:
+        path = self.config.get("path", "data/notificaciones.jsonl")
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with self._lock, open(path, "a", encoding="utf-8") as f:
+                f.write("".join(f"{item}\n" for item in items))
+            return [True] * len(items)
+        except OSError as e:
+            logger.error(f"Error escribiendo notificaciones en {path}: {e}")
+            return [False] * len(items)
+
+def load_channels_config() -> Dict[str, Dict[str, Any]]:
+    """
+    Carga la configuración de canales desde canales.json.
+
+    Sin fichero, se usa un único canal "discord" con DISCORD_WEBHOOK_URL.
+    """
+    if not os.path.exists(NOTIFIER_CHANNELS_FILE):
+        return {"discord": {"type": "discord", "webhook_url_env": "DISCORD_WEBHOOK_URL"}}
+    try:
+        with open(NOTIFIER_CHANNELS_FILE, "r", encoding="utf-8") as f:
+            config = json.load(f)
+            logger.info(f"Configuración cargada: {len(config)} canales de notificación")
+            return config
+    except (OSError, json.JSONDecodeError) as e:
+        logger.error(f"{NOTIFIER_CHANNELS_FILE} no se pudo leer: {e}")
+        return {}
+
+def build_channels(config: Dict[str, Dict[str, Any]]) -> Dict[str, NotificationChannel]:
+    """Instancia los canales de una configuración, ignorando los de tipo desconocido."""
+    channels = {}
+    for name, channel_config in config.items():
+        channel_type = channel_config.get("type", "discord")
+        cls = CHANNEL_TYPES.get(channel_type)
+        if not cls:
+            logger.warning(f"Tipo de canal desconocido '{channel_type}' para {name}")
+            continue
+        channels[name] = cls(name, channel_config)
+    return channels
+
+_channels: Optional[Dict[str, NotificationChannel]] = None
+_channels_lock = threading.Lock()
+
+def get_channels() -> Dict[str, NotificationChannel]:
+    """Devuelve los canales configurados (se cargan una vez por proceso)."""
+    global _channels
+    with _channels_lock:
+        if _channels is None:
+            _channels = build_channels(load_channels_config())
+        return _channels
+
+def route_convocatoria(convocatoria: Dict[str, Any], channels: Optional[Dict[str, NotificationChannel]] = None) -> List[str]:
+    """Nombres de los canales que deben recibir una convocatoria según sus filtros."""
+    channels = get_channels() if channels is None else channels
+    return [name for name, channel in channels.items() if channel.accepts(convocatoria)]
+
+def dispatch(
+    assignments: Dict[str, List[Dict[str, Any]]],
+    channels: Optional[Dict[str, NotificationChannel]] = None,
+    on_channel_done: Optional[Callable[[str, List[bool]], None]] = None,
+    cache: Optional[Dict[Any, Any]] = None
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Envía a cada canal sus convocatorias, todos los canales a la vez.
+
+    Los elementos se construyen una vez por formato y se comparten entre
+    canales. Un canal que falla o lanza una excepción no afecta al resto, y
+    `on_channel_done` se llama en cuanto termina cada canal, sin esperar a
+    los más lentos.
+
+    Args:
+        assignments: canal -> convocatorias a enviarle
+        on_channel_done: callback (canal, estado por convocatoria)
+        cache: elementos ya construidos, compartido entre llamadas de una misma ejecución
+
+    Returns:
+        canal -> {"delivered": [...], "latency": segundos, "error": str o None}
+    """
+    channels = get_channels() if channels is None else channels
+    assignments = {name: convs for name, convs in assignments.items() if convs}
+    if not assignments:
+        return {}
+
+    formatted: Dict[Any, Any] = {} if cache is None else cache
+    items: Dict[str, List[Any]] = {}
+    for name, convocatorias in assignments.items():
+        channel = channels[name]
+        items[name] = []
+        for convocatoria in convocatorias:
+            key = (channel.format, convocatoria.get("url"))
+            if key not in formatted:
+                formatted[key] = channel.format_item(convocatoria)
+            items[name].append(formatted[key])
+
+    def deliver(name: str) -> Dict[str, Any]:
+        start = time.perf_counter()
+        error = None
+        try:
+            delivered = list(channels[name].send(items[name]))
+        except Exception as e:
+            logger.error(f"Error en el canal {name}: {e}")
+            delivered, error = [False] * len(items[name]), str(e)
+        return {"delivered": delivered, "latency": time.perf_counter() - start, "error": error}
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=len(items), thread_name_prefix="channel") as executor:
+        futures = {executor.submit(deliver, name): name for name in items}
+        for future in as_completed(futures):
+            name = futures[future]
+            results[name] = future.result()
+            if on_channel_done:
+                on_channel_done(name, results[name]["delivered"])
+
+    for name, result in results.items():
+        logger.info(
+            f"📣 {name}: {sum(result['delivered'])}/{len(result['delivered'])} entregadas en {result['latency']:.2f}s"
+            + (f" (error: {result['error']})" if result["error"] else "")
+        )
+    return results
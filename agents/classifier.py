@@ -1,16 +1,25 @@
 import os
+import re
+import json
 import logging
-from typing import List, Dict, Any
+from collections import Counter
+from typing import List, Dict, Any, Optional
 from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.schema import HumanMessage
-from utils.retry import retry_with_backoff
+from agents.prefilter import PREFILTER_ENABLED, get_prefilter
+from agents.rules import get_rule_engine
+from utils.llm_cache import cached_llm_invoke, invalidate_cached_response
+from utils.rate_limit import get_gemini_rate_limiter
 
 logger = logging.getLogger(__name__)
 
+# Número de convocatorias evaluadas por llamada al LLM (1 = una por llamada)
+CLASSIFIER_BATCH_SIZE = int(os.getenv("CLASSIFIER_BATCH_SIZE", "10"))
+
 llm = ChatGoogleGenerativeAI(
     model="gemini-2.0-flash", 
     temperature=0, 
-    google_api_key=os.getenv("GOOGLE_API_KEY")
+    google_api_key=os.getenv("GOOGLE_API_KEY"),
+    max_retries=1  # Un solo intento: los reintentos los hace utils.llm_cache
 )
 
 COMPANY_PROFILE = """
@@ -47,9 +56,8 @@ ELEGIBILIDAD REQUERIDA:
 - NO convocatorias exclusivas de España o UE sin participación internacional
 """
 
-@retry_with_backoff(max_retries=2, base_delay=0.5, exceptions=(Exception,))
-def classify_single_convocatoria(convocatoria: Dict[str, Any]) -> bool:
-    """Clasifica una sola convocatoria usando el LLM."""
+def classify_single_convocatoria(convocatoria: Dict[str, Any]) -> Optional[bool]:
+    """Clasifica una sola convocatoria usando el LLM; None si no hubo veredicto."""
     try:
         prompt = f"""
 Analiza esta convocatoria y responde ÚNICAMENTE "SI" o "NO":
@@ -64,13 +72,13 @@ Convocatoria:
 ¿Esta convocatoria es relevante para nuestra empresa? Responde solo SI o NO.
 """
         
-        response = llm.invoke([HumanMessage(content=prompt)])
-        resultado = response.content.strip().upper()
+        resultado = cached_llm_invoke(llm, prompt, rate_limiter=get_gemini_rate_limiter()).strip().upper()
         
         # Validar respuesta
         if resultado not in ["SI", "NO"]:
-            logger.warning(f"Respuesta inesperada del LLM: '{resultado}'. Asumiendo NO.")
-            return False
+            logger.warning(f"Respuesta inesperada del LLM: '{resultado}'. Sin veredicto.")
+            invalidate_cached_response(llm, prompt)
+            return None
             
         is_relevant = resultado == "SI"
         
@@ -83,30 +91,180 @@ Convocatoria:
         
     except Exception as e:
         logger.error(f"Error clasificando convocatoria {convocatoria.get('titulo', 'Sin título')}: {e}")
-        return False
+        return None
+
+def build_batch_prompt(convocatorias: List[Dict[str, Any]]) -> str:
+    """Construye un prompt que evalúa varias convocatorias a la vez."""
+    items = []
+    for i, convocatoria in enumerate(convocatorias, 1):
+        items.append(
+            f"[{i}]\n"
+            f"- Título: {convocatoria.get('titulo', 'Sin título')}\n"
+            f"- Resumen: {convocatoria.get('resumen', 'Sin resumen')[:200]}\n"
+            f"- URL: {convocatoria.get('url', '')}"
+        )
+    listado = "\n\n".join(items)
+    
+    return f"""
+Analiza cada una de las siguientes convocatorias y decide si es relevante para esta empresa:
+
+{COMPANY_PROFILE}
+
+Convocatorias:
+
+{listado}
+
+Responde ÚNICAMENTE con un objeto JSON que asigne a cada número de convocatoria "SI" o "NO",
+por ejemplo: {{"1": "SI", "2": "NO"}}. Incluye las {len(convocatorias)} convocatorias.
+"""
 
-def classify_convocatorias(convocatorias: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+def parse_batch_verdicts(text: str, expected: int) -> Dict[int, bool]:
+    """
+    Interpreta la respuesta de un prompt por lotes.
+    
+    Acepta un objeto JSON {"1": "SI", ...} o, si el JSON no es válido,
+    líneas con el formato "1: SI". Se ignoran números fuera de rango y
+    veredictos distintos de SI/NO.
+    
+    Returns:
+        Diccionario índice (desde 1) -> relevante
+    """
+    clean = text.strip()
+    if clean.startswith("```"):
+        clean = re.sub(r"^```(?:json)?", "", clean).rstrip("`").strip()
+    
+    pairs = []
+    try:
+        data = json.loads(clean)
+        if isinstance(data, dict):
+            pairs = list(data.items())
+    except json.JSONDecodeError:
+        pairs = re.findall(r"(\d+)\W{0,3}\s*[:=\-]\s*\W{0,1}(S[IÍ]|NO)\b", clean, flags=re.IGNORECASE)
+    
+    verdicts = {}
+    for key, value in pairs:
+        try:
+            index = int(str(key).strip("[] "))
+        except ValueError:
+            continue
+        verdict = str(value).strip().upper().replace("Í", "I")
+        if 1 <= index <= expected and verdict in ("SI", "NO"):
+            verdicts[index] = verdict == "SI"
+    return verdicts
+
+def classify_batch(convocatorias: List[Dict[str, Any]]) -> List[Optional[bool]]:
+    """
+    Clasifica un lote de convocatorias con una sola llamada al LLM.
+    
+    Returns:
+        Lista alineada con la entrada: True/False, o None si no hubo veredicto
+    """
+    try:
+        prompt = build_batch_prompt(convocatorias)
+        verdicts = parse_batch_verdicts(
+            cached_llm_invoke(llm, prompt, rate_limiter=get_gemini_rate_limiter()), len(convocatorias)
+        )
+        
+        if len(verdicts) < len(convocatorias):
+            logger.warning(f"Veredictos incompletos del LLM: {len(verdicts)}/{len(convocatorias)}")
+            if not verdicts:
+                invalidate_cached_response(llm, prompt)
+        
+        return [verdicts.get(i) for i in range(1, len(convocatorias) + 1)]
+        
+    except Exception as e:
+        logger.error(f"Error clasificando lote de {len(convocatorias)} convocatorias: {e}")
+        return [None] * len(convocatorias)
+
+def classify_convocatorias(convocatorias: List[Dict[str, Any]], batch_size: Optional[int] = None) -> List[Dict[str, Any]]:
     """
     Clasifica una lista de convocatorias para determinar relevancia.
     
+    Cada convocatoria se decide en la primera etapa que puede hacerlo:
+    1. Reglas de palabras clave (reglas_clasificacion.json), que solo
+       descartan; las que coinciden con una regla positiva van directas al LLM
+    2. Prefiltro local (TF-IDF frente a COMPANY_PROFILE), que solo descarta
+       las claramente ajenas al perfil
+    3. LLM, en lotes, para el resto, incluida la elegibilidad; las que quedan
+       sin veredicto en la respuesta del lote se clasifican individualmente
+    
+    La etapa que decidió queda en "clasificado_por" ("regla:<categoría>.<nombre>",
+    "prefiltro" o "llm") y el veredicto en "relevante": True, False o None si
+    el LLM no dio veredicto (error o respuesta inválida). Las de veredicto
+    False pueden guardarse como descartadas; las de None deben volver a
+    clasificarse en otra ejecución.
+    
     Args:
         convocatorias: Lista de convocatorias a clasificar
+        batch_size: Convocatorias por llamada (por defecto, CLASSIFIER_BATCH_SIZE)
     
     Returns:
-        Lista de convocatorias relevantes
+        Lista de convocatorias relevantes, en el orden de entrada
     """
     if not convocatorias:
         logger.info("No hay convocatorias para clasificar")
         return []
     
-    logger.info(f"Clasificando {len(convocatorias)} convocatorias...")
+    batch_size = max(1, batch_size or CLASSIFIER_BATCH_SIZE)
     
-    aprobadas = []
-    for i, convocatoria in enumerate(convocatorias, 1):
-        logger.debug(f"Clasificando {i}/{len(convocatorias)}: {convocatoria.get('titulo', 'Sin título')[:50]}...")
+    engine = get_rule_engine()
+    decisiones: List[Optional[bool]] = []
+    # Índices con regla positiva: el LLM comprueba su elegibilidad, sin prefiltro
+    afines = set()
+    reglas = Counter()
+    for i, convocatoria in enumerate(convocatorias):
+        decision, regla = engine.decide(convocatoria)
+        if regla:
+            reglas[regla] += 1
+            if decision is False:
+                convocatoria["clasificado_por"] = f"regla:{regla}"
+            else:
+                afines.add(i)
+            logger.debug(f"Regla {regla} ({'NO' if decision is False else 'al LLM'}): {convocatoria.get('titulo', 'Sin título')[:50]}...")
+        decisiones.append(decision)
+    if reglas:
+        logger.info(
+            f"Reglas: {decisiones.count(False)} descartadas, {len(afines)} afines al LLM sin prefiltro "
+            f"({', '.join(f'{regla}: {n}' for regla, n in reglas.most_common())})"
+        )
+    
+    pendientes = [i for i, decision in enumerate(decisiones) if decision is None and i not in afines]
+    if PREFILTER_ENABLED and pendientes:
+        prefiltradas = get_prefilter().split([convocatorias[i] for i in pendientes])
+        for i, decision in zip(pendientes, prefiltradas):
+            if decision is not None:
+                decisiones[i] = decision
+                convocatorias[i]["clasificado_por"] = "prefiltro"
+        logger.info(f"Prefiltro: {prefiltradas.count(False)} descartadas, {prefiltradas.count(None)} para el LLM")
+    
+    dudosas = [c for c, decision in zip(convocatorias, decisiones) if decision is None]
+    logger.info(f"Clasificando {len(dudosas)} convocatorias (lotes de {batch_size})...")
+    
+    veredictos_llm: Dict[int, Optional[bool]] = {}
+    fallbacks = 0
+    for start in range(0, len(dudosas), batch_size):
+        lote = dudosas[start:start + batch_size]
+        logger.debug(f"Clasificando {start + 1}-{start + len(lote)}/{len(dudosas)}")
         
-        if classify_single_convocatoria(convocatoria):
-            aprobadas.append(convocatoria)
+        if len(lote) == 1:
+            veredictos = [classify_single_convocatoria(lote[0])]
+        else:
+            veredictos = classify_batch(lote)
+        
+        for convocatoria, relevante in zip(lote, veredictos):
+            convocatoria["clasificado_por"] = "llm"
+            # Un lote de una ya se clasificó individualmente: no se repite la llamada
+            if relevante is None and len(lote) > 1:
+                fallbacks += 1
+                relevante = classify_single_convocatoria(convocatoria)
+            veredictos_llm[id(convocatoria)] = relevante
+    
+    for convocatoria, decision in zip(convocatorias, decisiones):
+        convocatoria["relevante"] = veredictos_llm.get(id(convocatoria)) if decision is None else decision
+    aprobadas = [c for c in convocatorias if c["relevante"]]
+    
+    if fallbacks:
+        logger.info(f"{fallbacks} convocatorias clasificadas individualmente por falta de veredicto en su lote")
     
     logger.info(f"Clasificación completa: {len(aprobadas)}/{len(convocatorias)} convocatorias relevantes")
     return aprobadas
\ No newline at end of file
@@ -1,29 +1,89 @@
+import json
+import atexit
 import sqlite3
 import logging
+import threading
 from contextlib import contextmanager
-from typing import List, Optional
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
 from pathlib import Path
+from utils.urls import canonicalize_url
+from utils.simhash import SIMHASH_BANDS, hamming_distance, simhash, simhash_bands, to_signed, from_signed
 
 logger = logging.getLogger(__name__)
 
 DB_FILE = "fundbot.db"
 
+# Veredicto guardado con cada URL: solo las relevantes se notifican, pero
+# todas cuentan como vistas para no volver a clasificarlas
+ESTADO_RELEVANTE = "relevante"
+ESTADO_DESCARTADA = "descartada"
+ESTADO_DUPLICADA = "duplicada"
+
+# Ajustes aplicados a la conexión persistente
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",      # Lectores no bloquean al escritor
+    "PRAGMA synchronous=NORMAL",    # Seguro con WAL y mucho más rápido que FULL
+    "PRAGMA cache_size=-20000",     # ~20 MB de caché de páginas
+    "PRAGMA temp_store=MEMORY",     # Tablas temporales (filtrado de URLs) en memoria
+)
+
+_connection: Optional[sqlite3.Connection] = None
+_connection_file: Optional[str] = None
+_connection_lock = threading.RLock()
+
+def _open_connection(db_file: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_file, timeout=30.0, check_same_thread=False)
+    conn.row_factory = sqlite3.Row  # Para acceso por nombre de columna
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    logger.debug(f"Conexión persistente abierta: {db_file}")
+    return conn
+
+def close_db() -> None:
+    """Cierra la conexión persistente, volcando el WAL al fichero principal."""
+    global _connection, _connection_file
+    with _connection_lock:
+        if _connection is None:
+            return
+        try:
+            _connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            _connection.close()
+        except sqlite3.Error as e:
+            logger.error(f"Error cerrando base de datos: {e}")
+        finally:
+            _connection = None
+            _connection_file = None
+
+atexit.register(close_db)
+
 @contextmanager
 def get_db_connection():
-    """Context manager para conexiones de base de datos."""
-    conn = None
-    try:
-        conn = sqlite3.connect(DB_FILE, timeout=30.0)
-        conn.row_factory = sqlite3.Row  # Para acceso por nombre de columna
-        yield conn
-    except sqlite3.Error as e:
-        if conn:
+    """
+    Context manager para la conexión persistente a la base de datos.
+    
+    La conexión se abre una vez (en modo WAL) y se comparte entre llamadas e
+    hilos; el acceso se serializa con un lock. Si DB_FILE cambia, se reabre.
+    Lo que no se confirme con commit() se descarta al salir, igual que al
+    cerrar una conexión.
+    """
+    global _connection, _connection_file
+    with _connection_lock:
+        if _connection is not None and _connection_file != DB_FILE:
+            close_db()
+        if _connection is None:
+            _connection = _open_connection(DB_FILE)
+            _connection_file = DB_FILE
+        
+        conn = _connection
+        try:
+            yield conn
+        except sqlite3.Error as e:
             conn.rollback()
-        logger.error(f"Error de base de datos: {e}")
-        raise
-    finally:
-        if conn:
-            conn.close()
+            logger.error(f"Error de base de datos: {e}")
+            raise
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
 
 def init_db() -> None:
     """Crea la tabla de la base de datos si no existe."""
@@ -41,22 +101,108 @@ def init_db() -> None:
         """)
         conn.commit()
         
+        # Columnas de deduplicación añadidas después: URL canónica y huella SimHash
+        columns = [row["name"] for row in cursor.execute("PRAGMA table_info(convocatorias)").fetchall()]
+        if "url_canonica" not in columns:
+            cursor.execute("ALTER TABLE convocatorias ADD COLUMN url_canonica TEXT")
+            urls = [row["url"] for row in cursor.execute("SELECT url FROM convocatorias").fetchall()]
+            cursor.executemany(
+                "UPDATE convocatorias SET url_canonica = ? WHERE url = ?",
+                ((canonicalize_url(url), url) for url in urls)
+            )
+            logger.info(f"Migración: URL canónica calculada para {len(urls)} convocatorias")
+        if "simhash" not in columns:
+            cursor.execute("ALTER TABLE convocatorias ADD COLUMN simhash INTEGER")
+        # Veredicto de cada URL; las filas anteriores son todas convocatorias notificadas
+        if "estado" not in columns:
+            cursor.execute(f"ALTER TABLE convocatorias ADD COLUMN estado TEXT DEFAULT '{ESTADO_RELEVANTE}'")
+        conn.commit()
+        
         # Agregar índices para mejorar performance
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_fuente ON convocatorias(fuente)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_fecha ON convocatorias(fecha_agregado)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_url_canonica ON convocatorias(url_canonica)")
+        conn.commit()
+        
+        # Bandas de las huellas SimHash: la búsqueda de casi duplicados solo
+        # compara con las convocatorias que comparten alguna banda
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS simhash_bandas (
+            banda INTEGER,
+            valor INTEGER,
+            url TEXT,
+            PRIMARY KEY (banda, valor, url)
+        ) WITHOUT ROWID
+        """)
+        conn.commit()
+        
+        # Plantillas de extracción aprendidas por portal
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS plantillas_portal (
+            portal TEXT PRIMARY KEY,
+            huella TEXT,
+            reglas TEXT,
+            actualizado TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """)
+        conn.commit()
+        
+        # Notificaciones pendientes de envío (outbox), una por URL y canal,
+        # escritas en la misma transacción que la URL para no perder ni duplicar avisos
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            url TEXT,
+            canal TEXT DEFAULT 'discord',
+            payload TEXT,
+            estado TEXT DEFAULT 'pending',
+            intentos INTEGER DEFAULT 0,
+            ultimo_error TEXT,
+            creado TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            actualizado TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (url, canal)
+        )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_outbox_estado ON outbox(estado, canal, id)")
+        conn.commit()
+        
+        # Último lastmod procesado de cada feed o sitemap
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS estado_feeds (
+            portal TEXT PRIMARY KEY,
+            ultimo_lastmod TEXT,
+            actualizado TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """)
+        conn.commit()
+        
+        # Estado de cada portal entre ejecuciones, para el planificador
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS estado_portales (
+            portal TEXT PRIMARY KEY,
+            ultima_ejecucion TEXT,
+            proxima_ejecucion TEXT,
+            huella TEXT,
+            convocatorias INTEGER DEFAULT 0,
+            errores_seguidos INTEGER DEFAULT 0,
+            latencia_media REAL,
+            intervalo_horas REAL,
+            actualizado TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """)
         conn.commit()
         
         logger.info("Base de datos inicializada correctamente")
 
 def url_exists(url: str) -> bool:
-    """Comprueba si una URL ya existe en la base de datos."""
+    """Comprueba si una URL (o una variante con la misma forma canónica) ya existe en la base de datos."""
     if not url:
         return False
         
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("SELECT 1 FROM convocatorias WHERE url = ?", (url,))
+            cursor.execute("SELECT 1 FROM convocatorias WHERE url_canonica = ?", (canonicalize_url(url),))
             exists = cursor.fetchone() is not None
             
             if exists:
@@ -67,6 +213,290 @@ def url_exists(url: str) -> bool:
         logger.error(f"Error verificando URL {url}: {e}")
         return False
 
+def _select_new_urls(conn: sqlite3.Connection, candidates: Set[str]) -> Set[str]:
+    """Anti-join de las URLs candidatas contra la tabla por URL canónica, vía tabla temporal."""
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS urls_candidatas (url TEXT PRIMARY KEY, canonica TEXT)")
+    conn.execute("DELETE FROM urls_candidatas")
+    conn.executemany(
+        "INSERT OR IGNORE INTO urls_candidatas (url, canonica) VALUES (?, ?)",
+        ((url, canonicalize_url(url)) for url in candidates)
+    )
+    cursor = conn.execute("""
+        SELECT c.url
+        FROM urls_candidatas c
+        WHERE NOT EXISTS (SELECT 1 FROM convocatorias v WHERE v.url_canonica = c.canonica)
+    """)
+    nuevas = {row["url"] for row in cursor.fetchall()}
+    conn.execute("DELETE FROM urls_candidatas")
+    return nuevas
+
+def filter_new_urls(urls: Iterable[str]) -> Set[str]:
+    """
+    Devuelve las URLs que todavía no están en la base de datos.
+    
+    Una URL se considera conocida si lo está su forma canónica (sin
+    parámetros de seguimiento, "www." ni barra final). Resuelve todo el conjunto con una sola conexión y un JOIN contra una
+    tabla temporal, en lugar de una consulta por URL.
+    """
+    candidates = {url for url in urls if url}
+    if not candidates:
+        return set()
+    
+    try:
+        with get_db_connection() as conn:
+            nuevas = _select_new_urls(conn, candidates)
+            logger.debug(f"{len(nuevas)} URLs nuevas de {len(candidates)} consultadas")
+            return nuevas
+            
+    except Exception as e:
+        # Mismo criterio que url_exists: ante un error se consideran nuevas
+        logger.error(f"Error filtrando URLs nuevas: {e}")
+        return candidates
+
+def _unique_by_canonical_url(convocatorias: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Primera convocatoria de cada URL canónica, indexada por su URL."""
+    rows: Dict[str, Dict[str, Any]] = {}
+    canonicas = set()
+    for conv in convocatorias:
+        url = conv.get("url")
+        if not url:
+            continue
+        canonica = canonicalize_url(url)
+        if canonica not in canonicas:
+            canonicas.add(canonica)
+            rows[url] = conv
+    return rows
+
+def convocatoria_simhash(convocatoria: Dict[str, Any]) -> Optional[int]:
+    """Huella de título y resumen; se respeta la calculada al deduplicar, previa al resumen del LLM."""
+    if "simhash" in convocatoria:
+        return convocatoria["simhash"]
+    return simhash(f"{convocatoria.get('titulo', '')} {convocatoria.get('resumen', '')}")
+
+def _insert_convocatorias(conn: sqlite3.Connection, convocatorias: List[Dict[str, Any]], estado: str = ESTADO_RELEVANTE) -> None:
+    """Inserta convocatorias con su URL canónica y su veredicto, y registra las bandas de su huella."""
+    rows = []
+    bands = []
+    for conv in convocatorias:
+        fingerprint = convocatoria_simhash(conv)
+        signed = to_signed(fingerprint) if fingerprint is not None else None
+        rows.append((conv["url"], conv.get("titulo", ""), conv.get("fuente", ""), canonicalize_url(conv["url"]), signed, estado))
+        if fingerprint is not None:
+            bands.extend((band, value, conv["url"]) for band, value in simhash_bands(fingerprint))
+    conn.executemany(
+        "INSERT OR IGNORE INTO convocatorias (url, titulo, fuente, url_canonica, simhash, estado) VALUES (?, ?, ?, ?, ?, ?)",
+        rows
+    )
+    conn.executemany("INSERT OR IGNORE INTO simhash_bandas (banda, valor, url) VALUES (?, ?, ?)", bands)
+
+def find_near_duplicates(fingerprints: Dict[str, int], max_distance: int) -> Dict[str, str]:
+    """
+    Busca convocatorias guardadas con una huella SimHash cercana.
+    
+    Cada huella se compara solo con las que comparten alguna de sus
+    bandas (índice simhash_bandas), así que el coste no crece con el
+    histórico completo. Con `max_distance` menor que SIMHASH_BANDS se
+    encuentran todas las huellas a esa distancia o menos.
+    
+    Args:
+        fingerprints: Huella de cada URL candidata
+        max_distance: Distancia de Hamming máxima para considerar casi duplicado
+    
+    Returns:
+        URL candidata → URL ya guardada más parecida, solo para las que tienen casi duplicado
+    """
+    if not fingerprints:
+        return {}
+    if max_distance >= SIMHASH_BANDS:
+        logger.warning(f"Distancia {max_distance} ≥ {SIMHASH_BANDS} bandas: algunos casi duplicados pueden no encontrarse")
+    
+    try:
+        with get_db_connection() as conn:
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS bandas_candidatas (url TEXT, banda INTEGER, valor INTEGER)")
+            conn.execute("DELETE FROM bandas_candidatas")
+            conn.executemany(
+                "INSERT INTO bandas_candidatas (url, banda, valor) VALUES (?, ?, ?)",
+                ((url, band, value) for url, fingerprint in fingerprints.items() for band, value in simhash_bands(fingerprint))
+            )
+            cursor = conn.execute("""
+                SELECT DISTINCT c.url AS candidata, v.url AS existente, v.simhash
+                FROM bandas_candidatas c
+                JOIN simhash_bandas b ON b.banda = c.banda AND b.valor = c.valor
+                JOIN convocatorias v ON v.url = b.url
+            """)
+            matches = cursor.fetchall()
+            conn.execute("DELETE FROM bandas_candidatas")
+            conn.commit()
+    except Exception as e:
+        # Ante un error se consideran distintas: como mucho se notifica un duplicado
+        logger.error(f"Error buscando casi duplicados: {e}")
+        return {}
+    
+    best: Dict[str, Any] = {}
+    for row in matches:
+        distance = hamming_distance(fingerprints[row["candidata"]], from_signed(row["simhash"]))
+        if distance <= max_distance and (row["candidata"] not in best or distance < best[row["candidata"]][0]):
+            best[row["candidata"]] = (distance, row["existente"])
+    return {url: existente for url, (_, existente) in best.items()}
+
+def add_urls_bulk(convocatorias: Iterable[Dict[str, Any]], estado: str = ESTADO_RELEVANTE) -> List[str]:
+    """
+    Añade muchas convocatorias en una única transacción.
+    
+    Las descartadas por el clasificador o por casi duplicadas se guardan con
+    su estado: así no se vuelven a clasificar, cuentan para detener la
+    paginación y su huella sirve para detectar casi duplicados.
+    
+    Args:
+        convocatorias: Diccionarios con `url` y, opcionalmente, `titulo` y `fuente`
+        estado: Veredicto con el que se guardan (ESTADO_RELEVANTE, ESTADO_DESCARTADA o ESTADO_DUPLICADA)
+    
+    Returns:
+        URLs que eran nuevas y se insertaron, en el orden de entrada
+    """
+    rows = _unique_by_canonical_url(convocatorias)
+    
+    if not rows:
+        return []
+    
+    try:
+        with get_db_connection() as conn:
+            # Bloqueo de escritura desde el principio: nadie puede insertar
+            # entre el cálculo de nuevas y el INSERT
+            conn.execute("BEGIN IMMEDIATE")
+            nuevas = _select_new_urls(conn, set(rows))
+            insertadas = [url for url in rows if url in nuevas]
+            _insert_convocatorias(conn, [rows[url] for url in insertadas], estado)
+            conn.commit()
+            
+            logger.info(f"Inserción en bloque: {len(insertadas)} nuevas de {len(rows)} URLs ({estado})")
+            return insertadas
+            
+    except Exception as e:
+        logger.error(f"Error en inserción en bloque de {len(rows)} URLs: {e}")
+        return []
+
+def enqueue_notifications(
+    convocatorias: Iterable[Dict[str, Any]],
+    route: Optional[Callable[[Dict[str, Any]], Iterable[str]]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Guarda las convocatorias nuevas y sus notificaciones pendientes en una
+    sola transacción.
+
+    Tras el commit, cada URL queda registrada junto con una fila del outbox
+    por canal: un fallo posterior del envío no la pierde (se reintenta desde
+    el outbox) y un crash antes del commit no deja la URL marcada como vista.
+
+    Args:
+        convocatorias: Convocatorias resumidas
+        route: Canales que deben recibir cada convocatoria (por defecto, "discord")
+
+    Returns:
+        Filas del outbox creadas: {"id": ..., "canal": ..., "convocatoria": {...}}, en el orden de entrada
+    """
+    route = route or (lambda convocatoria: ["discord"])
+    rows = _unique_by_canonical_url(convocatorias)
+    
+    if not rows:
+        return []
+    
+    try:
+        with get_db_connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            nuevas = _select_new_urls(conn, set(rows))
+            insertadas = [url for url in rows if url in nuevas]
+            _insert_convocatorias(conn, [rows[url] for url in insertadas])
+            encoladas = []
+            for url in insertadas:
+                # La huella es interna: no forma parte de la notificación
+                notificacion = {k: v for k, v in rows[url].items() if k != "simhash"}
+                payload = json.dumps(notificacion, ensure_ascii=False)
+                for canal in route(rows[url]):
+                    cursor = conn.execute(
+                        "INSERT INTO outbox (url, canal, payload) VALUES (?, ?, ?)",
+                        (url, canal, payload)
+                    )
+                    encoladas.append({"id": cursor.lastrowid, "canal": canal, "convocatoria": notificacion})
+            conn.commit()
+            
+            logger.info(f"Outbox: {len(encoladas)} notificaciones encoladas para {len(insertadas)} URLs nuevas de {len(rows)}")
+            return encoladas
+            
+    except Exception as e:
+        logger.error(f"Error encolando {len(rows)} notificaciones: {e}")
+        return []
+
+def get_pending_notifications(limit: Optional[int] = 100, after_id: int = 0, canal: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Devuelve notificaciones pendientes del outbox (de un canal o de todos, todas si limit es None), de la más antigua a la más reciente."""
+    query = "SELECT id, canal, payload FROM outbox WHERE estado = 'pending' AND id > ?"
+    params: List[Any] = [after_id]
+    if canal is not None:
+        query += " AND canal = ?"
+        params.append(canal)
+    query += " ORDER BY id LIMIT ?"
+    # LIMIT -1: sin límite en SQLite
+    params.append(-1 if limit is None else limit)
+    
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.execute(query, params)
+            return [
+                {"id": row["id"], "canal": row["canal"], "convocatoria": json.loads(row["payload"])}
+                for row in cursor.fetchall()
+            ]
+    except Exception as e:
+        logger.error(f"Error leyendo el outbox: {e}")
+        return []
+
+def mark_notifications(sent_ids: Iterable[int], failed_ids: Iterable[int], max_attempts: int, error: str = "") -> None:
+    """
+    Registra el resultado de un envío del outbox.
+
+    Las enviadas pasan a 'sent'; las fallidas suman un intento y siguen
+    'pending' hasta agotar `max_attempts`, momento en que pasan a 'failed'.
+    """
+    sent_ids = list(sent_ids)
+    failed_ids = list(failed_ids)
+    if not sent_ids and not failed_ids:
+        return
+    
+    try:
+        with get_db_connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "UPDATE outbox SET estado = 'sent', intentos = intentos + 1, actualizado = CURRENT_TIMESTAMP WHERE id = ?",
+                ((i,) for i in sent_ids)
+            )
+            conn.executemany(
+                """
+                UPDATE outbox
+                SET intentos = intentos + 1,
+                    estado = CASE WHEN intentos + 1 >= ? THEN 'failed' ELSE 'pending' END,
+                    ultimo_error = ?, actualizado = CURRENT_TIMESTAMP
+                WHERE id = ?
+                """,
+                ((max_attempts, error, i) for i in failed_ids)
+            )
+            conn.commit()
+    except Exception as e:
+        logger.error(f"Error actualizando el outbox: {e}")
+
+def get_outbox_stats(canal: Optional[str] = None) -> Dict[str, int]:
+    """Número de notificaciones del outbox por estado (de un canal o de todos)."""
+    try:
+        with get_db_connection() as conn:
+            if canal is None:
+                rows = conn.execute("SELECT estado, COUNT(*) AS n FROM outbox GROUP BY estado").fetchall()
+            else:
+                rows = conn.execute(
+                    "SELECT estado, COUNT(*) AS n FROM outbox WHERE canal = ? GROUP BY estado", (canal,)
+                ).fetchall()
+            return {row["estado"]: row["n"] for row in rows}
+    except Exception as e:
+        logger.error(f"Error obteniendo estadísticas del outbox: {e}")
+        return {}
+
 def add_url(url: str, titulo: str = "", fuente: str = "") -> bool:
     """Añade una nueva URL a la base de datos."""
     if not url:
@@ -77,8 +507,8 @@ def add_url(url: str, titulo: str = "", fuente: str = "") -> bool:
         with get_db_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(
-                "INSERT OR IGNORE INTO convocatorias (url, titulo, fuente) VALUES (?, ?, ?)",
-                (url, titulo, fuente)
+                "INSERT OR IGNORE INTO convocatorias (url, titulo, fuente, url_canonica) VALUES (?, ?, ?, ?)",
+                (url, titulo, fuente, canonicalize_url(url))
             )
             
             if cursor.rowcount > 0:
@@ -103,11 +533,15 @@ def get_stats() -> dict:
             cursor.execute("SELECT COUNT(*) as total FROM convocatorias")
             total = cursor.fetchone()["total"]
             
-            # Por fuente
-            cursor.execute("""
+            # Por veredicto (relevante, descartada, duplicada)
+            cursor.execute("SELECT estado, COUNT(*) as count FROM convocatorias GROUP BY estado")
+            por_estado = dict(cursor.fetchall())
+            
+            # Convocatorias relevantes por fuente
+            cursor.execute(f"""
                 SELECT fuente, COUNT(*) as count 
                 FROM convocatorias 
-                WHERE fuente != '' 
+                WHERE fuente != '' AND estado = '{ESTADO_RELEVANTE}'
                 GROUP BY fuente 
                 ORDER BY count DESC
             """)
@@ -123,10 +557,106 @@ def get_stats() -> dict:
             
             return {
                 "total": total,
+                "por_estado": por_estado,
                 "por_fuente": por_fuente,
                 "agregadas_hoy": agregadas_hoy
             }
             
     except Exception as e:
         logger.error(f"Error obteniendo estadísticas: {e}")
-        return {"total": 0, "por_fuente": {}, "agregadas_hoy": 0}
+        return {"total": 0, "por_estado": {}, "por_fuente": {}, "agregadas_hoy": 0}
+
+
+def get_portal_template(portal: str) -> Optional[Dict[str, Any]]:
+    """Devuelve la plantilla aprendida de un portal: {"huella": ..., "reglas": {...}}."""
+    try:
+        with get_db_connection() as conn:
+            row = conn.execute(
+                "SELECT huella, reglas FROM plantillas_portal WHERE portal = ?", (portal,)
+            ).fetchone()
+            if not row:
+                return None
+            return {"huella": row["huella"], "reglas": json.loads(row["reglas"])}
+    except Exception as e:
+        logger.error(f"Error leyendo plantilla de {portal}: {e}")
+        return None
+
+def save_portal_template(portal: str, huella: str, reglas: Dict[str, Any]) -> bool:
+    """Guarda (o reemplaza) la plantilla aprendida de un portal."""
+    try:
+        with get_db_connection() as conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO plantillas_portal (portal, huella, reglas, actualizado)
+                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                """,
+                (portal, huella, json.dumps(reglas, ensure_ascii=False))
+            )
+            conn.commit()
+            return True
+    except Exception as e:
+        logger.error(f"Error guardando plantilla de {portal}: {e}")
+        return False
+
+def get_feed_lastmod(portal: str) -> Optional[str]:
+    """Devuelve el lastmod más reciente ya procesado de un feed (ISO 8601)."""
+    try:
+        with get_db_connection() as conn:
+            row = conn.execute(
+                "SELECT ultimo_lastmod FROM estado_feeds WHERE portal = ?", (portal,)
+            ).fetchone()
+            return row["ultimo_lastmod"] if row else None
+    except Exception as e:
+        logger.error(f"Error leyendo estado del feed {portal}: {e}")
+        return None
+
+def save_feed_lastmod(portal: str, lastmod: str) -> bool:
+    """Guarda el lastmod más reciente procesado de un feed."""
+    try:
+        with get_db_connection() as conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO estado_feeds (portal, ultimo_lastmod, actualizado)
+                VALUES (?, ?, CURRENT_TIMESTAMP)
+                """,
+                (portal, lastmod)
+            )
+            conn.commit()
+            return True
+    except Exception as e:
+        logger.error(f"Error guardando estado del feed {portal}: {e}")
+        return False
+
+PORTAL_STATE_FIELDS = (
+    "ultima_ejecucion", "proxima_ejecucion", "huella", "convocatorias",
+    "errores_seguidos", "latencia_media", "intervalo_horas"
+)
+
+def get_portal_states() -> Dict[str, Dict[str, Any]]:
+    """Estado guardado de todos los portales: portal -> campos de PORTAL_STATE_FIELDS."""
+    try:
+        with get_db_connection() as conn:
+            rows = conn.execute(f"SELECT portal, {', '.join(PORTAL_STATE_FIELDS)} FROM estado_portales").fetchall()
+            return {row["portal"]: {field: row[field] for field in PORTAL_STATE_FIELDS} for row in rows}
+    except Exception as e:
+        logger.error(f"Error leyendo estado de portales: {e}")
+        return {}
+
+def save_portal_states(states: Dict[str, Dict[str, Any]]) -> bool:
+    """Guarda en una transacción el estado de varios portales."""
+    if not states:
+        return True
+    try:
+        with get_db_connection() as conn:
+            conn.executemany(
+                f"""
+                INSERT OR REPLACE INTO estado_portales (portal, {', '.join(PORTAL_STATE_FIELDS)}, actualizado)
+                VALUES (?, {', '.join('?' for _ in PORTAL_STATE_FIELDS)}, CURRENT_TIMESTAMP)
+                """,
+                ((portal, *(state.get(field) for field in PORTAL_STATE_FIELDS)) for portal, state in states.items())
+            )
+            conn.commit()
+            return True
+    except Exception as e:
+        logger.error(f"Error guardando estado de {len(states)} portales: {e}")
+        return False
@@ -0,0 +1,76 @@
+import os
+import logging
+from typing import Any, Dict, List, Optional
+from agents.database import ESTADO_DUPLICADA, add_urls_bulk, filter_new_urls, find_near_duplicates
+from utils.simhash import SimHashIndex, simhash
+from utils.urls import canonicalize_url
+
+logger = logging.getLogger(__name__)
+
+# Suprime convocatorias casi iguales a otras ya vistas (mismo texto en otro portal)
+NEAR_DUPLICATE_ENABLED = os.getenv("NEAR_DUPLICATE_ENABLED", "true").lower() in ("1", "true", "yes")
+# Bits distintos tolerados entre huellas SimHash (menor que SIMHASH_BANDS para no perder ninguna)
+NEAR_DUPLICATE_MAX_DISTANCE = int(os.getenv("NEAR_DUPLICATE_MAX_DISTANCE", "3"))
+
+class Deduplicator:
+    """
+    Filtro de convocatorias ya conocidas para una ejecución.
+
+    Descarta, antes de cualquier llamada al LLM:
+    - URLs ya guardadas o repetidas en la ejecución, comparando su forma
+      canónica (sin parámetros de seguimiento, "www." ni barra final)
+    - Convocatorias cuyo título y resumen son casi iguales a los de otra ya
+      guardada o ya vista en la ejecución (huella SimHash)
+
+    Cada convocatoria que pasa el filtro lleva su huella en "simhash" para
+    guardarla junto con la URL. Las casi duplicadas se guardan con estado
+    "duplicada" para no volver a procesarlas en otra ejecución. No es seguro para varios hilos: en el
+    pipeline lo usa una etapa de un solo worker.
+    """
+
+    def __init__(self, near_duplicates: Optional[bool] = None, max_distance: Optional[int] = None):
+        self.near_duplicates = NEAR_DUPLICATE_ENABLED if near_duplicates is None else near_duplicates
+        self.max_distance = NEAR_DUPLICATE_MAX_DISTANCE if max_distance is None else max_distance
+        self.seen_urls = set()
+        self.index = SimHashIndex()
+        self.near_duplicates_found = 0
+
+    def filter(self, convocatorias: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        nuevas_urls = filter_new_urls(c["url"] for c in convocatorias)
+        candidatas = []
+        for convocatoria in convocatorias:
+            canonica = canonicalize_url(convocatoria["url"])
+            if convocatoria["url"] in nuevas_urls and canonica not in self.seen_urls:
+                self.seen_urls.add(canonica)
+                candidatas.append(convocatoria)
+            else:
+                logger.debug(f"Convocatoria ya existe: {convocatoria.get('titulo', '')[:50]}...")
+
+        if not self.near_duplicates:
+            return candidatas
+
+        fingerprints = {}
+        for convocatoria in candidatas:
+            convocatoria["simhash"] = simhash(f"{convocatoria.get('titulo', '')} {convocatoria.get('resumen', '')}")
+            if convocatoria["simhash"] is not None:
+                fingerprints[convocatoria["url"]] = convocatoria["simhash"]
+        guardadas = find_near_duplicates(fingerprints, self.max_distance)
+
+        result = []
+        duplicadas = []
+        for convocatoria in candidatas:
+            fingerprint = convocatoria["simhash"]
+            original = guardadas.get(convocatoria["url"])
+            if fingerprint is not None and not original:
+                original = self.index.find(fingerprint, self.max_distance)
+            if original:
+                self.near_duplicates_found += 1
+                logger.info(f"🔁 Casi duplicada descartada: {convocatoria['url']} ≈ {original}")
+                duplicadas.append(convocatoria)
+                continue
+            if fingerprint is not None:
+                self.index.add(fingerprint, convocatoria["url"])
+            result.append(convocatoria)
+        if duplicadas:
+            add_urls_bulk(duplicadas, estado=ESTADO_DUPLICADA)
+        return result
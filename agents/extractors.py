@@ -0,0 +1,89 @@
+import logging
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urljoin
+from bs4 import BeautifulSoup
+
+logger = logging.getLogger(__name__)
+
+# Extractor: (html, url base, reglas del portal) -> convocatorias
+Extractor = Callable[[str, str, Dict[str, Any]], List[Dict[str, Any]]]
+
+EXTRACTORS: Dict[str, Extractor] = {}
+
+def register_extractor(name: str) -> Callable[[Extractor], Extractor]:
+    """
+    Decorator para registrar un extractor local.
+
+    Un portal lo usa con "extractor": {"type": "<name>", ...} en portales.json;
+    el resto de claves se pasan al extractor como reglas.
+    """
+    def decorator(func: Extractor) -> Extractor:
+        EXTRACTORS[name] = func
+        return func
+    return decorator
+
+def _text(element: Any) -> str:
+    return " ".join(element.get_text(" ", strip=True).split()) if element else ""
+
+@register_extractor("css")
+def extract_with_css(html_content: str, base_url: str, rules: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Extrae convocatorias con selectores CSS.
+
+    Reglas:
+        item: selector de cada convocatoria (obligatorio)
+        link: selector del enlace dentro del item (por defecto, el primer a[href])
+        title: selector del título (por defecto, el texto del enlace)
+        summary: selector del resumen (opcional)
+    """
+    soup = BeautifulSoup(html_content, "html.parser")
+    convocatorias = []
+
+    for item in soup.select(rules["item"]):
+        if rules.get("link"):
+            link = item.select_one(rules["link"])
+        elif item.name == "a" and item.get("href"):
+            link = item
+        else:
+            link = item.find("a", href=True)
+
+        if not link or not link.get("href"):
+            continue
+
+        titulo = _text(item.select_one(rules["title"])) if rules.get("title") else _text(link)
+        if not titulo:
+            continue
+
+        convocatorias.append({
+            "titulo": titulo,
+            "url": urljoin(base_url, link["href"]),
+            "resumen": _text(item.select_one(rules["summary"])) if rules.get("summary") else ""
+        })
+
+    return convocatorias
+
+def run_local_extractor(html_content: str, base_url: str, settings: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+    """
+    Aplica el extractor local configurado para un portal.
+
+    Returns:
+        None si el portal no tiene extractor local; en otro caso la lista de
+        convocatorias (vacía si las reglas no encontraron nada o fallaron)
+    """
+    rules = settings.get("extractor")
+    if not rules:
+        return None
+
+    extractor_type = rules.get("type", "css")
+    extractor = EXTRACTORS.get(extractor_type)
+    if not extractor:
+        logger.warning(f"Extractor desconocido '{extractor_type}' para {base_url}")
+        return []
+
+    try:
+        convocatorias = extractor(html_content, base_url, rules)
+        logger.debug(f"Extractor '{extractor_type}': {len(convocatorias)} convocatorias en {base_url}")
+        return convocatorias
+    except Exception as e:
+        logger.error(f"Error en extractor '{extractor_type}' para {base_url}: {e}")
+        return []
@@ -0,0 +1,115 @@
+import os
+import re
+import logging
+from contextlib import closing, nullcontext
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from agents.database import get_feed_lastmod
+from utils.feed_parser import iter_feed_entries, gunzip_if_compressed, parse_date
+from utils.retry import robust_http_request
+
+logger = logging.getLogger(__name__)
+
+# Tipos de portal que se leen como XML en lugar de extraerse con el LLM
+FEED_TYPES = ("feed", "sitemap")
+
+# Convocatorias máximas por feed y ejecución, las más antiguas pendientes (configurable por portal con "max_items")
+FEED_MAX_ITEMS = int(os.getenv("FEED_MAX_ITEMS", "50"))
+# Sitemaps hijos máximos leídos desde un índice de sitemaps
+FEED_MAX_SITEMAPS = int(os.getenv("FEED_MAX_SITEMAPS", "10"))
+FEED_CHUNK_BYTES = 64 * 1024
+
+OLDEST = datetime.min.replace(tzinfo=timezone.utc)
+
+def is_feed_portal(settings: Dict[str, Any]) -> bool:
+    return settings.get("type") in FEED_TYPES
+
+def read_feed(url: str, host_limiter: Optional[Any] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Descarga un feed o sitemap en streaming y produce sus entradas a medida
+    que llegan. La petición y la lectura del cuerpo cuentan para el límite
+    de conexiones por host; las esperas entre reintentos, no.
+    """
+    limit = host_limiter.for_url(url) if host_limiter else nullcontext()
+    response = robust_http_request(url, stream=True, slot=limit)
+    with limit:
+        with closing(response):
+            chunks = gunzip_if_compressed(response.iter_content(chunk_size=FEED_CHUNK_BYTES))
+            yield from iter_feed_entries(chunks, url)
+
+def scrape_feed(
+    key: str,
+    settings: Dict[str, Any],
+    host_limiter: Optional[Any] = None,
+    checkpoints: Optional[List[Dict[str, Any]]] = None
+) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Lee las convocatorias de un portal de tipo feed (RSS/Atom) o sitemap.
+
+    Solo se devuelven las entradas con lastmod posterior al último procesado
+    en ejecuciones anteriores (las que no traen fecha pasan siempre; el
+    filtrado por URL conocida se hace después). Un índice de sitemaps se
+    recorre siguiendo solo los sitemaps hijos modificados.
+
+    Las entradas se toman de la más antigua a la más reciente, así que las
+    que no caben en max_items quedan para la siguiente ejecución. El nuevo
+    lastmod (el de la entrada más reciente devuelta) se añade a
+    `checkpoints` y se guarda con confirm_checkpoints cuando las
+    convocatorias ya están en la BD.
+
+    Opciones del portal:
+        url_pattern: regex que deben cumplir las URLs (útil en sitemaps)
+        max_items: convocatorias máximas por ejecución, las más antiguas pendientes
+
+    Returns:
+        Tupla (convocatorias, documentos XML leídos)
+    """
+    since = parse_date(get_feed_lastmod(key))
+    pattern = re.compile(settings["url_pattern"]) if settings.get("url_pattern") else None
+    max_items = int(settings.get("max_items", FEED_MAX_ITEMS))
+
+    pending = [settings["url"]]
+    visited = set()
+    entries = []
+    skipped = 0
+
+    while pending and len(visited) < 1 + FEED_MAX_SITEMAPS:
+        feed_url = pending.pop(0)
+        visited.add(feed_url)
+
+        for entry in read_feed(feed_url, host_limiter):
+            if since and entry["lastmod"] and entry["lastmod"] <= since:
+                skipped += 1
+                continue
+            if entry["sitemap"]:
+                if entry["url"] not in visited and entry["url"] not in pending:
+                    pending.append(entry["url"])
+                continue
+            if pattern and not pattern.search(entry["url"]):
+                continue
+            entries.append(entry)
+
+    if pending:
+        logger.warning(f"{key}: {len(pending)} sitemaps sin leer (límite FEED_MAX_SITEMAPS={FEED_MAX_SITEMAPS})")
+
+    # Las más antiguas primero; las entradas sin fecha al final
+    entries.sort(key=lambda e: (e["lastmod"] is None, e["lastmod"] or OLDEST))
+    entries, left = entries[:max_items], entries[max_items:]
+
+    dated = [e["lastmod"] for e in entries if e["lastmod"]]
+    next_dated = next((e["lastmod"] for e in left if e["lastmod"]), None)
+    if next_dated:
+        # Una entrada con la misma fecha que otra no devuelta no puede marcar el feed como leído
+        dated = [lastmod for lastmod in dated if lastmod < next_dated]
+    if left:
+        logger.info(f"📰 {key}: {len(left)} entradas quedan para la siguiente ejecución (max_items={max_items})")
+
+    convocatorias = [
+        {"titulo": e["titulo"], "url": e["url"], "resumen": e["resumen"]}
+        for e in entries
+    ]
+    if dated and not pending and (since is None or max(dated) > since) and checkpoints is not None:
+        checkpoints.append({"feed": key, "lastmod": max(dated).isoformat(), "urls": [c["url"] for c in convocatorias]})
+
+    logger.info(f"📰 {key}: {len(entries)} entradas nuevas en {len(visited)} documento(s), {skipped} sin cambios desde la última ejecución")
+    return convocatorias, len(visited)
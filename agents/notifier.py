@@ -1,9 +1,11 @@
 import os
 import logging
+import threading
 import time
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import requests
-from utils.retry import retry_with_backoff
+from utils.rate_limit import HeaderRateLimiter
+from utils.retry import retry_with_backoff, is_transient_error, get_http_session
 
 logger = logging.getLogger(__name__)
 
@@ -35,27 +37,65 @@ COLORS = {
     "default": 0x9467bd                  # Púrpura por defecto
 }
 
-@retry_with_backoff(max_retries=3, base_delay=1.0, exceptions=(requests.RequestException,))
+# Límites de Discord por mensaje de webhook
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_MESSAGE_EMBED_CHARS = 6000
+
+# Rondas de envío: la primera agrupa embeds; las siguientes reenvían uno a uno los que fallaron
+NOTIFIER_MAX_ROUNDS = int(os.getenv("NOTIFIER_MAX_ROUNDS", "3"))
+
+# Respuestas 429 toleradas por mensaje; cada una espera exactamente lo que indica Discord
+DISCORD_MAX_RATE_LIMIT_RETRIES = int(os.getenv("DISCORD_MAX_RATE_LIMIT_RETRIES", "5"))
+
+_webhook_limiters: Dict[str, HeaderRateLimiter] = {}
+_webhook_limiters_lock = threading.Lock()
+
+def get_webhook_limiter(webhook_url: str) -> HeaderRateLimiter:
+    """Devuelve el limitador del webhook; Discord lleva un cubo por webhook."""
+    with _webhook_limiters_lock:
+        if webhook_url not in _webhook_limiters:
+            _webhook_limiters[webhook_url] = HeaderRateLimiter()
+        return _webhook_limiters[webhook_url]
+
+@retry_with_backoff(max_retries=3, base_delay=1.0, exceptions=(requests.RequestException,), retryable=is_transient_error)
 def send_discord_message(webhook_url: str, payload: Dict[str, Any]) -> bool:
-    """Envía un mensaje individual a Discord con reintentos."""
+    """
+    Envía un mensaje individual a Discord.
+
+    Antes de cada petición se espera lo que indique el limitador del webhook
+    (sin pausas fijas). Un 429 se reintenta tras el tiempo exacto que pide
+    Discord; los errores de red pasan por retry_with_backoff.
+    """
+    limiter = get_webhook_limiter(webhook_url)
     try:
-        response = requests.post(
-            webhook_url, 
-            json=payload, 
-            timeout=30,
-            headers={'Content-Type': 'application/json'}
-        )
+        for _ in range(DISCORD_MAX_RATE_LIMIT_RETRIES + 1):
+            limiter.acquire()
+            response = get_http_session().post(
+                webhook_url, 
+                json=payload, 
+                timeout=30,
+                headers={'Content-Type': 'application/json'}
+            )
+            
+            body = None
+            if response.status_code == 429:
+                try:
+                    body = response.json()
+                except ValueError:
+                    body = None
+            retry_after = limiter.update(response.status_code, response.headers, body if isinstance(body, dict) else None)
+            
+            if response.status_code in (200, 204):
+                return True
+            elif retry_after is not None:  # Rate limit
+                logger.warning(f"Rate limit de Discord alcanzado. Reintentando en {retry_after:.2f} segundos...")
+                continue
+            else:
+                logger.error(f"Error Discord {response.status_code}: {response.text}")
+                return False
         
-        if response.status_code == 204:
-            return True
-        elif response.status_code == 429:  # Rate limit
-            retry_after = int(response.headers.get('Retry-After', 5))
-            logger.warning(f"Rate limit alcanzado. Esperando {retry_after} segundos...")
-            time.sleep(retry_after)
-            raise requests.RequestException("Rate limit - reintentando")
-        else:
-            logger.error(f"Error Discord {response.status_code}: {response.text}")
-            return False
+        logger.error(f"Rate limit de Discord persistente tras {DISCORD_MAX_RATE_LIMIT_RETRIES} reintentos")
+        return False
             
     except Exception as e:
         logger.error(f"Error enviando mensaje a Discord: {e}")
@@ -85,52 +125,134 @@ def create_embed(convocatoria: Dict[str, Any]) -> Dict[str, Any]:
     
     return embed
 
-def send_to_discord(convocatorias: List[Dict[str, Any]]) -> bool:
+def embed_length(embed: Dict[str, Any]) -> int:
+    """Caracteres de un embed que cuentan para el límite de 6000 por mensaje."""
+    length = len(embed.get("title") or "") + len(embed.get("description") or "")
+    length += len((embed.get("footer") or {}).get("text") or "")
+    length += len((embed.get("author") or {}).get("name") or "")
+    for field in embed.get("fields") or []:
+        length += len(field.get("name") or "") + len(field.get("value") or "")
+    return length
+
+def pack_embeds(
+    embeds: List[Dict[str, Any]],
+    max_embeds: int = MAX_EMBEDS_PER_MESSAGE,
+    max_chars: int = MAX_MESSAGE_EMBED_CHARS
+) -> List[List[int]]:
     """
-    Envía convocatorias a Discord mediante webhook.
-    
-    Args:
-        convocatorias: Lista de convocatorias a enviar
-    
+    Agrupa embeds en el menor número de mensajes que permiten los límites.
+
+    Cada embed va al primer mensaje con hueco (first-fit), así que los
+    mensajes conservan el orden relativo de sus embeds.
+
     Returns:
-        True si todas las notificaciones se enviaron correctamente
+        Lista de mensajes, cada uno con los índices de sus embeds
+    """
+    messages: List[List[int]] = []
+    sizes: List[int] = []
+    for index, embed in enumerate(embeds):
+        length = embed_length(embed)
+        for position, message in enumerate(messages):
+            if len(message) < max_embeds and sizes[position] + length <= max_chars:
+                message.append(index)
+                sizes[position] += length
+                break
+        else:
+            messages.append([index])
+            sizes.append(length)
+    return messages
+
+def send_embeds(webhook_url: str, embeds: List[Dict[str, Any]], max_rounds: Optional[int] = None) -> List[bool]:
+    """
+    Envía embeds agrupados en el mínimo de mensajes y devuelve el estado de cada uno.
+
+    Si un mensaje falla, sus embeds se reenvían de uno en uno en la ronda
+    siguiente: un embed rechazado no impide la entrega del resto y solo se
+    reenvía lo que no llegó.
+
+    Returns:
+        Lista alineada con `embeds`: True si el embed se entregó
+    """
+    delivered = [False] * len(embeds)
+    pending = list(range(len(embeds)))
+    max_rounds = max(1, max_rounds or NOTIFIER_MAX_ROUNDS)
+    sent_messages = 0
+
+    for round_number in range(1, max_rounds + 1):
+        if not pending:
+            break
+        if round_number == 1:
+            messages = [[pending[i] for i in message] for message in pack_embeds([embeds[i] for i in pending])]
+        else:
+            logger.info(f"Reintentando {len(pending)} embeds fallidos (ronda {round_number}/{max_rounds})")
+            messages = [[i] for i in pending]
+
+        failed = []
+        for message in messages:
+            sent_messages += 1
+            try:
+                ok = send_discord_message(webhook_url, {"embeds": [embeds[i] for i in message]})
+            except Exception as e:
+                logger.error(f"Error enviando mensaje con {len(message)} embeds: {e}")
+                ok = False
+            if ok:
+                for i in message:
+                    delivered[i] = True
+            else:
+                failed.extend(message)
+        pending = failed
+
+    logger.info(f"{sum(delivered)}/{len(embeds)} embeds entregados en {sent_messages} mensajes")
+    return delivered
+
+def send_to_discord_detailed(convocatorias: List[Dict[str, Any]]) -> List[bool]:
+    """
+    Envía convocatorias a Discord y devuelve si se entregó cada una.
+
+    Returns:
+        Lista alineada con `convocatorias` (todo False si el webhook no es válido)
     """
     webhook_url = os.getenv("DISCORD_WEBHOOK_URL")
     
     if not validate_webhook_url(webhook_url):
         logger.error("DISCORD_WEBHOOK_URL no configurada o inválida")
-        return False
+        return [False] * len(convocatorias)
     
     if not convocatorias:
         logger.info("No hay convocatorias para enviar a Discord")
-        return True
+        return []
     
     logger.info(f"Enviando {len(convocatorias)} convocatorias a Discord...")
     
-    success_count = 0
-    for i, convocatoria in enumerate(convocatorias, 1):
-        try:
-            embed = create_embed(convocatoria)
-            payload = {"embeds": [embed]}
-            
-            if send_discord_message(webhook_url, payload):
-                success_count += 1
-                logger.debug(f"✅ {i}/{len(convocatorias)}: {convocatoria.get('titulo', 'Sin título')[:50]}...")
-            else:
-                logger.error(f"❌ {i}/{len(convocatorias)}: Falló envío de {convocatoria.get('titulo', 'Sin título')[:50]}...")
-            
-            # Pequeña pausa entre mensajes para evitar rate limiting
-            if i < len(convocatorias):
-                time.sleep(0.5)
-                
-        except Exception as e:
-            logger.error(f"Error procesando convocatoria {i}: {e}")
-            continue
+    embeds = [create_embed(convocatoria) for convocatoria in convocatorias]
+    delivered = send_embeds(webhook_url, embeds)
+    
+    for convocatoria, ok in zip(convocatorias, delivered):
+        if not ok:
+            logger.error(f"❌ Falló envío de {convocatoria.get('titulo', 'Sin título')[:50]}...")
     
+    return delivered
+
+def send_to_discord(convocatorias: List[Dict[str, Any]]) -> bool:
+    """
+    Envía convocatorias a Discord mediante webhook.
+    
+    Args:
+        convocatorias: Lista de convocatorias a enviar
+    
+    Returns:
+        True si todas las notificaciones se enviaron correctamente
+    """
+    if not validate_webhook_url(os.getenv("DISCORD_WEBHOOK_URL")):
+        logger.error("DISCORD_WEBHOOK_URL no configurada o inválida")
+        return False
+    
+    delivered = send_to_discord_detailed(convocatorias)
+    success_count = sum(delivered)
     total = len(convocatorias)
     if success_count == total:
         logger.info(f"✅ Todas las notificaciones enviadas correctamente ({success_count}/{total})")
         return True
     else:
         logger.warning(f"⚠️ Notificaciones parciales: {success_count}/{total} enviadas correctamente")
-        return False
\ No newline at end of file
+        return False
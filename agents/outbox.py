@@ -0,0 +1,120 @@
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+from agents.database import enqueue_notifications, get_pending_notifications, mark_notifications, get_outbox_stats
+from agents.channels import NotificationChannel, dispatch, get_channels, route_convocatoria
+
+logger = logging.getLogger(__name__)
+
+# Notificaciones leídas del outbox por envío
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "50"))
+# Ejecuciones en que se intenta una notificación antes de marcarla como 'failed'
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "5"))
+
+def queue_notifications(
+    convocatorias: List[Dict[str, Any]],
+    channels: Optional[Dict[str, NotificationChannel]] = None
+) -> List[Dict[str, Any]]:
+    """Guarda las convocatorias con una notificación pendiente por cada canal que las acepta."""
+    channels = get_channels() if channels is None else channels
+    return enqueue_notifications(convocatorias, route=lambda conv: route_convocatoria(conv, channels))
+
+def deliver_outbox_rows(
+    rows: List[Dict[str, Any]],
+    channels: Optional[Dict[str, NotificationChannel]] = None,
+    max_attempts: Optional[int] = None,
+    cache: Optional[Dict[Any, Any]] = None
+) -> int:
+    """
+    Envía filas del outbox a sus canales y registra el resultado de cada una.
+
+    Los canales se atienden en paralelo y las filas de cada canal se marcan
+    en cuanto ese canal termina, así que un crash solo puede repetir el
+    aviso de los envíos en curso.
+
+    Returns:
+        Número de notificaciones entregadas
+    """
+    channels = get_channels() if channels is None else channels
+    max_attempts = max_attempts or OUTBOX_MAX_ATTEMPTS
+
+    by_channel: Dict[str, List[Dict[str, Any]]] = {}
+    for row in rows:
+        if row["canal"] not in channels:
+            logger.warning(f"Canal '{row['canal']}' no configurado; la notificación {row['id']} sigue pendiente")
+            continue
+        by_channel.setdefault(row["canal"], []).append(row)
+
+    delivered_total = 0
+
+    def mark(canal: str, delivered: List[bool]) -> None:
+        nonlocal delivered_total
+        channel_rows = by_channel[canal]
+        sent_ids = [row["id"] for row, ok in zip(channel_rows, delivered) if ok]
+        failed_ids = [row["id"] for row, ok in zip(channel_rows, delivered) if not ok]
+        mark_notifications(sent_ids, failed_ids, max_attempts, error=f"Envío fallido en el canal {canal}")
+        delivered_total += len(sent_ids)
+
+    dispatch(
+        {canal: [row["convocatoria"] for row in channel_rows] for canal, channel_rows in by_channel.items()},
+        channels,
+        on_channel_done=mark,
+        cache=cache
+    )
+    return delivered_total
+
+def drain_outbox(
+    batch_size: Optional[int] = None,
+    max_attempts: Optional[int] = None,
+    channels: Optional[Dict[str, NotificationChannel]] = None
+) -> Dict[str, int]:
+    """
+    Envía por lotes todas las notificaciones pendientes del outbox.
+
+    Cada canal se drena en su propio hilo, de modo que un canal lento no
+    retrasa los lotes de los demás; un canal digest recibe todas sus filas
+    pendientes en un solo envío. Cada fila pendiente se intenta una vez
+    por llamada: las que fallan quedan para la siguiente ejecución hasta
+    agotar `max_attempts`. Como el outbox guarda la convocatoria ya
+    resumida, reenviar no repite el scraping ni las llamadas al LLM.
+
+    Returns:
+        {"enviadas": ..., "fallidas": ..., "pendientes": ...}
+    """
+    channels = get_channels() if channels is None else channels
+    batch_size = max(1, batch_size or OUTBOX_BATCH_SIZE)
+    max_attempts = max_attempts or OUTBOX_MAX_ATTEMPTS
+    cache: Dict[Any, Any] = {}
+
+    def drain_channel(canal: str) -> Dict[str, int]:
+        enviadas = intentadas = last_id = 0
+        while True:
+            limit = None if channels[canal].digest else batch_size
+            rows = get_pending_notifications(limit=limit, after_id=last_id, canal=canal)
+            if not rows:
+                break
+            last_id = rows[-1]["id"]
+            intentadas += len(rows)
+            enviadas += deliver_outbox_rows(rows, channels, max_attempts, cache)
+        return {"enviadas": enviadas, "intentadas": intentadas}
+
+    enviadas = intentadas = 0
+    if channels:
+        with ThreadPoolExecutor(max_workers=len(channels), thread_name_prefix="outbox") as executor:
+            for result in executor.map(drain_channel, channels):
+                enviadas += result["enviadas"]
+                intentadas += result["intentadas"]
+
+    stats = get_outbox_stats()
+    result = {
+        "enviadas": enviadas,
+        "fallidas": intentadas - enviadas,
+        "pendientes": stats.get("pending", 0)
+    }
+    if intentadas:
+        logger.info(
+            f"Outbox: {enviadas}/{intentadas} notificaciones enviadas, "
+            f"{result['pendientes']} pendientes, {stats.get('failed', 0)} descartadas tras {max_attempts} intentos"
+        )
+    return result
@@ -0,0 +1,287 @@
+import os
+import time
+import queue
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from agents.scraper import (
+    PORTALES, SCRAPER_MAX_WORKERS, SCRAPER_PER_HOST_LIMIT, HostLimiter, scrape_single_portal, log_scrape_timings,
+    confirm_checkpoints
+)
+from agents.classifier import CLASSIFIER_BATCH_SIZE, classify_convocatorias
+from agents.summarizer import SUMMARIZER_MAX_WORKERS, summarize_convocatoria
+from agents.notifier import MAX_EMBEDS_PER_MESSAGE
+from agents.dedup import Deduplicator
+from agents.database import ESTADO_DESCARTADA, add_urls_bulk
+from agents.scheduler import record_portal_runs
+from agents.channels import NotificationChannel, get_channels
+from agents.outbox import queue_notifications, deliver_outbox_rows, drain_outbox
+from utils.rate_limit import get_gemini_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+# Modo de ejecución de main.py: "streaming" (etapas solapadas) o "batch" (fases estrictas)
+PIPELINE_MODE = os.getenv("PIPELINE_MODE", "streaming").lower()
+# Elementos en espera entre dos etapas; una etapa lenta frena a las anteriores
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "100"))
+PIPELINE_CLASSIFY_WORKERS = int(os.getenv("PIPELINE_CLASSIFY_WORKERS", "2"))
+# Segundos que una etapa por lotes espera a completar un lote antes de procesarlo
+PIPELINE_BATCH_WAIT = float(os.getenv("PIPELINE_BATCH_WAIT", "2.0"))
+
+_END = object()
+
+class Stage:
+    """
+    Etapa de un pipeline en streaming.
+
+    `workers` hilos leen de una cola acotada, procesan lotes de hasta
+    `batch_size` elementos con `func` y pasan cada resultado a la etapa
+    siguiente en cuanto está listo (o a la que elija `route`, si se
+    indica). Un lote incompleto se procesa tras `batch_wait` segundos para
+    no retener elementos. Un error en un lote se registra y no detiene la
+    etapa.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[List[Any]], List[Any]],
+        workers: int = 1,
+        batch_size: int = 1,
+        batch_wait: float = 0.0,
+        queue_size: Optional[int] = None,
+        route: Optional[Callable[[Any], Optional["Stage"]]] = None
+    ):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self.batch_wait = batch_wait
+        self.input: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, queue_size or PIPELINE_QUEUE_SIZE))
+        self.output: Optional["Stage"] = None
+        self.route = route
+        self.processed = 0
+        self.produced = 0
+        self.errors = 0
+        self.busy = 0.0
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> None:
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"pipeline-{self.name}-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def put(self, item: Any) -> None:
+        """Encola un elemento, bloqueando si la cola está llena."""
+        self.input.put(item)
+
+    def close(self) -> None:
+        """Espera a que la etapa procese todo lo encolado y terminen sus hilos."""
+        for _ in self._threads:
+            self.input.put(_END)
+        for thread in self._threads:
+            thread.join()
+
+    def _next_batch(self) -> Tuple[List[Any], bool]:
+        item = self.input.get()
+        if item is _END:
+            return [], True
+
+        batch = [item]
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self.input.get(timeout=remaining) if remaining > 0 else self.input.get_nowait()
+            except queue.Empty:
+                break
+            if item is _END:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self) -> None:
+        done = False
+        while not done:
+            batch, done = self._next_batch()
+            if not batch:
+                continue
+
+            start = time.perf_counter()
+            try:
+                results = self.func(batch) or []
+                failed = 0
+            except Exception as e:
+                logger.error(f"Error en la etapa {self.name} ({len(batch)} elementos): {e}")
+                results = []
+                failed = len(batch)
+
+            with self._lock:
+                self.processed += len(batch)
+                self.produced += len(results)
+                self.errors += failed
+                self.busy += time.perf_counter() - start
+
+            for result in results:
+                target = self.route(result) if self.route else self.output
+                if target:
+                    target.put(result)
+
+def run_stages(stages: List[Stage], items: Iterable[Any]) -> None:
+    """
+    Ejecuta etapas encadenadas sobre `items`.
+
+    Cada etapa se cierra después de las anteriores, de modo que el fin de la
+    entrada se propaga cuando todo lo pendiente ya pasó a la etapa siguiente.
+    Las etapas con `route` eligen su destino entre las posteriores.
+    """
+    for stage, next_stage in zip(stages, stages[1:]):
+        if not stage.route:
+            stage.output = next_stage
+    for stage in stages:
+        stage.start()
+    for item in items:
+        stages[0].put(item)
+    for stage in stages:
+        stage.close()
+
+def run_streaming_pipeline(
+    portales: Optional[Dict[str, Any]] = None,
+    queue_size: Optional[int] = None,
+    scrape_workers: Optional[int] = None,
+    classify_workers: Optional[int] = None,
+    summarize_workers: Optional[int] = None,
+    batch_wait: Optional[float] = None,
+    channels: Optional[Dict[str, NotificationChannel]] = None
+) -> Dict[str, Any]:
+    """
+    Ejecuta scraping → filtrado → clasificación → resúmenes → persistencia →
+    notificación como etapas solapadas.
+
+    Cada convocatoria avanza en cuanto la etapa anterior la produce, sin
+    esperar al portal más lento. El resultado es el mismo que en modo por
+    fases: solo se notifican y guardan URLs nuevas y relevantes. Cada canal
+    de notificación tiene su propia etapa, así que uno lento no frena al resto.
+
+    Returns:
+        Contadores por etapa, notificaciones encoladas y fallidas (una por
+        canal), tiempos por portal, segundos hasta la primera notificación
+        y duración total
+    """
+    portales = PORTALES if portales is None else portales
+    channels = get_channels() if channels is None else channels
+    batch_wait = PIPELINE_BATCH_WAIT if batch_wait is None else batch_wait
+    start = time.perf_counter()
+
+    host_limiter = HostLimiter(SCRAPER_PER_HOST_LIMIT)
+    # Misma cuota de Gemini que la extracción del scraper
+    rate_limiter = get_gemini_rate_limiter()
+    timings: List[Dict[str, Any]] = []
+    deduplicator = Deduplicator()
+    first_notification: List[float] = []
+    notified = 0
+    queued = 0
+    saved_urls = 0
+    notify_lock = threading.Lock()
+    format_cache: Dict[Any, Any] = {}
+
+    def scrape(batch: List[Tuple[str, Any]]) -> List[Dict[str, Any]]:
+        result = []
+        for key, portal in batch:
+            convocatorias, timing = scrape_single_portal(key, portal, host_limiter)
+            timings.append(timing)
+            result.extend(convocatorias)
+        return result
+
+    def deduplicate(batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # Un solo worker: el deduplicador recuerda lo visto en otros portales de la ejecución
+        return deduplicator.filter(batch)
+
+    def classify(batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        relevantes = classify_convocatorias(batch, batch_size=len(batch))
+        # Las descartadas quedan guardadas como vistas; las relevantes, al persistir
+        add_urls_bulk([c for c in batch if c.get("relevante") is False], estado=ESTADO_DESCARTADA)
+        return relevantes
+
+    def summarize(batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [summarize_convocatoria(c, rate_limiter) for c in batch]
+
+    def persist(batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # URL y notificaciones pendientes se guardan juntas antes de enviar
+        nonlocal saved_urls, queued
+        rows = queue_notifications(batch, channels)
+        saved_urls += len({row["convocatoria"]["url"] for row in rows})
+        queued += len(rows)
+        return rows
+
+    def notify(batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        nonlocal notified
+        delivered = deliver_outbox_rows(batch, channels, cache=format_cache)
+        with notify_lock:
+            if delivered:
+                notified += delivered
+                if not first_notification:
+                    first_notification.append(time.perf_counter() - start)
+                    logger.info(f"📨 Primera notificación enviada a los {first_notification[0]:.2f}s")
+        return batch
+
+    # Etapas finales en paralelo: route=None evita encadenar un canal con el siguiente.
+    # Los canales digest no tienen etapa: sus filas quedan en el outbox y se
+    # envían juntas al vaciarlo al final
+    notify_stages = {
+        name: Stage(f"notificación:{name}", notify, batch_size=MAX_EMBEDS_PER_MESSAGE, batch_wait=batch_wait,
+                    queue_size=queue_size, route=lambda row: None)
+        for name, channel in channels.items() if not channel.digest
+    }
+    stages = [
+        Stage("scraping", scrape, workers=min(scrape_workers or SCRAPER_MAX_WORKERS, max(1, len(portales))), queue_size=queue_size),
+        Stage("filtrado", deduplicate, batch_size=50, batch_wait=0.2, queue_size=queue_size),
+        Stage("clasificación", classify, workers=classify_workers or PIPELINE_CLASSIFY_WORKERS,
+              batch_size=CLASSIFIER_BATCH_SIZE, batch_wait=batch_wait, queue_size=queue_size),
+        Stage("resúmenes", summarize, workers=summarize_workers or SUMMARIZER_MAX_WORKERS, queue_size=queue_size),
+        Stage("persistencia", persist, batch_size=20, batch_wait=0.2, queue_size=queue_size,
+              route=lambda row: notify_stages.get(row["canal"])),
+        *notify_stages.values()
+    ]
+
+    logger.info(f"Iniciando pipeline en streaming con {len(portales)} portales")
+    run_stages(stages, portales.items())
+
+    # Envío de los canales digest y reintento de los fallidos durante el pipeline
+    outbox = drain_outbox(channels=channels)
+    notified += outbox["enviadas"]
+
+    # Todas las convocatorias ya pasaron por la persistencia: se confirman sus páginas
+    confirm_checkpoints(timings)
+    log_scrape_timings(timings)
+    record_portal_runs(timings, portales)
+    logger.info("=== ETAPAS DEL PIPELINE ===")
+    for stage in stages:
+        logger.info(
+            f"{stage.name}: {stage.processed} entradas → {stage.produced} salidas, "
+            f"{stage.workers} worker(s), ocupado {stage.busy:.2f}s"
+            + (f", {stage.errors} con error" if stage.errors else "")
+        )
+
+    scraping, filtrado, clasificacion, resumenes = stages[:4]
+    stats = {
+        "encontradas": scraping.produced,
+        "nuevas": filtrado.produced,
+        "casi_duplicadas": deduplicator.near_duplicates_found,
+        "relevantes": clasificacion.produced,
+        "resumidas": resumenes.produced,
+        "notificadas": notified,
+        "encoladas": queued,
+        "fallidas": outbox["fallidas"],
+        "guardadas": saved_urls,
+        "primera_notificacion": first_notification[0] if first_notification else None,
+        "duracion": time.perf_counter() - start,
+        "timings": timings
+    }
+    logger.info(
+        f"Pipeline completado en {stats['duracion']:.2f}s: {stats['encontradas']} encontradas, "
+        f"{stats['nuevas']} nuevas, {stats['relevantes']} relevantes, {stats['notificadas']} notificadas"
+    )
+    return stats
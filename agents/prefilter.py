@@ -0,0 +1,215 @@
+import os
+import sys
+import json
+import math
+import logging
+from typing import Any, Dict, List, Optional, Sequence
+import numpy as np
+from utils.simhash import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Prefiltro local de relevancia antes del LLM: solo descarta, nunca acepta,
+# porque la elegibilidad (Colombia, Latinoamérica) la decide siempre el LLM
+PREFILTER_ENABLED = os.getenv("PREFILTER_ENABLED", "true").lower() in ("1", "true", "yes")
+# Similitud por debajo de la cual se descarta sin consultar al LLM
+PREFILTER_LOW = float(os.getenv("PREFILTER_LOW", "0.10"))
+# Con menos palabras significativas el texto se envía siempre al LLM
+PREFILTER_MIN_TOKENS = int(os.getenv("PREFILTER_MIN_TOKENS", "4"))
+# Convocatorias etiquetadas a mano con las que se ajustó el umbral
+PREFILTER_LABELED_FILE = os.getenv("PREFILTER_LABELED_FILE", "data/prefiltro_etiquetado.jsonl")
+
+NGRAM_SIZES = (4, 5)
+# Secciones del perfil que no describen temas (la elegibilidad la decide el LLM)
+IGNORED_PROFILE_SECTIONS = ("UBICACIÓN", "ELEGIBILIDAD")
+# Áreas del perfil en inglés: muchas convocatorias internacionales no se publican en español
+PROFILE_ENGLISH_TERMS = (
+    "data science and advanced analytics",
+    "data visualization and interactive dashboards",
+    "artificial intelligence AI and machine learning",
+    "business intelligence and business analytics",
+    "big data and data processing platforms",
+    "predictive models and AI algorithms",
+    "digital transformation",
+    "cloud computing",
+    "open data",
+    "AI automation"
+)
+# Palabras comunes a cualquier convocatoria, que no indican el tema
+STOPWORDS = set("""
+    para con los las del una por como sus que desde sobre entre hasta este esta
+    the and for with from into this that are its their
+    convocatoria convocatorias programa programas fondo fondos proyecto proyectos
+    empresa empresas apoyo apoyos financiacion cofinanciacion recursos ayudas subvenciones desarrollo
+    call calls proposals grant grants funding support program programme projects companies
+    organisations organizations open abierta
+""".split())
+
+def topic_words(text: str) -> List[str]:
+    return [word for word in tokenize(text) if word not in STOPWORDS]
+
+def is_short(convocatoria: Dict[str, Any]) -> bool:
+    """Textos con menos de PREFILTER_MIN_TOKENS palabras temáticas: demasiado escasos para puntuarlos."""
+    return len(topic_words(f"{convocatoria.get('titulo', '')} {convocatoria.get('resumen', '')}")) < PREFILTER_MIN_TOKENS
+
+def char_ngrams(text: str) -> List[str]:
+    """
+    N-gramas de caracteres de cada palabra, con un espacio a cada lado.
+
+    Comparten n-gramas las variantes de una palabra ("analítica",
+    "analytics") y los cognados español/inglés, algo que los tokens
+    completos no capturan.
+    """
+    ngrams = []
+    for word in topic_words(text):
+        padded = f" {word} "
+        for n in NGRAM_SIZES:
+            ngrams.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+    return ngrams
+
+def profile_documents(profile: str) -> List[str]:
+    """Líneas temáticas del perfil de empresa (cabecera, áreas, tecnologías y sectores) y sus equivalentes en inglés."""
+    documents = []
+    section = ""
+    for line in profile.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line.endswith(":"):
+            section = line[:-1]
+            continue
+        if any(line.startswith(name) or section.startswith(name) for name in IGNORED_PROFILE_SECTIONS):
+            continue
+        documents.append(line.lstrip("- "))
+    return documents + list(PROFILE_ENGLISH_TERMS)
+
+class RelevancePrefilter:
+    """
+    Puntuación TF-IDF de convocatorias frente al perfil de empresa.
+
+    Cada línea temática del perfil es un documento; la puntuación de una
+    convocatoria es su similitud coseno con la línea más parecida, así que
+    basta con que encaje bien en un área. Todo el lote se puntúa con una
+    multiplicación de matrices de NumPy, sin llamadas externas.
+    """
+
+    def __init__(self, profile: str, low: Optional[float] = None):
+        self.low = PREFILTER_LOW if low is None else low
+
+        documents = [char_ngrams(doc) for doc in profile_documents(profile)]
+        self.vocabulary: Dict[str, int] = {}
+        for ngrams in documents:
+            for ngram in ngrams:
+                self.vocabulary.setdefault(ngram, len(self.vocabulary))
+
+        document_frequency = np.zeros(len(self.vocabulary), dtype=np.float32)
+        for ngrams in documents:
+            document_frequency[[self.vocabulary[g] for g in set(ngrams)]] += 1
+        # IDF suavizado; los n-gramas ausentes del perfil reciben el máximo
+        self.idf = np.log((1 + len(documents)) / (1 + document_frequency)) + 1
+        self.unknown_idf = math.log(1 + len(documents)) + 1
+
+        self.matrix = self._vectorize(documents)
+
+    def _vectorize(self, documents: Sequence[List[str]]) -> np.ndarray:
+        """Matriz TF-IDF normalizada (documentos × vocabulario)."""
+        counts = np.zeros((len(documents), len(self.vocabulary)), dtype=np.float32)
+        unknown_sq = np.zeros(len(documents), dtype=np.float32)
+        for row, ngrams in enumerate(documents):
+            unknown = {}
+            for ngram in ngrams:
+                column = self.vocabulary.get(ngram)
+                if column is None:
+                    unknown[ngram] = unknown.get(ngram, 0) + 1
+                else:
+                    counts[row, column] += 1
+            unknown_sq[row] = sum((count * self.unknown_idf) ** 2 for count in unknown.values())
+
+        weights = counts * self.idf
+        # La norma incluye los n-gramas que no están en el perfil: un texto
+        # largo sobre otro tema no puntúa alto por unas pocas coincidencias
+        norms = np.sqrt((weights ** 2).sum(axis=1) + unknown_sq)
+        norms[norms == 0] = 1
+        return weights / norms[:, None]
+
+    def score(self, convocatorias: Sequence[Dict[str, Any]]) -> np.ndarray:
+        """Similitud (0-1) de cada convocatoria con el área más cercana del perfil."""
+        if not convocatorias:
+            return np.zeros(0, dtype=np.float32)
+        documents = [char_ngrams(f"{c.get('titulo', '')} {c.get('resumen', '')}") for c in convocatorias]
+        return (self._vectorize(documents) @ self.matrix.T).max(axis=1)
+
+    def split(self, convocatorias: Sequence[Dict[str, Any]]) -> List[Optional[bool]]:
+        """
+        Decisión del prefiltro para cada convocatoria: False (descartada) o
+        None (la decide el LLM). Una puntuación alta no basta para aceptar:
+        el perfil temático no dice nada de la elegibilidad.
+
+        Los textos con menos de PREFILTER_MIN_TOKENS palabras pasan siempre al LLM.
+        """
+        scores = self.score(convocatorias)
+        return [
+            False if score < self.low and not is_short(convocatoria) else None
+            for convocatoria, score in zip(convocatorias, scores)
+        ]
+
+def load_labeled(path: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Convocatorias etiquetadas (JSONL con titulo, resumen y relevante)."""
+    with open(path or PREFILTER_LABELED_FILE, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def evaluate_thresholds(
+    prefilter: RelevancePrefilter,
+    labeled: Sequence[Dict[str, Any]],
+    low: Optional[float] = None
+) -> Dict[str, float]:
+    """
+    Mide un umbral sobre un conjunto etiquetado.
+
+    Sobre PREFILTER_LABELED_FILE las cifras son del mismo conjunto con el
+    que se ajustó el umbral: sirven para detectar regresiones, no como
+    estimación de su comportamiento con convocatorias nuevas.
+
+    Returns:
+        precision_rechazo: fracción de descartadas que no eran relevantes
+        recall: fracción de relevantes que no se descartan (suponiendo que el LLM acierta en el resto)
+        al_llm: fracción de convocatorias que siguen yendo al LLM
+    """
+    low = prefilter.low if low is None else low
+    scores = prefilter.score(labeled)
+    labels = np.array([bool(item["relevante"]) for item in labeled])
+    short = np.array([is_short(item) for item in labeled], dtype=bool)
+
+    rejected = (scores < low) & ~short
+    relevant = max(1, int(labels.sum()))
+    return {
+        "umbral_bajo": low,
+        "precision_rechazo": float((~labels[rejected]).mean()) if rejected.any() else 1.0,
+        "recall": 1.0 - float((labels & rejected).sum()) / relevant,
+        "al_llm": float((~rejected).mean()) if len(labeled) else 0.0
+    }
+
+_prefilter: Optional[RelevancePrefilter] = None
+
+def get_prefilter() -> RelevancePrefilter:
+    """Prefiltro construido con COMPANY_PROFILE (una vez por proceso)."""
+    global _prefilter
+    if _prefilter is None:
+        from agents.classifier import COMPANY_PROFILE
+        _prefilter = RelevancePrefilter(COMPANY_PROFILE)
+    return _prefilter
+
+if __name__ == "__main__":
+    # python -m agents.prefilter [fichero.jsonl]: métricas del umbral actual y de alternativos.
+    # Para una estimación honesta, pasar un fichero distinto del usado para ajustar el umbral
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    prefilter = get_prefilter()
+    path = sys.argv[1] if len(sys.argv) > 1 else PREFILTER_LABELED_FILE
+    labeled = load_labeled(path)
+    logger.info(f"{len(labeled)} convocatorias etiquetadas, {sum(1 for i in labeled if i['relevante'])} relevantes")
+    if os.path.abspath(path) == os.path.abspath(PREFILTER_LABELED_FILE):
+        logger.info("Conjunto de ajuste del umbral: las cifras no estiman el rendimiento con convocatorias nuevas")
+    logger.info("bajo  prec.rechazo  recall  al LLM")
+    for low in sorted({prefilter.low, 0.05, 0.10, 0.15, 0.20}):
+        m = evaluate_thresholds(prefilter, labeled, low)
+        logger.info(f"{low:.2f}  {m['precision_rechazo']:12.2f}  {m['recall']:6.2f}  {m['al_llm']:6.0%}")
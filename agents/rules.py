@@ -0,0 +1,117 @@
+import os
+import re
+import json
+import logging
+import unicodedata
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Reglas de palabras clave evaluadas antes del prefiltro y del LLM (solo descartan)
+CLASSIFIER_RULES_FILE = os.getenv("CLASSIFIER_RULES_FILE", "reglas_clasificacion.json")
+
+# Categorías de reglas, en orden de prioridad
+RULE_CATEGORIES = ("elegibilidad", "negativas", "positivas")
+
+def normalize_text(text: str) -> str:
+    """Minúsculas y sin tildes, para que las reglas no dependan de la acentuación."""
+    text = unicodedata.normalize("NFKD", text or "")
+    return "".join(ch for ch in text if not unicodedata.combining(ch)).lower()
+
+class RuleEngine:
+    """
+    Clasificador por reglas de palabras clave.
+
+    Todas las expresiones de todas las reglas se compilan en una sola regex
+    con un grupo con nombre por regla, así que cada convocatoria se recorre
+    una única vez sea cual sea el número de reglas. Las expresiones se
+    escriben sin tildes y en minúsculas, y se buscan como palabras
+    completas.
+
+    Las reglas solo descartan; nunca aceptan, porque una palabra clave no
+    dice si la convocatoria admite empresas colombianas:
+    - Una regla de "elegibilidad" descarta la convocatoria (p.ej. exclusiva
+      de empresas españolas), aunque también coincida una positiva
+    - Solo reglas "negativas": descartada
+    - Solo reglas "positivas": sin decisión, pero afín al perfil: va al LLM
+      sin pasar por el prefiltro
+    - Positivas y negativas a la vez, o ninguna: sin decisión (sigue al
+      prefiltro y al LLM)
+    """
+
+    def __init__(self, config: Dict[str, Dict[str, List[str]]]):
+        self.rules: Dict[str, str] = {}  # grupo de la regex -> "categoría.nombre"
+        alternatives = []
+        for category in RULE_CATEGORIES:
+            for name, patterns in config.get(category, {}).items():
+                if not patterns:
+                    continue
+                group = f"r{len(self.rules)}"
+                self.rules[group] = f"{category}.{name}"
+                body = "|".join(f"(?:{normalize_text(p)})" for p in patterns)
+                alternatives.append(f"(?P<{group}>{body})")
+
+        unknown = set(config) - set(RULE_CATEGORIES)
+        if unknown:
+            logger.warning(f"Categorías de reglas desconocidas ignoradas: {', '.join(sorted(unknown))}")
+
+        self.pattern = re.compile(r"\b(?:" + "|".join(alternatives) + r")\b") if alternatives else None
+
+    def match(self, text: str) -> List[str]:
+        """Reglas que coinciden con el texto, sin repetir, en orden de aparición."""
+        if not self.pattern:
+            return []
+        fired = []
+        for m in self.pattern.finditer(normalize_text(text)):
+            rule = self.rules[m.lastgroup]
+            if rule not in fired:
+                fired.append(rule)
+        return fired
+
+    def decide(self, convocatoria: Dict[str, Any]) -> Tuple[Optional[bool], Optional[str]]:
+        """
+        Returns:
+            (False, regla que descartó), (None, regla positiva) si es afín y la
+            decide el LLM, o (None, None) si no coincide ninguna regla que decida
+        """
+        fired = self.match(f"{convocatoria.get('titulo', '')} {convocatoria.get('resumen', '')}")
+        by_category: Dict[str, List[str]] = {}
+        for rule in fired:
+            by_category.setdefault(rule.split(".", 1)[0], []).append(rule)
+
+        if "elegibilidad" in by_category:
+            return False, by_category["elegibilidad"][0]
+        if "negativas" in by_category and "positivas" in by_category:
+            return None, None
+        if "negativas" in by_category:
+            return False, by_category["negativas"][0]
+        if "positivas" in by_category:
+            return None, by_category["positivas"][0]
+        return None, None
+
+def load_rules_config(path: Optional[str] = None) -> Dict[str, Dict[str, List[str]]]:
+    """Carga las reglas desde reglas_clasificacion.json; sin fichero no hay reglas."""
+    path = path or CLASSIFIER_RULES_FILE
+    if not os.path.exists(path):
+        logger.info(f"{path} no existe: clasificación sin reglas de palabras clave")
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        logger.error(f"{path} no se pudo leer: {e}")
+        return {}
+
+_engine: Optional[RuleEngine] = None
+
+def get_rule_engine() -> RuleEngine:
+    """Motor de reglas configurado (se compila una vez por proceso)."""
+    global _engine
+    if _engine is None:
+        try:
+            _engine = RuleEngine(load_rules_config())
+        except re.error as e:
+            logger.error(f"Regla de clasificación inválida: {e}")
+            _engine = RuleEngine({})
+        logger.debug(f"Motor de reglas compilado: {len(_engine.rules)} reglas")
+    return _engine
@@ -0,0 +1,131 @@
+import os
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+from agents.database import get_portal_states, save_portal_states
+
+logger = logging.getLogger(__name__)
+
+# "full" scrapea todos los portales; "incremental" solo los que toca según su estado
+SCHEDULER_MODE = os.getenv("SCHEDULER_MODE", "full").lower()
+# Intervalo entre visitas a un portal: se reduce cuando su listado cambia y se
+# alarga cuando no, entre estos límites (un portal estático acaba siendo semanal)
+SCHEDULER_MIN_HOURS = float(os.getenv("SCHEDULER_MIN_HOURS", "3"))
+SCHEDULER_MAX_HOURS = float(os.getenv("SCHEDULER_MAX_HOURS", "168"))
+# Margen para que una ejecución periódica no deje para la siguiente un portal que vence justo después
+SCHEDULER_GRACE_MINUTES = float(os.getenv("SCHEDULER_GRACE_MINUTES", "30"))
+# Peso de la última ejecución en la latencia media (media móvil exponencial)
+LATENCY_SMOOTHING = 0.3
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+def _parse(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+def _fixed_interval(portal: Any) -> Optional[float]:
+    """Intervalo fijo configurado con "interval_hours" en portales.json."""
+    if isinstance(portal, dict) and portal.get("interval_hours"):
+        return float(portal["interval_hours"])
+    return None
+
+def next_portal_state(
+    previous: Optional[Dict[str, Any]],
+    timing: Dict[str, Any],
+    portal: Any = None,
+    now: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """
+    Estado de un portal tras una ejecución, a partir de sus tiempos.
+
+    - Listado cambiado (huella distinta): el intervalo se reduce a la mitad
+    - Listado igual: el intervalo se duplica
+    - Error: el intervalo se conserva y se reintenta antes, con espera
+      exponencial según los errores seguidos
+
+    Con "interval_hours" en la configuración del portal el intervalo es fijo.
+    """
+    now = now or _now()
+    previous = previous or {}
+    interval = previous.get("intervalo_horas") or SCHEDULER_MIN_HOURS
+    latency = timing.get("total", 0.0)
+    average = previous.get("latencia_media")
+    state = {
+        "ultima_ejecucion": now.isoformat(),
+        "huella": previous.get("huella"),
+        "convocatorias": previous.get("convocatorias") or 0,
+        "errores_seguidos": 0,
+        "latencia_media": latency if average is None else (1 - LATENCY_SMOOTHING) * average + LATENCY_SMOOTHING * latency
+    }
+
+    fixed = _fixed_interval(portal)
+    if timing.get("error"):
+        state["errores_seguidos"] = (previous.get("errores_seguidos") or 0) + 1
+        delay = min(fixed or interval, SCHEDULER_MIN_HOURS * 2 ** (state["errores_seguidos"] - 1))
+    else:
+        huella = timing.get("huella")
+        if huella is not None and huella != previous.get("huella"):
+            interval = max(SCHEDULER_MIN_HOURS, interval / 2)
+            state["huella"] = huella
+            state["convocatorias"] = timing.get("convocatorias", 0)
+        else:
+            interval = min(SCHEDULER_MAX_HOURS, interval * 2)
+        delay = fixed or interval
+
+    state["intervalo_horas"] = fixed or interval
+    state["proxima_ejecucion"] = (now + timedelta(hours=delay)).isoformat()
+    return state
+
+def record_portal_runs(timings: List[Dict[str, Any]], portales: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Actualiza el estado de los portales con los tiempos de una ejecución.
+
+    Los portales omitidos (circuito abierto o límite de la ejecución) no se
+    visitaron: conservan su estado y siguen pendientes.
+    """
+    timings = [t for t in timings if not t.get("omitido")]
+    if not timings:
+        return
+    portales = portales or {}
+    previous = get_portal_states()
+    now = _now()
+    states = {
+        t["portal"]: next_portal_state(previous.get(t["portal"]), t, portales.get(t["portal"]), now)
+        for t in timings
+    }
+    save_portal_states(states)
+
+def due_portals(
+    portales: Dict[str, Any],
+    now: Optional[datetime] = None,
+    states: Optional[Dict[str, Dict[str, Any]]] = None
+) -> Dict[str, Any]:
+    """Portales cuya próxima ejecución llega antes de SCHEDULER_GRACE_MINUTES (o que nunca se han visitado)."""
+    now = now or _now()
+    states = get_portal_states() if states is None else states
+    limit = now + timedelta(minutes=SCHEDULER_GRACE_MINUTES)
+    due = {}
+    upcoming = []
+    for key, portal in portales.items():
+        next_run = _parse((states.get(key) or {}).get("proxima_ejecucion"))
+        if next_run is None or next_run <= limit:
+            due[key] = portal
+        else:
+            upcoming.append((next_run, key))
+
+    if upcoming:
+        next_run, key = min(upcoming)
+        logger.info(
+            f"🗓️ Planificador: {len(due)} de {len(portales)} portales pendientes; "
+            f"el siguiente es {key} en {(next_run - now).total_seconds() / 3600:.1f}h"
+        )
+    else:
+        logger.info(f"🗓️ Planificador: {len(due)} de {len(portales)} portales pendientes")
+    return due
+
+def select_portals(portales: Dict[str, Any], mode: Optional[str] = None) -> Dict[str, Any]:
+    """Portales a scrapear en esta ejecución según SCHEDULER_MODE."""
+    mode = (mode or SCHEDULER_MODE).lower()
+    if mode == "incremental":
+        return due_portals(portales)
+    return portales
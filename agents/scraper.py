@@ -1,22 +1,63 @@
 import os
 import json
+import time
 import logging
-from typing import List, Dict, Any
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple, Union
 from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.schema import HumanMessage
-from urllib.parse import urljoin
-from utils.retry import robust_http_request, retry_with_backoff
+from urllib.parse import urljoin, urlparse, urlsplit, urlunsplit, parse_qsl, urlencode
+from agents.database import filter_new_urls, save_feed_lastmod
+from agents.extractors import run_local_extractor
+from agents.feeds import is_feed_portal, scrape_feed
+from agents.template_learner import apply_learned_template, learn_template
+from utils.llm_cache import cached_llm_invoke, invalidate_cached_response
+from utils.retry import robust_http_request
+from utils.circuit_breaker import RequestSkipped
+from utils.http_cache import remember_validators, hash_body
+from utils.html_reducer import reduce_html, find_next_page_url
+from utils.rate_limit import CHARS_PER_TOKEN, get_gemini_rate_limiter
+from utils.urls import normalize_url, canonicalize_url
 
 logger = logging.getLogger(__name__)
 
+# Concurrencia del scraping (global y por host)
+SCRAPER_CONCURRENT = os.getenv("SCRAPER_CONCURRENT", "true").lower() in ("1", "true", "yes")
+SCRAPER_MAX_WORKERS = int(os.getenv("SCRAPER_MAX_WORKERS", "8"))
+SCRAPER_PER_HOST_LIMIT = int(os.getenv("SCRAPER_PER_HOST_LIMIT", "2"))
+
+# Presupuesto de tokens de contenido por portal (configurable por portal con "token_budget")
+SCRAPER_PORTAL_TOKEN_BUDGET = int(os.getenv("SCRAPER_PORTAL_TOKEN_BUDGET", "20000"))
+# Tamaño y solapamiento de los fragmentos enviados al LLM
+SCRAPER_CHUNK_TOKENS = int(os.getenv("SCRAPER_CHUNK_TOKENS", "4000"))
+SCRAPER_CHUNK_OVERLAP_TOKENS = int(os.getenv("SCRAPER_CHUNK_OVERLAP_TOKENS", "200"))
+SCRAPER_CHUNK_WORKERS = int(os.getenv("SCRAPER_CHUNK_WORKERS", "3"))
+
+# Páginas máximas por portal paginado (configurable por portal con "max_pages")
+PAGINATION_MAX_PAGES = int(os.getenv("PAGINATION_MAX_PAGES", "5"))
+
 # Inicializamos el modelo LLM una sola vez
 llm = ChatGoogleGenerativeAI(
     model="gemini-2.0-flash",
     temperature=0,
-    google_api_key=os.getenv("GOOGLE_API_KEY")
+    google_api_key=os.getenv("GOOGLE_API_KEY"),
+    max_retries=1  # Un solo intento: los reintentos los hace utils.llm_cache
 )
 
-def load_portals_config() -> Dict[str, str]:
+class PartialExtractionError(Exception):
+    """
+    Algún fragmento de la página no se pudo extraer con el LLM.
+
+    Lleva en `convocatorias` lo extraído de los demás fragmentos: se
+    procesa, pero la página no se recuerda ni se aprende su plantilla, de
+    modo que se vuelve a extraer en la siguiente ejecución.
+    """
+
+    def __init__(self, message: str, convocatorias: List[Dict[str, Any]]):
+        super().__init__(message)
+        self.convocatorias = convocatorias
+
+def load_portals_config() -> Dict[str, Any]:
     """Carga la configuración de portales desde portales.json."""
     try:
         with open("portales.json", "r", encoding="utf-8") as f:
@@ -32,21 +73,101 @@ def load_portals_config() -> Dict[str, str]:
 
 PORTALES = load_portals_config()
 
-@retry_with_backoff(max_retries=2, base_delay=1.0, exceptions=(Exception,))
-def extract_convocatorias_with_llm(html_content: str, base_url: str) -> List[Dict[str, Any]]:
+def get_portal_settings(portal: Union[str, Dict[str, Any]]) -> Dict[str, Any]:
     """
-    Usa un LLM para extraer convocatorias de un contenido HTML.
+    Normaliza la entrada de un portal en portales.json.
+
+    Un portal puede ser solo su URL o un objeto con "url" y opciones
+    adicionales:
+        token_budget: tokens de contenido a procesar por página
+        extractor: reglas de un extractor local, p.ej. {"type": "css", "item": "..."}
+        pagination: {"param": "page", "first": 1, "max_pages": 5},
+            {"url_template": "https://...?p={page}", "first": 1} o
+            {"follow_next": true} para seguir el enlace "siguiente"
+        type: "feed" (RSS/Atom) o "sitemap" para leer el portal como XML
+            sin LLM, con url_pattern y max_items opcionales (ver agents.feeds)
+        interval_hours: horas fijas entre visitas en modo incremental (ver agents.scheduler)
+    """
+    if isinstance(portal, str):
+        return {"url": portal}
+    return dict(portal)
+
+def split_into_chunks(content: str, chunk_chars: int, overlap_chars: int) -> List[str]:
+    """
+    Divide el contenido reducido en fragmentos solapados por líneas.
+
+    Cada fragmento empieza con las últimas líneas del anterior (hasta
+    `overlap_chars`) para no partir una convocatoria entre dos fragmentos.
+    """
+    lines = []
+    for line in content.split("\n"):
+        # Líneas más largas que un fragmento se cortan en trozos
+        while len(line) > chunk_chars:
+            lines.append(line[:chunk_chars])
+            line = line[chunk_chars:]
+        lines.append(line)
+
+    chunks = []
+    current: List[str] = []
+    size = 0
+    has_new_lines = False
+    for line in lines:
+        if has_new_lines and size + len(line) + 1 > chunk_chars:
+            chunks.append("\n".join(current))
+            overlap: List[str] = []
+            overlap_size = 0
+            for previous in reversed(current):
+                if overlap_size + len(previous) + 1 > overlap_chars:
+                    break
+                overlap.insert(0, previous)
+                overlap_size += len(previous) + 1
+            current, size, has_new_lines = overlap, overlap_size, False
+        current.append(line)
+        size += len(line) + 1
+        has_new_lines = True
+
+    # El último fragmento solo se añade si tiene algo más que el solapamiento
+    if has_new_lines:
+        chunks.append("\n".join(current))
+    return chunks
+
+def merge_convocatorias(lists: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    Une las convocatorias de varios fragmentos, sin duplicados por URL normalizada.
+
+    Se conserva la primera aparición, completando su resumen con el de una
+    aparición posterior si estaba vacío.
+    """
+    merged: Dict[str, Dict[str, Any]] = {}
+    for convocatorias in lists:
+        for c in convocatorias:
+            key = normalize_url(c["url"])
+            if key not in merged:
+                merged[key] = c
+            elif not merged[key].get("resumen") and c.get("resumen"):
+                merged[key]["resumen"] = c["resumen"]
+    return list(merged.values())
+
+def listing_fingerprint(convocatorias: List[Dict[str, Any]]) -> str:
+    """
+    Huella del listado de un portal: hash de sus URLs canónicas ordenadas.
+
+    A diferencia del hash del HTML, no cambia con contadores, fechas de
+    página o tokens de sesión, solo cuando aparecen o desaparecen convocatorias.
+    """
+    urls = sorted({canonicalize_url(c["url"]) for c in convocatorias if c.get("url")})
+    return hash_body("\n".join(urls).encode("utf-8"))
+
+def extract_chunk_with_llm(chunk: str, base_url: str) -> Optional[List[Dict[str, Any]]]:
+    """
+    Usa un LLM para extraer convocatorias de un fragmento de contenido reducido.
+
+    Returns:
+        Convocatorias del fragmento, o None si la llamada o su respuesta fallaron
     """
-    logger.debug(f"Extrayendo convocatorias con LLM para: {base_url}")
-    
-    # Limitar el contenido HTML para evitar tokens excesivos
-    max_html_length = 15000
-    truncated_html = html_content[:max_html_length]
-    if len(html_content) > max_html_length:
-        logger.warning(f"HTML truncado de {len(html_content)} a {max_html_length} caracteres")
-    
     prompt = f"""
-    Eres un asistente experto en web scraping. Analiza el siguiente contenido HTML y extrae todas las convocatorias, ayudas o subvenciones que encuentres.
+    Eres un asistente experto en web scraping. Analiza el siguiente contenido de una página web y extrae todas las convocatorias, ayudas o subvenciones que encuentres.
+    El contenido es el texto visible de la página, un bloque por línea, con los enlaces en formato [texto](url).
 
     Para cada convocatoria, extrae:
     1.  `titulo`: El nombre o título principal de la convocatoria.
@@ -57,15 +178,14 @@ def extract_convocatorias_with_llm(html_content: str, base_url: str) -> List[Dic
 
     Si no encuentras ninguna convocatoria, devuelve un array JSON vacío: [].
 
-    HTML:
-    ```html
-    {truncated_html}
+    Contenido:
+    ```
+    {chunk}
     ```
     """
     
     try:
-        response = llm.invoke([HumanMessage(content=prompt)])
-        clean_response = response.content.strip()
+        clean_response = cached_llm_invoke(llm, prompt, rate_limiter=get_gemini_rate_limiter()).strip()
         
         # Limpiar respuesta del LLM
         if clean_response.startswith("```json"):
@@ -78,7 +198,8 @@ def extract_convocatorias_with_llm(html_content: str, base_url: str) -> List[Dic
         
         if not isinstance(convocatorias, list):
             logger.warning(f"LLM no devolvió una lista para {base_url}")
-            return []
+            invalidate_cached_response(llm, prompt)
+            return None
 
         # Validar y normalizar URLs
         valid_convocatorias = []
@@ -98,49 +219,473 @@ def extract_convocatorias_with_llm(html_content: str, base_url: str) -> List[Dic
         
     except json.JSONDecodeError as e:
         logger.error(f"Error decodificando JSON de LLM para {base_url}: {e}")
+        # No conservar en caché una respuesta que no se puede interpretar
+        invalidate_cached_response(llm, prompt)
         logger.debug(f"Respuesta problemática: {clean_response[:200]}...")
-        return []
+        return None
     except Exception as e:
         logger.error(f"Error procesando respuesta del LLM para {base_url}: {e}")
-        return []
+        return None
 
-def scrape_portals() -> List[Dict[str, Any]]:
+def extract_convocatorias_with_llm(html_content: str, base_url: str, token_budget: Optional[int] = None) -> List[Dict[str, Any]]:
     """
-    Recorre la lista de portales, obtiene su HTML y usa el LLM para extraer la información.
+    Usa un LLM para extraer convocatorias de un contenido HTML.
+    
+    El HTML se reduce a texto con enlaces, se limita al presupuesto de tokens
+    del portal y se divide en fragmentos solapados que se extraen en paralelo.
+    Las convocatorias de todos los fragmentos se unen sin duplicados.
+    
+    Args:
+        html_content: HTML de la página
+        base_url: URL de la página
+        token_budget: Tokens de contenido a procesar (por defecto, SCRAPER_PORTAL_TOKEN_BUDGET)
+    
+    Raises:
+        PartialExtractionError: si falló algún fragmento, con lo extraído del resto
     """
-    if not PORTALES:
-        logger.error("No hay portales configurados para scrapear")
-        return []
+    logger.debug(f"Extrayendo convocatorias con LLM para: {base_url}")
     
-    result = []
-    total_portales = len(PORTALES)
+    # Reducir el HTML a texto con enlaces y aplicar el presupuesto sobre el resultado
+    content = reduce_html(html_content, base_url)
+    if not content.strip():
+        # Páginas sin texto visible (p.ej. renderizadas con JS): usar el HTML tal cual
+        content = html_content
+    logger.debug(f"HTML reducido de {len(html_content)} a {len(content)} caracteres")
     
-    logger.info(f"Iniciando scraping de {total_portales} portales")
+    max_chars = (token_budget or SCRAPER_PORTAL_TOKEN_BUDGET) * CHARS_PER_TOKEN
+    if len(content) > max_chars:
+        logger.warning(f"Contenido truncado de {len(content)} a {max_chars} caracteres (presupuesto del portal)")
+        content = content[:max_chars]
     
-    for key, url in PORTALES.items():
-        logger.info(f"Scrapeando {key} ({url})")
-        
-        try:
-            # Usar función robusta con reintentos
-            response = robust_http_request(url)
-            
-            if not response.text.strip():
-                logger.warning(f"Respuesta vacía de {key}")
-                continue
-            
-            convocatorias = extract_convocatorias_with_llm(response.text, url)
-            
-            # Agregar fuente a cada convocatoria
+    chunks = split_into_chunks(
+        content,
+        SCRAPER_CHUNK_TOKENS * CHARS_PER_TOKEN,
+        SCRAPER_CHUNK_OVERLAP_TOKENS * CHARS_PER_TOKEN
+    )
+    
+    if len(chunks) == 1:
+        results = [extract_chunk_with_llm(chunks[0], base_url)]
+    else:
+        logger.info(f"Extrayendo {base_url} en {len(chunks)} fragmentos")
+        with ThreadPoolExecutor(max_workers=min(SCRAPER_CHUNK_WORKERS, len(chunks)), thread_name_prefix="chunks") as executor:
+            results = list(executor.map(lambda chunk: extract_chunk_with_llm(chunk, base_url), chunks))
+    
+    extraidos = [r for r in results if r is not None]
+    convocatorias = merge_convocatorias(extraidos)
+    logger.debug(f"{sum(len(r) for r in extraidos)} convocatorias extraídas, {len(convocatorias)} tras eliminar duplicados")
+    
+    fallidos = len(results) - len(extraidos)
+    if fallidos:
+        raise PartialExtractionError(f"{fallidos}/{len(results)} fragmentos sin extraer en {base_url}", convocatorias)
+    return convocatorias
+
+def extract_page(
+    html_content: str,
+    url: str,
+    settings: Dict[str, Any],
+    portal: Optional[str] = None
+) -> Tuple[List[Dict[str, Any]], str]:
+    """
+    Extrae las convocatorias de una página de un portal.
+
+    Orden de preferencia:
+        1. Extractor local configurado en portales.json
+        2. Plantilla aprendida del portal, si la estructura de la página no cambió
+        3. LLM; tras una extracción correcta se (re)aprende la plantilla
+
+    Returns:
+        Tupla (convocatorias, método usado: "local", "plantilla" o "llm")
+
+    Raises:
+        PartialExtractionError: si el LLM falló en algún fragmento (sin aprender plantilla)
+    """
+    convocatorias = run_local_extractor(html_content, url, settings)
+    if convocatorias:
+        return convocatorias, "local"
+    if convocatorias is not None:
+        logger.warning(f"El extractor local no encontró convocatorias en {url}, se usa el LLM")
+
+    if portal:
+        convocatorias = apply_learned_template(portal, html_content, url)
+        if convocatorias:
+            return convocatorias, "plantilla"
+
+    convocatorias = extract_convocatorias_with_llm(html_content, url, settings.get("token_budget"))
+    if portal and convocatorias and not settings.get("extractor"):
+        learn_template(portal, html_content, url, convocatorias)
+    return convocatorias, "llm"
+
+class HostLimiter:
+    """Limita el número de peticiones simultáneas a un mismo host."""
+
+    def __init__(self, per_host_limit: int):
+        self.per_host_limit = max(1, per_host_limit)
+        self._semaphores: Dict[str, threading.Semaphore] = {}
+        self._lock = threading.Lock()
+
+    def for_url(self, url: str) -> threading.Semaphore:
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.Semaphore(self.per_host_limit)
+            return self._semaphores[host]
+
+def build_page_urls(url: str, pagination: Dict[str, Any], max_pages: int) -> List[str]:
+    """
+    Construye las URLs de las páginas 2..max_pages de un listado paginado.
+
+    Con "param" se fija ese parámetro de la query; con "url_template" se
+    sustituye {page}. "first" es el número de la primera página (1 por
+    defecto; 0 en portales tipo Drupal).
+    """
+    first = int(pagination.get("first", 1))
+    numbers = range(first + 1, first + max_pages)
+
+    if pagination.get("url_template"):
+        return [pagination["url_template"].format(page=n) for n in numbers]
+
+    param = pagination.get("param", "page")
+    parts = urlsplit(url)
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k != param]
+    return [
+        urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query + [(param, str(n))]), ""))
+        for n in numbers
+    ]
+
+def is_stale_page(convocatorias: List[Dict[str, Any]]) -> bool:
+    """Una página está agotada si no aporta convocatorias o todas ya están en la BD."""
+    if not convocatorias:
+        return True
+    return not filter_new_urls(c["url"] for c in convocatorias)
+
+def page_checkpoint(url: str, response: Any, convocatorias: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Validadores HTTP de una página procesada, pendientes de confirm_checkpoints."""
+    return {
+        "pagina": url,
+        "validadores": getattr(response, "cache_validators", None),
+        "urls": [c["url"] for c in convocatorias]
+    }
+
+def confirm_checkpoints(timings: List[Dict[str, Any]]) -> int:
+    """
+    Guarda los validadores HTTP de las páginas procesadas en la ejecución y
+    el último lastmod leído de cada feed.
+
+    Una página o feed solo se recuerda si todas sus convocatorias ya están en la BD
+    (notificadas, descartadas o duplicadas). Si alguna se perdió por el
+    camino (error del LLM, fallo antes de persistir), la página se vuelve a
+    descargar y extraer en la siguiente ejecución en lugar de quedar oculta
+    tras un 304 o un lastmod ya superado. Se puede llamar en cualquier
+    momento: lo no persistido simplemente no se confirma.
+
+    Args:
+        timings: Tiempos por portal de scrape_single_portal, con sus "confirmaciones"
+
+    Returns:
+        Páginas y feeds confirmados
+    """
+    confirmaciones = [c for t in timings for c in t.get("confirmaciones") or []]
+    if not confirmaciones:
+        return 0
+
+    pendientes = filter_new_urls(url for c in confirmaciones for url in c["urls"])
+    confirmadas = 0
+    for confirmacion in confirmaciones:
+        if pendientes.intersection(confirmacion["urls"]):
+            continue
+        if "feed" in confirmacion:
+            save_feed_lastmod(confirmacion["feed"], confirmacion["lastmod"])
+        else:
+            remember_validators(confirmacion["pagina"], confirmacion["validadores"])
+        confirmadas += 1
+
+    if confirmadas < len(confirmaciones):
+        logger.info(f"{len(confirmaciones) - confirmadas} páginas o feeds con convocatorias sin guardar: se volverán a procesar")
+    return confirmadas
+
+def fetch_and_extract_page(
+    url: str,
+    settings: Dict[str, Any],
+    host_limiter: Optional[HostLimiter] = None,
+    portal: Optional[str] = None,
+    checkpoints: Optional[List[Dict[str, Any]]] = None
+) -> Tuple[List[Dict[str, Any]], Optional[Any]]:
+    """
+    Descarga una página de un listado y extrae sus convocatorias.
+
+    Los validadores de la página se añaden a `checkpoints` en lugar de
+    guardarse: se confirman cuando sus convocatorias estén en la BD.
+
+    Returns:
+        Tupla (convocatorias, respuesta); la respuesta es None si la descarga falló
+    """
+    try:
+        response = robust_http_request(url, conditional=True, slot=host_limiter.for_url(url) if host_limiter else None)
+    except Exception as e:
+        logger.warning(f"Error descargando página {url}: {e}")
+        return [], None
+
+    if response.not_modified or not response.text.strip():
+        return [], response
+
+    try:
+        convocatorias, _ = extract_page(response.text, url, settings, portal)
+    except PartialExtractionError as e:
+        # Sin confirmación: la página se vuelve a extraer en la siguiente ejecución
+        logger.warning(f"Extracción incompleta de {url}: {e}")
+        return e.convocatorias, response
+    if convocatorias and checkpoints is not None:
+        checkpoints.append(page_checkpoint(url, response, convocatorias))
+    return convocatorias, response
+
+def crawl_pagination(
+    key: str,
+    settings: Dict[str, Any],
+    first_html: str,
+    first_items: List[Dict[str, Any]],
+    host_limiter: Optional[HostLimiter] = None,
+    checkpoints: Optional[List[Dict[str, Any]]] = None
+) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Recorre las páginas siguientes de un portal paginado.
+
+    Se detiene al llegar a max_pages o en la primera página que no aporta
+    convocatorias nuevas (vacía, sin cambios o con todas sus URLs ya en la
+    BD), de modo que cada día solo se recorre la parte reciente del listado.
+    Con "param"/"url_template" las páginas se piden en oleadas concurrentes
+    del tamaño del límite por host; con "follow_next" se recorren en orden.
+    Los validadores de cada página se añaden a `checkpoints`.
+
+    Returns:
+        Tupla (convocatorias de las páginas adicionales, páginas descargadas)
+    """
+    pagination = settings["pagination"]
+    max_pages = int(pagination.get("max_pages", PAGINATION_MAX_PAGES))
+
+    if max_pages <= 1 or is_stale_page(first_items):
+        return [], 0
+
+    collected: List[Dict[str, Any]] = []
+    fetched = 0
+
+    if pagination.get("follow_next"):
+        html, current_url = first_html, settings["url"]
+        for _ in range(max_pages - 1):
+            next_url = find_next_page_url(html, current_url)
+            if not next_url or normalize_url(next_url) == normalize_url(current_url):
+                break
+            items, response = fetch_and_extract_page(next_url, settings, host_limiter, key, checkpoints)
+            fetched += 1
+            collected.extend(items)
+            if response is None or is_stale_page(items):
+                break
+            html, current_url = response.text, next_url
+    else:
+        page_urls = build_page_urls(settings["url"], pagination, max_pages)
+        wave_size = host_limiter.per_host_limit if host_limiter else 1
+        for start in range(0, len(page_urls), wave_size):
+            wave = page_urls[start:start + wave_size]
+            with ThreadPoolExecutor(max_workers=len(wave), thread_name_prefix="pages") as executor:
+                results = list(executor.map(
+                    lambda page_url: fetch_and_extract_page(page_url, settings, host_limiter, key, checkpoints), wave
+                ))
+            fetched += len(wave)
+
+            stop = False
+            for items, response in results:
+                collected.extend(items)
+                if response is None or is_stale_page(items):
+                    stop = True
+                    break
+            if stop:
+                break
+
+    logger.info(f"📄 {key}: {fetched} páginas adicionales, {len(collected)} convocatorias")
+    return collected, fetched
+
+def scrape_single_portal(
+    key: str,
+    portal: Union[str, Dict[str, Any]],
+    host_limiter: Optional[HostLimiter] = None
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Scrapea un portal: descarga su HTML y extrae las convocatorias con su
+    extractor local o con el LLM. Los portales de tipo feed o sitemap se
+    leen directamente como XML.
+
+    Solo cada intento de descarga ocupa un hueco del límite por host; las
+    esperas entre reintentos y la extracción se ejecutan fuera del semáforo
+    para solaparse con otras descargas.
+
+    Los validadores HTTP de las páginas procesadas (y el lastmod de los
+    feeds) quedan en timing["confirmaciones"] y no se guardan hasta
+    confirm_checkpoints, después de persistir las convocatorias.
+
+    Args:
+        key: Nombre del portal
+        portal: URL o configuración del portal (ver get_portal_settings)
+        host_limiter: Limitador de descargas simultáneas por host
+
+    Returns:
+        Tupla (convocatorias, tiempos del portal)
+    """
+    settings = get_portal_settings(portal)
+    url = settings["url"]
+    # huella=None indica que el listado no cambió (o no se pudo leer)
+    timing = {"portal": key, "fetch": 0.0, "extract": 0.0, "total": 0.0, "convocatorias": 0,
+              "paginas": 1, "metodo": None, "sin_cambios": False, "error": None, "huella": None, "omitido": None,
+              "confirmaciones": []}
+    start = time.perf_counter()
+    logger.info(f"Scrapeando {key} ({url})")
+
+    try:
+        if is_feed_portal(settings):
+            convocatorias, timing["paginas"] = scrape_feed(key, settings, host_limiter, timing["confirmaciones"])
+            timing["fetch"] = time.perf_counter() - start
+            timing["metodo"] = settings["type"]
             for c in convocatorias:
                 c["fuente"] = key
-                result.append(c)
-            
-            logger.info(f"✅ {key}: {len(convocatorias)} convocatorias encontradas")
+            timing["convocatorias"] = len(convocatorias)
+            # Un feed solo devuelve entradas posteriores a la última ejecución
+            if convocatorias:
+                timing["huella"] = listing_fingerprint(convocatorias)
+            return convocatorias, timing
 
-        except Exception as e:
-            logger.error(f"Error scrapeando {key}: {e}")
-            continue
+        response = robust_http_request(url, conditional=True, slot=host_limiter.for_url(url) if host_limiter else None)
+        timing["fetch"] = time.perf_counter() - start
 
-    logger.info(f"Scraping completado: {len(result)} convocatorias totales de {total_portales} portales")
-    return result
+        # Página idéntica a la última procesada: sus convocatorias ya se vieron
+        if response.not_modified:
+            logger.info(f"⏭️ {key}: sin cambios desde la última ejecución, se omite la extracción")
+            timing["sin_cambios"] = True
+            return [], timing
+
+        if not response.text.strip():
+            logger.warning(f"Respuesta vacía de {key}")
+            return [], timing
+
+        extract_start = time.perf_counter()
+        completa = True
+        try:
+            convocatorias, timing["metodo"] = extract_page(response.text, url, settings, key)
+        except PartialExtractionError as e:
+            logger.warning(f"Extracción incompleta de {key}: {e}")
+            convocatorias, timing["metodo"], completa = e.convocatorias, "llm", False
+        timing["extract"] = time.perf_counter() - extract_start
+
+        # Agregar fuente a cada convocatoria
+        for c in convocatorias:
+            c["fuente"] = key
+
+        # Solo se recordará la página si la extracción fue completa y produjo resultados
+        if convocatorias and completa:
+            timing["confirmaciones"].append(page_checkpoint(url, response, convocatorias))
+
+        if settings.get("pagination"):
+            pagination_start = time.perf_counter()
+            more, pages = crawl_pagination(key, settings, response.text, convocatorias, host_limiter, timing["confirmaciones"])
+            convocatorias = merge_convocatorias([convocatorias, more])
+            timing["paginas"] += pages
+            timing["extract"] += time.perf_counter() - pagination_start
+
+        timing["convocatorias"] = len(convocatorias)
+        timing["huella"] = listing_fingerprint(convocatorias)
+        logger.info(f"✅ {key}: {len(convocatorias)} convocatorias encontradas")
+        return convocatorias, timing
+
+    except RequestSkipped as e:
+        # Circuito abierto o sin tiempo: el portal queda pendiente para la siguiente ejecución
+        logger.warning(f"⏭️ {key}: omitido ({e})")
+        timing["omitido"] = str(e)
+        return [], timing
+
+    except Exception as e:
+        logger.error(f"Error scrapeando {key}: {e}")
+        timing["error"] = str(e)
+        return [], timing
+
+    finally:
+        timing["total"] = time.perf_counter() - start
+
+def log_scrape_timings(timings: List[Dict[str, Any]]) -> None:
+    """Log de tiempos por portal, del más lento al más rápido."""
+    logger.info("=== TIEMPOS POR PORTAL ===")
+    for t in sorted(timings, key=lambda t: t["total"], reverse=True):
+        if t["error"]:
+            estado = f"error: {t['error']}"
+        elif t.get("omitido"):
+            estado = f"omitido: {t['omitido']}"
+        elif t["sin_cambios"]:
+            estado = "sin cambios"
+        else:
+            estado = f"{t['convocatorias']} convocatorias en {t['paginas']} página(s) ({t['metodo']})"
+        logger.info(
+            f"{t['portal']}: total {t['total']:.2f}s "
+            f"(descarga {t['fetch']:.2f}s, extracción {t['extract']:.2f}s) - {estado}"
+        )
 
+def scrape_portals_with_timings(
+    portales: Optional[Dict[str, Any]] = None,
+    concurrent: Optional[bool] = None,
+    max_workers: Optional[int] = None,
+    per_host_limit: Optional[int] = None
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Scrapea los portales y devuelve las convocatorias junto con los tiempos por portal.
+
+    Args:
+        portales: Diccionario nombre -> URL o configuración (por defecto, PORTALES)
+        concurrent: Procesar portales en paralelo (por defecto, SCRAPER_CONCURRENT)
+        max_workers: Máximo de portales procesados simultáneamente
+        per_host_limit: Máximo de descargas simultáneas a un mismo host
+
+    Returns:
+        Tupla (convocatorias, tiempos por portal)
+    """
+    portales = PORTALES if portales is None else portales
+    concurrent = SCRAPER_CONCURRENT if concurrent is None else concurrent
+    max_workers = max_workers or SCRAPER_MAX_WORKERS
+    per_host_limit = per_host_limit or SCRAPER_PER_HOST_LIMIT
+
+    if not portales:
+        logger.error("No hay portales configurados para scrapear")
+        return [], []
+
+    total_portales = len(portales)
+    start = time.perf_counter()
+
+    if concurrent and total_portales > 1:
+        workers = min(max_workers, total_portales)
+        logger.info(f"Iniciando scraping concurrente de {total_portales} portales ({workers} workers, {per_host_limit} por host)")
+        host_limiter = HostLimiter(per_host_limit)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scraper") as executor:
+            # map conserva el orden de los portales en el resultado
+            outcomes = list(executor.map(
+                lambda item: scrape_single_portal(item[0], item[1], host_limiter),
+                portales.items()
+            ))
+    else:
+        logger.info(f"Iniciando scraping de {total_portales} portales")
+        outcomes = [scrape_single_portal(key, portal) for key, portal in portales.items()]
+
+    result = []
+    timings = []
+    for convocatorias, timing in outcomes:
+        result.extend(convocatorias)
+        timings.append(timing)
+
+    log_scrape_timings(timings)
+    logger.info(
+        f"Scraping completado: {len(result)} convocatorias totales de {total_portales} portales "
+        f"en {time.perf_counter() - start:.2f}s"
+    )
+    return result, timings
+
+def scrape_portals(**kwargs) -> List[Dict[str, Any]]:
+    """
+    Recorre la lista de portales, obtiene su HTML y usa el LLM para extraer la información.
+
+    Acepta los mismos argumentos que scrape_portals_with_timings.
+    """
+    result, _ = scrape_portals_with_timings(**kwargs)
+    return result
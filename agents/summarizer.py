@@ -1,20 +1,26 @@
 import os
+import time
 import logging
-from typing import List, Dict, Any
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional
 from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.schema import HumanMessage
-from utils.retry import retry_with_backoff
+from utils.llm_cache import cached_llm_invoke
+from utils.rate_limit import GEMINI_RPM, GEMINI_TPM, RateLimiter, get_gemini_rate_limiter
 
 logger = logging.getLogger(__name__)
 
+# Resúmenes en paralelo, limitados por la cuota de Gemini (utils.rate_limit)
+SUMMARIZER_MAX_WORKERS = int(os.getenv("SUMMARIZER_MAX_WORKERS", "4"))
+
 llm = ChatGoogleGenerativeAI(
     model="gemini-2.0-flash", 
     temperature=0, 
-    google_api_key=os.getenv("GOOGLE_API_KEY")
+    google_api_key=os.getenv("GOOGLE_API_KEY"),
+    max_retries=1  # Un solo intento: los reintentos los hace utils.llm_cache
 )
 
-@retry_with_backoff(max_retries=2, base_delay=0.5, exceptions=(Exception,))
-def summarize_single_convocatoria(convocatoria: Dict[str, Any]) -> str:
+def summarize_single_convocatoria(convocatoria: Dict[str, Any], rate_limiter: Optional[RateLimiter] = None) -> str:
     """Genera un resumen para una sola convocatoria."""
     try:
         titulo = convocatoria.get('titulo', 'Convocatoria sin título')
@@ -39,8 +45,7 @@ Información disponible:
 Formato: Párrafo conciso y profesional.
 """
         
-        response = llm.invoke([HumanMessage(content=prompt)])
-        resumen = response.content.strip()
+        resumen = cached_llm_invoke(llm, prompt, rate_limiter=rate_limiter).strip()
         
         if not resumen:
             logger.warning(f"Resumen vacío para: {titulo[:50]}...")
@@ -53,12 +58,40 @@ Formato: Párrafo conciso y profesional.
         logger.error(f"Error generando resumen para {convocatoria.get('titulo', 'Sin título')}: {e}")
         return f"Error generando resumen. Ver detalles en: {convocatoria.get('url', '')}"
 
-def summarize_relevant(convocatorias: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+def summarize_convocatoria(convocatoria: Dict[str, Any], rate_limiter: Optional[RateLimiter] = None) -> Dict[str, Any]:
+    """Devuelve la convocatoria lista para notificar, con su resumen generado."""
+    resumida = {
+        "titulo": convocatoria.get("titulo", "Sin título"),
+        "url": convocatoria.get("url", ""),
+        "resumen": summarize_single_convocatoria(convocatoria, rate_limiter),
+        "fuente": convocatoria.get("fuente", "")
+    }
+    # Se conservan la huella del texto original (para detectar casi
+    # duplicados) y la etapa que aprobó la convocatoria
+    for key in ("simhash", "clasificado_por"):
+        if key in convocatoria:
+            resumida[key] = convocatoria[key]
+    return resumida
+
+def summarize_relevant(
+    convocatorias: List[Dict[str, Any]],
+    max_workers: Optional[int] = None,
+    requests_per_minute: Optional[int] = None,
+    tokens_per_minute: Optional[int] = None
+) -> List[Dict[str, Any]]:
     """
     Genera resúmenes para una lista de convocatorias relevantes.
     
+    Con más de un worker los resúmenes se generan en paralelo, respetando
+    la cuota de peticiones y tokens por minuto del modelo, compartida con la
+    extracción del scraper salvo que se indique otra. El resultado conserva
+    el orden de entrada.
+    
     Args:
         convocatorias: Lista de convocatorias a resumir
+        max_workers: Resúmenes simultáneos (por defecto, SUMMARIZER_MAX_WORKERS)
+        requests_per_minute: Cuota de peticiones por minuto (por defecto, GEMINI_RPM)
+        tokens_per_minute: Cuota de tokens por minuto (por defecto, GEMINI_TPM)
     
     Returns:
         Lista de convocatorias con resúmenes generados
@@ -67,20 +100,41 @@ def summarize_relevant(convocatorias: List[Dict[str, Any]]) -> List[Dict[str, An
         logger.info("No hay convocatorias para resumir")
         return []
     
-    logger.info(f"Generando resúmenes para {len(convocatorias)} convocatorias...")
+    max_workers = max(1, min(max_workers or SUMMARIZER_MAX_WORKERS, len(convocatorias)))
+    if requests_per_minute or tokens_per_minute:
+        rate_limiter = RateLimiter(requests_per_minute or GEMINI_RPM, tokens_per_minute or GEMINI_TPM)
+    else:
+        rate_limiter = get_gemini_rate_limiter()
+    total = len(convocatorias)
     
-    resumidos = []
-    for i, convocatoria in enumerate(convocatorias, 1):
-        logger.debug(f"Resumiendo {i}/{len(convocatorias)}: {convocatoria.get('titulo', 'Sin título')[:50]}...")
+    logger.info(f"Generando resúmenes para {total} convocatorias ({max_workers} workers)...")
+    
+    completed = 0
+    progress_lock = threading.Lock()
+    latencies = []
+    
+    def summarize(convocatoria: Dict[str, Any]) -> Dict[str, Any]:
+        nonlocal completed
+        start = time.perf_counter()
+        resumida = summarize_convocatoria(convocatoria, rate_limiter)
+        latency = time.perf_counter() - start
         
-        resumen = summarize_single_convocatoria(convocatoria)
+        with progress_lock:
+            completed += 1
+            latencies.append(latency)
+            logger.debug(f"Resumen {completed}/{total} en {latency:.2f}s: {convocatoria.get('titulo', 'Sin título')[:50]}...")
         
-        resumidos.append({
-            "titulo": convocatoria.get("titulo", "Sin título"),
-            "url": convocatoria.get("url", ""),
-            "resumen": resumen,
-            "fuente": convocatoria.get("fuente", "")
-        })
+        return resumida
+    
+    start = time.perf_counter()
+    if max_workers > 1:
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="summarizer") as executor:
+            resumidos = list(executor.map(summarize, convocatorias))
+    else:
+        resumidos = [summarize(convocatoria) for convocatoria in convocatorias]
     
-    logger.info(f"Resúmenes completados: {len(resumidos)} convocatorias procesadas")
-    return resumidos
\ No newline at end of file
+    logger.info(
+        f"Resúmenes completados: {len(resumidos)} convocatorias procesadas en {time.perf_counter() - start:.2f}s "
+        f"(latencia media {sum(latencies) / len(latencies):.2f}s, máxima {max(latencies):.2f}s)"
+    )
+    return resumidos
@@ -0,0 +1,206 @@
+import os
+import re
+import hashlib
+import logging
+from collections import Counter
+from typing import Any, Dict, List, Optional, Set
+from urllib.parse import urljoin
+from bs4 import BeautifulSoup
+from agents.database import get_portal_template, save_portal_template
+from agents.extractors import extract_with_css
+from utils.urls import normalize_url
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_LEARNING_ENABLED = os.getenv("TEMPLATE_LEARNING_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Calidad mínima de una plantilla frente a la extracción del LLM
+MIN_TEMPLATE_RECALL = 0.8
+MIN_TEMPLATE_PRECISION = 0.5
+MIN_TEMPLATE_ITEMS = 2
+
+# Clases utilizables en un selector CSS sin escapar; las que llevan dígitos
+# (node-123, views-row-4) suelen variar entre items y se ignoran
+CSS_IDENTIFIER = re.compile(r"^-?[A-Za-z_][A-Za-z_-]*$")
+
+def _classes(element: Any) -> List[str]:
+    return sorted(c for c in element.get("class", []) if CSS_IDENTIFIER.match(c))
+
+def _selector(element: Any) -> str:
+    """Selector de un elemento: etiqueta más sus clases estables."""
+    return element.name + "".join(f".{c}" for c in _classes(element))
+
+def _ancestors(element: Any) -> List[Any]:
+    """Ancestros de un elemento desde <html> hasta el propio elemento."""
+    chain = [element]
+    for parent in element.parents:
+        if parent.name in (None, "[document]"):
+            break
+        chain.append(parent)
+    return list(reversed(chain))
+
+def _path(elements: List[Any]) -> str:
+    return " > ".join(_selector(e) for e in elements)
+
+def _skeleton(element: Any) -> Set[str]:
+    """
+    Rutas etiqueta/clase relativas bajo un elemento, con los hermanos de la
+    misma etiqueta colapsados en uno solo.
+
+    Cada grupo de hermanos aporta su etiqueta con las clases que comparten
+    todos y las rutas comunes a todos ellos, así que añadir o quitar una
+    tarjeta del listado (aunque tenga un campo opcional) no cambia el resultado.
+    """
+    groups: Dict[str, List[Any]] = {}
+    for child in element.find_all(True, recursive=False):
+        if child.name not in ("script", "style", "noscript", "meta", "link"):
+            groups.setdefault(child.name, []).append(child)
+
+    paths = set()
+    for tag, children in groups.items():
+        shared = set(_classes(children[0]))
+        common = _skeleton(children[0])
+        for child in children[1:]:
+            shared &= set(_classes(child))
+            common &= _skeleton(child)
+        selector = tag + "".join(f".{c}" for c in sorted(shared))
+        paths.add(selector)
+        paths.update(f"{selector} > {path}" for path in common)
+    return paths
+
+def page_fingerprint(soup: BeautifulSoup) -> str:
+    """
+    Huella estructural de una página.
+
+    Es el hash del esqueleto de la maqueta (ver _skeleton): no depende del
+    texto ni del número de convocatorias, solo de la estructura.
+    """
+    return hashlib.sha256("\n".join(sorted(_skeleton(soup))).encode("utf-8")).hexdigest()
+
+def _container_path(container: Any) -> str:
+    """Ruta CSS del contenedor, anclada en el ancestro más cercano con id."""
+    chain = _ancestors(container)
+    for i in range(len(chain) - 1, -1, -1):
+        element_id = chain[i].get("id")
+        if element_id and CSS_IDENTIFIER.match(element_id):
+            anchored = f"#{element_id}"
+            rest = chain[i + 1:]
+            return f"{anchored} > {_path(rest)}" if rest else anchored
+    return _path(chain)
+
+def infer_template(soup: BeautifulSoup, base_url: str, convocatorias: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Infiere reglas CSS (mismo formato que el extractor "css") a partir de las
+    convocatorias que el LLM extrajo de la página.
+
+    Localiza el enlace de cada convocatoria, toma su contenedor común más
+    cercano y el hijo de ese contenedor que envuelve cada enlace como item.
+    """
+    wanted = {normalize_url(c["url"]) for c in convocatorias if c.get("url")}
+    anchors = []
+    seen = set()
+    for a in soup.find_all("a", href=True):
+        url = normalize_url(urljoin(base_url, a["href"]))
+        if url in wanted and url not in seen:
+            seen.add(url)
+            anchors.append(a)
+
+    if len(anchors) < MIN_TEMPLATE_ITEMS:
+        return None
+
+    # Contenedor: ancestro común más profundo de todos los enlaces
+    chains = [_ancestors(a) for a in anchors]
+    depth = 0
+    while all(len(c) > depth + 1 for c in chains) and all(c[depth] is chains[0][depth] for c in chains):
+        depth += 1
+    if depth == 0:
+        return None
+    container = chains[0][depth - 1]
+
+    # Item: hijo del contenedor que envuelve cada enlace. Se usa la etiqueta
+    # más común y las clases que comparten todos (p.ej. sin odd/even)
+    tag, _ = Counter(c[depth].name for c in chains).most_common(1)[0]
+    item_chains = [c for c in chains if c[depth].name == tag]
+    shared = set(_classes(item_chains[0][depth]))
+    for c in item_chains[1:]:
+        shared &= set(_classes(c[depth]))
+    item_selector = tag + "".join(f".{c}" for c in sorted(shared))
+    example = item_chains[0]
+    item, anchor = example[depth], example[-1]
+
+    rules: Dict[str, Any] = {"type": "css", "item": f"{_container_path(container)} > {item_selector}"}
+    if anchor is not item:
+        rules["link"] = _path(example[depth + 1:])
+
+    # Resumen: el elemento con más texto del item que no contiene el enlace
+    best = None
+    for element in item.find_all(True):
+        if element is anchor or anchor in element.descendants or element in anchor.descendants:
+            continue
+        text = element.get_text(" ", strip=True)
+        if len(text) >= 20 and (best is None or len(text) > len(best.get_text(" ", strip=True))):
+            best = element
+    if best is not None:
+        rules["summary"] = _path(_ancestors(best)[len(_ancestors(item)):])
+
+    return rules
+
+def learn_template(portal: str, html_content: str, base_url: str, convocatorias: List[Dict[str, Any]]) -> bool:
+    """
+    Aprende y guarda la plantilla de un portal tras una extracción con el LLM.
+
+    La plantilla solo se guarda si, aplicada a la misma página, recupera
+    la mayoría de las convocatorias del LLM sin añadir demasiado ruido.
+    """
+    if not TEMPLATE_LEARNING_ENABLED or not convocatorias:
+        return False
+
+    try:
+        soup = BeautifulSoup(html_content, "html.parser")
+        rules = infer_template(soup, base_url, convocatorias)
+        if not rules:
+            logger.debug(f"No se pudo inferir plantilla para {portal}")
+            return False
+
+        expected = {normalize_url(c["url"]) for c in convocatorias}
+        found = {normalize_url(c["url"]) for c in extract_with_css(html_content, base_url, rules)}
+        matched = len(expected & found)
+        recall = matched / len(expected)
+        precision = matched / len(found) if found else 0.0
+
+        if recall < MIN_TEMPLATE_RECALL or precision < MIN_TEMPLATE_PRECISION:
+            logger.debug(f"Plantilla descartada para {portal} (recall {recall:.2f}, precisión {precision:.2f})")
+            return False
+
+        save_portal_template(portal, page_fingerprint(soup), rules)
+        logger.info(f"🧩 Plantilla aprendida para {portal}: {rules['item']} (recall {recall:.2f})")
+        return True
+
+    except Exception as e:
+        logger.error(f"Error aprendiendo plantilla de {portal}: {e}")
+        return False
+
+def apply_learned_template(portal: str, html_content: str, base_url: str) -> Optional[List[Dict[str, Any]]]:
+    """
+    Extrae convocatorias con la plantilla aprendida del portal.
+
+    Returns:
+        None si no hay plantilla o la huella de la página cambió (hay que
+        re-aprender); en otro caso las convocatorias encontradas
+    """
+    if not TEMPLATE_LEARNING_ENABLED:
+        return None
+
+    template = get_portal_template(portal)
+    if not template:
+        return None
+
+    try:
+        soup = BeautifulSoup(html_content, "html.parser")
+        if page_fingerprint(soup) != template["huella"]:
+            logger.info(f"La estructura de {portal} cambió, se re-aprenderá su plantilla")
+            return None
+        return extract_with_css(html_content, base_url, template["reglas"])
+    except Exception as e:
+        logger.error(f"Error aplicando plantilla de {portal}: {e}")
+        return None
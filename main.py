@@ -20,15 +20,25 @@ log_file = os.getenv("LOG_FILE", "logs/fundbot.log")
 logger = setup_logger("fundbot", log_level, log_file)
 
 # Importar agents después del logging
-from agents.scraper import scrape_portals
+from agents.scraper import PORTALES, scrape_portals_with_timings, confirm_checkpoints
 from agents.classifier import classify_convocatorias
 from agents.summarizer import summarize_relevant
-from agents.notifier import send_to_discord
-from agents.database import init_db, url_exists, add_url, get_stats
+from agents.database import ESTADO_DESCARTADA, init_db, add_urls_bulk, get_outbox_stats, get_stats, close_db
+from agents.dedup import Deduplicator
+from agents.outbox import queue_notifications, drain_outbox
+from agents.channels import NOTIFIER_CHANNELS_FILE
+from agents.pipeline import PIPELINE_MODE, run_streaming_pipeline
+from agents.scheduler import SCHEDULER_MODE, select_portals, record_portal_runs
+from utils.retry import close_http_session, get_retry_budget
+from utils.circuit_breaker import start_run_deadline, save_circuits
+from utils.llm_cache import get_cache_stats
 
 def validate_environment() -> bool:
     """Valida que las variables de entorno requeridas estén configuradas."""
-    required_vars = ["GOOGLE_API_KEY", "DISCORD_WEBHOOK_URL"]
+    required_vars = ["GOOGLE_API_KEY"]
+    # Con canales configurados en canales.json el webhook de Discord es opcional
+    if not os.path.exists(NOTIFIER_CHANNELS_FILE):
+        required_vars.append("DISCORD_WEBHOOK_URL")
     missing_vars = []
     
     for var in required_vars:
@@ -43,10 +53,32 @@ def validate_environment() -> bool:
     logger.info("✅ Variables de entorno validadas correctamente")
     return True
 
+def run_streaming(start_time: datetime, portales: dict) -> None:
+    """Ejecuta todas las fases como un pipeline en streaming (PIPELINE_MODE=streaming)."""
+    logger.info("=== PIPELINE EN STREAMING ===")
+    result = run_streaming_pipeline(portales)
+    
+    log_execution_metrics(
+        logger, start_time,
+        len(result["timings"]),
+        result["encontradas"],
+        result["relevantes"],
+        result["resumidas"]
+    )
+    
+    # Como en modo por fases: éxito si no queda ninguna notificación fallida en el outbox
+    if result["fallidas"] == 0:
+        logger.info(f"🎉 Ejecución completada exitosamente: {result['resumidas']} nuevas convocatorias procesadas")
+    else:
+        logger.warning("⚠️ Ejecución completada con errores en las notificaciones")
+
 def main():
     """Función principal del bot."""
     start_time = datetime.now()
     logger.info("🚀 Iniciando FundBot...")
+    # Las descargas posteriores a RUN_DEADLINE_SECONDS se omiten
+    start_run_deadline()
+    timings = []
     
     try:
         # 1. Validar configuración
@@ -62,57 +94,77 @@ def main():
         stats = get_stats()
         logger.info(f"Estadísticas BD: {stats['total']} URLs total, {stats['agregadas_hoy']} agregadas hoy")
         
+        # Reanudar notificaciones que quedaron pendientes en una ejecución anterior
+        pendientes = get_outbox_stats().get("pending", 0)
+        if pendientes:
+            logger.info(f"=== REANUDANDO {pendientes} NOTIFICACIONES PENDIENTES ===")
+            drain_outbox()
+        
+        # Portales de esta ejecución: todos o, en modo incremental, los que toca visitar
+        portales = select_portals(PORTALES)
+        if not portales:
+            logger.info(f"✅ Ningún portal pendiente (SCHEDULER_MODE={SCHEDULER_MODE})")
+            return
+        
+        if PIPELINE_MODE == "streaming":
+            run_streaming(start_time, portales)
+            return
+        
         # 3. Scraping de portales
         logger.info("=== FASE 1: SCRAPING ===")
-        raw_convocatorias = scrape_portals()
+        raw_convocatorias, timings = scrape_portals_with_timings(portales)
+        record_portal_runs(timings, portales)
         
         if not raw_convocatorias:
             logger.warning("No se encontraron convocatorias en ningún portal")
             return
         
-        # 4. Clasificación de relevancia
-        logger.info("=== FASE 2: CLASIFICACIÓN ===")
-        relevant_convocatorias = classify_convocatorias(raw_convocatorias)
+        # 4. Filtrar convocatorias ya conocidas antes de cualquier etapa con LLM
+        logger.info("=== FASE 2: FILTRADO DE DUPLICADOS ===")
+        # Cada convocatoria nueva se procesa una sola vez aunque aparezca en
+        # varios portales, con variantes de URL o con el texto casi igual
+        deduplicator = Deduplicator()
+        nuevas_convocatorias = deduplicator.filter(raw_convocatorias)
         
-        if not relevant_convocatorias:
-            logger.info("No se encontraron convocatorias relevantes")
+        logger.info(
+            f"Filtrado completado: {len(nuevas_convocatorias)} nuevas de {len(raw_convocatorias)} encontradas "
+            f"({deduplicator.near_duplicates_found} casi duplicadas)"
+        )
+        
+        if not nuevas_convocatorias:
+            logger.info("✅ No hay nuevas convocatorias para procesar")
             log_execution_metrics(logger, start_time, len(os.getenv("portales", [])), 
                                 len(raw_convocatorias), 0, 0)
             return
         
-        # 5. Filtrar convocatorias nuevas
-        logger.info("=== FASE 3: FILTRADO DE DUPLICADOS ===")
-        nuevas_convocatorias = []
-        for conv in relevant_convocatorias:
-            if not url_exists(conv["url"]):
-                nuevas_convocatorias.append(conv)
-            else:
-                logger.debug(f"Convocatoria ya existe: {conv['titulo'][:50]}...")
-        
-        logger.info(f"Filtrado completado: {len(nuevas_convocatorias)} nuevas de {len(relevant_convocatorias)} relevantes")
+        # 5. Clasificación de relevancia
+        logger.info("=== FASE 3: CLASIFICACIÓN ===")
+        relevant_convocatorias = classify_convocatorias(nuevas_convocatorias)
+        # Las descartadas se guardan como vistas para no volver a clasificarlas;
+        # las que quedaron sin veredicto se reintentan en la próxima ejecución
+        add_urls_bulk([c for c in nuevas_convocatorias if c.get("relevante") is False], estado=ESTADO_DESCARTADA)
         
-        if not nuevas_convocatorias:
-            logger.info("✅ No hay nuevas convocatorias para procesar")
+        if not relevant_convocatorias:
+            logger.info("No se encontraron convocatorias relevantes")
             log_execution_metrics(logger, start_time, len(os.getenv("portales", [])), 
-                                len(raw_convocatorias), len(relevant_convocatorias), 0)
+                                len(raw_convocatorias), 0, 0)
             return
         
         # 6. Generar resúmenes
         logger.info("=== FASE 4: GENERACIÓN DE RESÚMENES ===")
-        convocatorias_resumidas = summarize_relevant(nuevas_convocatorias)
+        convocatorias_resumidas = summarize_relevant(relevant_convocatorias)
         
-        # 7. Enviar notificaciones
-        logger.info("=== FASE 5: NOTIFICACIONES ===")
-        notification_success = send_to_discord(convocatorias_resumidas)
+        # 7. Guardar en base de datos junto con su notificación pendiente (outbox)
+        logger.info("=== FASE 5: PERSISTENCIA ===")
+        encoladas = queue_notifications(convocatorias_resumidas)
+        saved_count = len({row["convocatoria"]["url"] for row in encoladas})
         
-        # 8. Guardar en base de datos
-        logger.info("=== FASE 6: PERSISTENCIA ===")
-        saved_count = 0
-        for conv in convocatorias_resumidas:
-            if add_url(conv["url"], conv.get("titulo", ""), conv.get("fuente", "")):
-                saved_count += 1
+        logger.info(f"Guardadas {saved_count} nuevas URLs en base de datos ({len(encoladas)} notificaciones encoladas)")
         
-        logger.info(f"Guardadas {saved_count} nuevas URLs en base de datos")
+        # 8. Enviar las notificaciones pendientes del outbox
+        logger.info("=== FASE 6: NOTIFICACIONES ===")
+        outbox = drain_outbox()
+        notification_success = outbox["fallidas"] == 0
         
         # 9. Métricas finales
         log_execution_metrics(
@@ -134,6 +186,21 @@ def main():
     except Exception as e:
         logger.error(f"Error crítico durante la ejecución: {e}", exc_info=True)
         sys.exit(1)
+    finally:
+        # Validadores HTTP de las páginas cuyas convocatorias ya están guardadas,
+        # también tras un retorno anticipado o un error
+        confirm_checkpoints(timings)
+        cache_stats = get_cache_stats()
+        logger.info(f"Caché LLM: {cache_stats['hits']} aciertos, {cache_stats['misses']} consultas al modelo")
+        retry_stats = get_retry_budget().stats()
+        if retry_stats["reintentos"] or retry_stats["denegados"]:
+            logger.info(
+                f"Reintentos: {retry_stats['reintentos']} en {retry_stats['llamadas']} llamadas "
+                f"({retry_stats['denegados']} denegados por el presupuesto)"
+            )
+        save_circuits()
+        close_http_session()
+        close_db()
 
 if __name__ == "__main__":
     main()
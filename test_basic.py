@@ -80,6 +80,30 @@ def test_database_operations():
             logger.error("❌ URL inexistente mal identificada")
             return False
         
+        # Probar filtrado en bloque de URLs nuevas
+        from agents.database import filter_new_urls
+        nuevas = filter_new_urls([test_url, "https://no-existe.com", "", "https://no-existe.com"])
+        if nuevas == {"https://no-existe.com"}:
+            logger.info("✅ Filtrado en bloque de URLs nuevas correcto")
+        else:
+            logger.error(f"❌ Filtrado en bloque incorrecto: {nuevas}")
+            return False
+        
+        # Probar inserción en bloque
+        from agents.database import add_urls_bulk
+        bulk = [
+            {"url": test_url, "titulo": "Ya existente", "fuente": "test"},
+            {"url": f"{test_url}/bulk-1", "titulo": "Nueva 1", "fuente": "test"},
+            {"url": f"{test_url}/bulk-2", "titulo": "Nueva 2", "fuente": "test"},
+            {"url": f"{test_url}/bulk-1", "titulo": "Repetida", "fuente": "test"}
+        ]
+        insertadas = add_urls_bulk(bulk)
+        if insertadas == [f"{test_url}/bulk-1", f"{test_url}/bulk-2"] and url_exists(f"{test_url}/bulk-2"):
+            logger.info("✅ Inserción en bloque correcta")
+        else:
+            logger.error(f"❌ Inserción en bloque incorrecta: {insertadas}")
+            return False
+        
         # Probar estadísticas
         stats = get_stats()
         logger.info(f"✅ Estadísticas obtenidas: {stats}")
@@ -91,6 +115,7 @@ def test_database_operations():
             return False
         
         # Limpiar
+        agents.database.close_db()
         if os.path.exists(test_db):
             os.remove(test_db)
         
@@ -124,7 +149,9 @@ def test_config_loading():
                 return False
                 
             # Validar que las URLs sean válidas
-            for name, url in config.items():
+            from agents.scraper import get_portal_settings
+            for name, portal in config.items():
+                url = get_portal_settings(portal).get("url", "")
                 if url.startswith(("http://", "https://")):
                     logger.info(f"✅ URL válida para {name}: {url}")
                 else:
@@ -244,6 +271,2034 @@ def test_retry_decorator():
         logger.error(f"❌ Error en prueba de reintentos: {e}")
         return False
 
+def test_concurrent_scraping():
+    """Compara scraping secuencial y concurrente contra un servidor HTTP local."""
+    logger.info("=== PRUEBA 6: SCRAPING CONCURRENTE ===")
+    
+    import threading
+    import time
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    
+    class SlowHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(0.2)  # Simula latencia de red
+            body = f'<html><body><a href="{self.path}/detalle">Convocatoria {self.path}</a></body></html>'.encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def log_message(self, *args):
+            pass
+    
+    def fake_extract(html_content, base_url, token_budget=None):
+        time.sleep(0.2)  # Simula latencia del LLM
+        return [{"titulo": f"Convocatoria de {base_url}", "url": base_url + "/detalle", "resumen": ""}]
+    
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    portales = {f"portal-{i}": f"{base}/p{i}" for i in range(6)}
+    
+    original_extract = None
+    
+    # Sin caché HTTP ni plantillas: ambas pasadas deben descargar y extraer todo
+    import utils.http_cache
+    import agents.template_learner
+    original_cache_enabled = utils.http_cache.HTTP_CACHE_ENABLED
+    original_learning = agents.template_learner.TEMPLATE_LEARNING_ENABLED
+    utils.http_cache.HTTP_CACHE_ENABLED = False
+    agents.template_learner.TEMPLATE_LEARNING_ENABLED = False
+    
+    try:
+        import agents.scraper
+        original_extract = agents.scraper.extract_convocatorias_with_llm
+        agents.scraper.extract_convocatorias_with_llm = fake_extract
+        
+        start = time.perf_counter()
+        secuencial = agents.scraper.scrape_portals(portales=portales, concurrent=False)
+        t_secuencial = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        concurrente, timings = agents.scraper.scrape_portals_with_timings(
+            portales=portales, concurrent=True, max_workers=6, per_host_limit=3
+        )
+        t_concurrente = time.perf_counter() - start
+        
+        logger.info(f"Secuencial: {t_secuencial:.2f}s - Concurrente: {t_concurrente:.2f}s")
+        
+        if concurrente != secuencial:
+            logger.error("❌ Los resultados concurrentes difieren de los secuenciales")
+            return False
+        
+        if len(timings) != len(portales) or any(t["error"] for t in timings):
+            logger.error(f"❌ Tiempos por portal incorrectos: {timings}")
+            return False
+        
+        if t_concurrente >= t_secuencial:
+            logger.error("❌ El modo concurrente no fue más rápido")
+            return False
+        
+        logger.info("✅ Scraping concurrente correcto y más rápido")
+        return True
+        
+    except Exception as e:
+        logger.error(f"❌ Error en prueba de scraping concurrente: {e}")
+        return False
+    
+    finally:
+        if original_extract:
+            agents.scraper.extract_convocatorias_with_llm = original_extract
+        utils.http_cache.HTTP_CACHE_ENABLED = original_cache_enabled
+        agents.template_learner.TEMPLATE_LEARNING_ENABLED = original_learning
+        server.shutdown()
+
+def test_http_session_reuse():
+    """Prueba que la sesión compartida reutiliza conexiones keep-alive."""
+    logger.info("=== PRUEBA 7: SESIÓN HTTP COMPARTIDA ===")
+    
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from utils.retry import robust_http_request, close_http_session
+    
+    client_ports = set()
+    
+    class KeepAliveHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        
+        def do_GET(self):
+            client_ports.add(self.client_address[1])
+            body = b"ok"
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def log_message(self, *args):
+            pass
+    
+    server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    
+    try:
+        close_http_session()
+        for i in range(5):
+            robust_http_request(f"{base}/pagina{i}")
+        
+        if len(client_ports) == 1:
+            logger.info("✅ 5 peticiones servidas por una única conexión")
+            return True
+        
+        logger.error(f"❌ Se abrieron {len(client_ports)} conexiones para 5 peticiones")
+        return False
+        
+    except Exception as e:
+        logger.error(f"❌ Error en prueba de sesión HTTP: {e}")
+        return False
+    
+    finally:
+        close_http_session()
+        server.shutdown()
+
+def test_conditional_get_cache():
+    """Prueba las peticiones condicionales con la caché HTTP."""
+    logger.info("=== PRUEBA 8: CACHÉ HTTP CONDICIONAL ===")
+    
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    import utils.http_cache
+    from utils.retry import robust_http_request
+    
+    status_codes = []
+    
+    class ETagHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.headers.get("If-None-Match") == '"v1"':
+                status_codes.append(304)
+                self.send_response(304)
+                self.end_headers()
+                return
+            body = b"<html><body><a href='/convocatoria/1'>Convocatoria de prueba</a></body></html>"
+            status_codes.append(200)
+            self.send_response(200)
+            self.send_header("ETag", '"v1"')
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def log_message(self, *args):
+            pass
+    
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ETagHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/convocatorias"
+    
+    test_cache = f"test_http_cache_{datetime.now().timestamp()}.db"
+    original_cache_file = utils.http_cache.HTTP_CACHE_FILE
+    utils.http_cache.HTTP_CACHE_FILE = test_cache
+    import agents.database
+    test_db = f"test_fundbot_{datetime.now().timestamp()}.db"
+    original_db_file = agents.database.DB_FILE
+    original_chunk = None
+    
+    try:
+        first = robust_http_request(url, conditional=True)
+        if first.not_modified:
+            logger.error("❌ Primera descarga marcada como sin cambios")
+            return False
+        
+        # Hasta que se recuerda la respuesta no se envían validadores
+        utils.http_cache.remember_response(url, first)
+        second = robust_http_request(url, conditional=True)
+        
+        if status_codes != [200, 304] or not second.not_modified:
+            logger.error(f"❌ Secuencia de estados inesperada: {status_codes}")
+            return False
+        logger.info("✅ Segunda petición resuelta con 304 Not Modified")
+        
+        # El scraper no guarda los validadores hasta que las convocatorias están en la BD
+        import re
+        import agents.scraper
+        original_chunk = agents.scraper.extract_chunk_with_llm
+        agents.scraper.extract_chunk_with_llm = lambda chunk, base_url: [
+            {"titulo": titulo, "url": link, "resumen": ""}
+            for titulo, link in re.findall(r"\[([^\]]+)\]\(([^)]+)\)", chunk)
+        ]
+        agents.database.DB_FILE = test_db
+        agents.database.init_db()
+        portal_url = url + "/portal"
+        
+        convocatorias, timing = agents.scraper.scrape_single_portal("etag", portal_url)
+        if not convocatorias or utils.http_cache.get_cache_entry(portal_url):
+            logger.error(f"❌ Validadores guardados antes de persistir las convocatorias: {timing}")
+            return False
+        # Sin persistir (p.ej. fallo del clasificador) la página no se confirma
+        if agents.scraper.confirm_checkpoints([timing]) or utils.http_cache.get_cache_entry(portal_url):
+            logger.error("❌ Se confirmó una página con convocatorias sin guardar")
+            return False
+        agents.database.add_urls_bulk(convocatorias)
+        if agents.scraper.confirm_checkpoints([timing]) != 1:
+            logger.error("❌ No se confirmó una página con todas sus convocatorias guardadas")
+            return False
+        _, timing = agents.scraper.scrape_single_portal("etag", portal_url)
+        if not timing["sin_cambios"]:
+            logger.error(f"❌ La página confirmada se volvió a extraer: {timing}")
+            return False
+        logger.info("✅ Validadores guardados solo tras persistir las convocatorias de la página")
+        return True
+        
+    except Exception as e:
+        logger.error(f"❌ Error en prueba de caché HTTP: {e}")
+        return False
+    
+    finally:
+        if original_chunk:
+            agents.scraper.extract_chunk_with_llm = original_chunk
+        agents.database.close_db()
+        agents.database.DB_FILE = original_db_file
+        if os.path.exists(test_db):
+            os.remove(test_db)
+        utils.http_cache.HTTP_CACHE_FILE = original_cache_file
+        if os.path.exists(test_cache):
+            os.remove(test_cache)
+        server.shutdown()
+
+def test_llm_cache():
+    """Prueba la caché de respuestas del LLM con un modelo simulado."""
+    logger.info("=== PRUEBA 9: CACHÉ LLM ===")
+    
+    import utils.llm_cache
+    
+    class FakeResponse:
+        def __init__(self, content):
+            self.content = content
+    
+    class FakeLLM:
+        model = "modelo-de-prueba"
+        temperature = 0
+        calls = 0
+        
+        def invoke(self, messages):
+            FakeLLM.calls += 1
+            return FakeResponse(f"respuesta a: {messages[0].content}")
+    
+    test_cache = f"test_llm_cache_{datetime.now().timestamp()}.db"
+    original_cache_file = utils.llm_cache.LLM_CACHE_FILE
+    utils.llm_cache.LLM_CACHE_FILE = test_cache
+    
+    try:
+        llm = FakeLLM()
+        stats_before = utils.llm_cache.get_cache_stats()
+        
+        first = utils.llm_cache.cached_llm_invoke(llm, "¿Es relevante?")
+        second = utils.llm_cache.cached_llm_invoke(llm, "¿Es relevante?")
+        utils.llm_cache.cached_llm_invoke(llm, "¿Es relevante?", bypass=True)
+        
+        stats = utils.llm_cache.get_cache_stats()
+        hits = stats["hits"] - stats_before["hits"]
+        misses = stats["misses"] - stats_before["misses"]
+        
+        if first != second or FakeLLM.calls != 2 or hits != 1 or misses != 1:
+            logger.error(f"❌ Caché LLM incorrecta: {FakeLLM.calls} llamadas, {hits} aciertos, {misses} fallos")
+            return False
+        logger.info("✅ Respuesta repetida servida desde la caché")
+        
+        # Recorte por tamaño
+        original_max = utils.llm_cache.LLM_CACHE_MAX_ENTRIES
+        utils.llm_cache.LLM_CACHE_MAX_ENTRIES = 2
+        try:
+            for i in range(5):
+                utils.llm_cache.cached_llm_invoke(llm, f"prompt {i}")
+            utils.llm_cache.evict_cache()
+        finally:
+            utils.llm_cache.LLM_CACHE_MAX_ENTRIES = original_max
+        
+        with utils.llm_cache.get_cache_connection() as conn:
+            remaining = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        
+        if remaining != 2:
+            logger.error(f"❌ La caché no se recortó: {remaining} entradas")
+            return False
+        logger.info("✅ Caché recortada al tamaño máximo")
+        
+        return True
+        
+    except Exception as e:
+        logger.error(f"❌ Error en prueba de caché LLM: {e}")
+        return False
+    
+    finally:
+        utils.llm_cache.LLM_CACHE_FILE = original_cache_file
+        if os.path.exists(test_cache):
+            os.remove(test_cache)
+
+def test_batched_classification():
+    """Prueba la clasificación por lotes con respuestas simuladas del LLM."""
+    logger.info("=== PRUEBA 10: CLASIFICACIÓN POR LOTES ===")
+    
+    original_invoke = None
+    original_single = None
+    
+    try:
+        import agents.classifier
+        original_invoke = agents.classifier.cached_llm_invoke
+        original_single = agents.classifier.classify_single_convocatoria
+        
+        batch_prompts = []
+        single_calls = []
+        
+        def fake_invoke(llm, prompt, rate_limiter=None):
+            batch_prompts.append(prompt)
+            # El veredicto del tercer elemento falta en la respuesta
+            return '```json\n{"1": "SI", "2": "NO"}\n```'
+        
+        def fake_single(convocatoria):
+            single_calls.append(convocatoria["url"])
+            return True
+        
+        agents.classifier.cached_llm_invoke = fake_invoke
+        agents.classifier.classify_single_convocatoria = fake_single
+        
+        convocatorias = [
+            {"titulo": "IA aplicada", "url": "https://test.com/ia", "resumen": ""},
+            {"titulo": "Agricultura", "url": "https://test.com/agro", "resumen": ""},
+            {"titulo": "Dashboards", "url": "https://test.com/bi", "resumen": ""}
+        ]
+        
+        relevantes = agents.classifier.classify_convocatorias(convocatorias, batch_size=3)
+        urls = [c["url"] for c in relevantes]
+        
+        if len(batch_prompts) != 1:
+            logger.error(f"❌ Se esperaba 1 llamada por lote, hubo {len(batch_prompts)}")
+            return False
+        
+        if single_calls != ["https://test.com/bi"]:
+            logger.error(f"❌ Fallback individual incorrecto: {single_calls}")
+            return False
+        
+        if urls != ["https://test.com/ia", "https://test.com/bi"]:
+            logger.error(f"❌ Convocatorias relevantes incorrectas: {urls}")
+            return False
+        
+        logger.info("✅ Lote clasificado con una llamada y fallback para el veredicto faltante")
+        
+        # Un lote de una sin veredicto no repite la llamada individual
+        single_calls.clear()
+        agents.classifier.classify_single_convocatoria = lambda convocatoria: single_calls.append(convocatoria["url"])
+        sueltas = [{"titulo": "Dashboards", "url": "https://test.com/bi", "resumen": ""}]
+        if agents.classifier.classify_convocatorias(sueltas, batch_size=1) or single_calls != ["https://test.com/bi"] \
+                or sueltas[0]["relevante"] is not None:
+            logger.error(f"❌ Lote de una clasificado varias veces: {single_calls}")
+            return False
+        logger.info("✅ Lote de una sin veredicto: una sola llamada, se reintenta en la próxima ejecución")
+        return True
+        
+    except Exception as e:
+        logger.error(f"❌ Error en prueba de clasificación por lotes: {e}")
+        return False
+    
+    finally:
+        if original_invoke:
+            agents.classifier.cached_llm_invoke = original_invoke
+            agents.classifier.classify_single_convocatoria = original_single
+
+def test_parallel_summarization():
+    """Prueba el limitador de tasa y el orden de los resúmenes en paralelo."""
+    logger.info("=== PRUEBA 11: RESÚMENES EN PARALELO ===")
+    
+    import random
+    import time
+    from utils.rate_limit import RateLimiter
+    
+    original_single = None
+    
+    try:
+        # 2 peticiones por ventana de 0.3s: la tercera debe esperar
+        limiter = RateLimiter(requests_per_minute=2, window=0.3)
+        start = time.perf_counter()
+        for _ in range(3):
+            limiter.acquire()
+        elapsed = time.perf_counter() - start
+        
+        if elapsed < 0.25:
+            logger.error(f"❌ El limitador no esperó: {elapsed:.2f}s")
+            return False
+        logger.info(f"✅ Limitador respetó la ventana ({elapsed:.2f}s)")
+        
+        import agents.summarizer
+        original_single = agents.summarizer.summarize_single_convocatoria
+        
+        def fake_single(convocatoria, rate_limiter=None):
+            time.sleep(random.uniform(0.01, 0.05))
+            return f"Resumen de {convocatoria['titulo']}"
+        
+        agents.summarizer.summarize_single_convocatoria = fake_single
+        
+        convocatorias = [{"titulo": f"Convocatoria {i}", "url": f"https://test.com/{i}", "fuente": "test"} for i in range(12)]
+        resumidos = agents.summarizer.summarize_relevant(convocatorias, max_workers=4, requests_per_minute=1000)
+        
+        if [r["url"] for r in resumidos] != [c["url"] for c in convocatorias]:
+            logger.error("❌ Los resúmenes no conservan el orden de entrada")
+            return False
+        
+        logger.info("✅ Resúmenes en paralelo en el orden de entrada")
+        return True
+        
+    except Exception as e:
+        logger.error(f"❌ Error en prueba de resúmenes en paralelo: {e}")
+        return False
+    
+    finally:
+        if original_single:
+            agents.summarizer.summarize_single_convocatoria = original_single
+
+def test_html_reduction():
+    """Prueba la reducción de HTML previa al LLM."""
+    logger.info("=== PRUEBA 12: REDUCCIÓN DE HTML ===")
+    
+    try:
+        from utils.html_reducer import reduce_html
+        
+        # Cabecera y scripts pesados antes del listado real
+        html = (
+            "<html><head><style>" + "body{color:red}" * 1000 + "</style>"
+            "<script>" + "var x = 1;" * 2000 + "</script></head><body>"
+            "<nav><a href='/'>Inicio</a><a href='/contacto'>Contacto</a></nav>"
+            "<div class='convocatoria'><h2><a href='/convocatorias/ia-2024'>Convocatoria IA 2024</a></h2>"
+            "<p>Financiación para proyectos de <b>inteligencia artificial</b>.</p></div>"
+            "<footer>Todos los derechos reservados</footer></body></html>"
+        )
+        
+        reduced = reduce_html(html, "https://test.example.com/listado/")
+        logger.info(f"HTML de {len(html)} caracteres reducido a {len(reduced)}")
+        
+        checks = [
+            ("[Convocatoria IA 2024](https://test.example.com/convocatorias/ia-2024)" in reduced, "enlace absoluto con su texto"),
+            ("inteligencia artificial" in reduced, "texto que acompaña al enlace"),
+            ("var x" not in reduced and "color:red" not in reduced, "scripts y estilos eliminados"),
+            ("Contacto" not in reduced and "derechos" not in reduced, "navegación y pie eliminados"),
+            (len(reduced) < 200, "contenido compacto")
+        ]
+        
+        for ok, description in checks:
+            if not ok:
+                logger.error(f"❌ Reducción incorrecta ({description}): {reduced}")
+                return False
+            logger.info(f"✅ {description}")
+        
+        return True
+        
+    except Exception as e:
+        logger.error(f"❌ Error en prueba de reducción de HTML: {e}")
+        return False
+
+def test_chunked_extraction():
+    """Prueba la extracción por fragmentos y la unión sin duplicados."""
+    logger.info("=== PRUEBA 13: EXTRACCIÓN POR FRAGMENTOS ===")
+    
+    import re
+    original_chunk = None
+    
+    try:
+        import agents.scraper
+        original_chunk = agents.scraper.extract_chunk_with_llm
+        
+        def fake_chunk(chunk, base_url):
+            # Devuelve cada enlace presente en el fragmento
+            return [
+                {"titulo": titulo, "url": url, "resumen": ""}
+                for titulo, url in re.findall(r"\[([^\]]+)\]\(([^)]+)\)", chunk)
+            ]
+        
+        agents.scraper.extract_chunk_with_llm = fake_chunk
+        
+        items = "".join(
+            f"<li><a href='/convocatoria/{i}/'>Convocatoria número {i}</a> {'descripción ' * 20}</li>"
+            for i in range(300)
+        )
+        html = f"<html><body><ul>{items}</ul></body></html>"
+        
+        convocatorias = agents.scraper.extract_convocatorias_with_llm(html, "https://test.example.com/", token_budget=100000)
+        urls = [c["url"] for c in convocatorias]
+        
+        if len(urls) != 300 or len(set(urls)) != 300:
+            logger.error(f"❌ Se esperaban 300 convocatorias únicas, hay {len(urls)} ({len(set(urls))} únicas)")
+            return False
+        logger.info("✅ 300 convocatorias extraídas de varios fragmentos sin duplicados")
+        
+        # Con un presupuesto pequeño solo se procesa el principio de la página
+        limitadas = agents.scraper.extract_convocatorias_with_llm(html, "https://test.example.com/", token_budget=1000)
+        if not 0 < len(limitadas) < 300:
+            logger.error(f"❌ El presupuesto por portal no se aplicó: {len(limitadas)} convocatorias")
+            return False
+        logger.info(f"✅ Presupuesto por portal aplicado: {len(limitadas)} convocatorias")
+        
+        # Un fragmento fallido no se confunde con uno vacío: se avisa con lo extraído del resto
+        agents.scraper.extract_chunk_with_llm = lambda chunk, base_url: None if "número 150" in chunk else fake_chunk(chunk, base_url)
+        try:
+            agents.scraper.extract_convocatorias_with_llm(html, "https://test.example.com/", token_budget=100000)
+            logger.error("❌ La extracción con un fragmento fallido se dio por completa")
+            return False
+        except agents.scraper.PartialExtractionError as e:
+            parciales = {c["url"] for c in e.convocatorias}
+            if not 0 < len(parciales) < 300 or "https://test.example.com/convocatoria/150/" in parciales:
+                logger.error(f"❌ Convocatorias parciales incorrectas: {len(parciales)}")
+                return False
+        logger.info(f"✅ Extracción parcial señalada con {len(parciales)} convocatorias de los fragmentos correctos")
+        
+        return True
+        
+    except Exception as e:
+        logger.error(f"❌ Error en prueba de extracción por fragmentos: {e}")
+        return False
+    
+    finally:
+        if original_chunk:
+            agents.scraper.extract_chunk_with_llm = original_chunk
+
+def test_pagination_crawler():
+    """Prueba el recorrido de páginas y su condición de parada."""
+    logger.info("=== PRUEBA 14: PAGINACIÓN ===")
+    
+    import re
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    import utils.http_cache
+    import agents.database
+    
+    requested_pages = []
+    
+    class ListingHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            match = re.search(r"page=(\d+)", self.path)
+            page = int(match.group(1)) if match else 0
+            requested_pages.append(page)
+            links = "".join(f"<li><a href='/convocatoria/{page}-{i}'>Convocatoria {page}-{i}</a></li>" for i in range(3))
+            body = f"<html><body><ul>{links}</ul></body></html>".encode()
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def log_message(self, *args):
+            pass
+    
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ListingHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    
+    test_db = f"test_fundbot_{datetime.now().timestamp()}.db"
+    original_db_file = agents.database.DB_FILE
+    original_cache_enabled = utils.http_cache.HTTP_CACHE_ENABLED
+    original_chunk = None
+    
+    try:
+        import agents.scraper
+        original_chunk = agents.scraper.extract_chunk_with_llm
+        agents.scraper.extract_chunk_with_llm = lambda chunk, base_url: [
+            {"titulo": titulo, "url": url, "resumen": ""}
+            for titulo, url in re.findall(r"\[([^\]]+)\]\(([^)]+)\)", chunk)
+        ]
+        utils.http_cache.HTTP_CACHE_ENABLED = False
+        agents.database.DB_FILE = test_db
+        agents.database.init_db()
+        
+        # La página 2 (page=2) ya se conocía: el recorrido debe parar ahí
+        agents.database.add_urls_bulk([{"url": f"{base}/convocatoria/2-{i}"} for i in range(3)])
+        
+        portal = {"url": f"{base}/listado", "pagination": {"param": "page", "first": 0, "max_pages": 10}}
+        convocatorias, timings = agents.scraper.scrape_portals_with_timings(
+            portales={"paginado": portal}, concurrent=False
+        )
+        urls = {c["url"] for c in convocatorias}
+        
+        if f"{base}/convocatoria/1-0" not in urls:
+            logger.error(f"❌ No se recorrió la segunda página: {sorted(urls)}")
+            return False
+        
+        if max(requested_pages) > 2:
+            logger.error(f"❌ El recorrido no se detuvo en la página conocida: {sorted(requested_pages)}")
+            return False
+        
+        logger.info(f"✅ Recorridas {timings[0]['paginas']} páginas, parada en la primera ya conocida")
+        return True
+        
+    except Exception as e:
+        logger.error(f"❌ Error en prueba de paginación: {e}")
+        return False
+    
+    finally:
+        if original_chunk:
+            agents.scraper.extract_chunk_with_llm = original_chunk
+        utils.http_cache.HTTP_CACHE_ENABLED = original_cache_enabled
+        agents.database.close_db()
+        agents.database.DB_FILE = original_db_file
+        if os.path.exists(test_db):
+            os.remove(test_db)
+        server.shutdown()
+
+def test_local_extractors():
+    """Prueba los extractores locales por selectores y el fallback al LLM."""
+    logger.info("=== PRUEBA 15: EXTRACTORES LOCALES ===")
+    
+    original_llm_extract = None
+    
+    try:
+        import agents.scraper
+        from agents.extractors import register_extractor, EXTRACTORS
+        
+        html = """
+        <html><body>
+            <div class="views-row">
+                <h3><a href="/convocatorias/ia">Convocatoria de IA</a></h3>
+                <p class="resumen">Financiación para proyectos de analítica</p>
+            </div>
+            <div class="views-row">
+                <h3><a href="https://otro.example.com/bi">Programa BI</a></h3>
+            </div>
+        </body></html>
+        """
+        settings = {
+            "url": "https://test.example.com/listado",
+            "extractor": {"type": "css", "item": "div.views-row", "title": "h3", "summary": "p.resumen"}
+        }
+        
+        llm_calls = []
+        original_llm_extract = agents.scraper.extract_convocatorias_with_llm
+        agents.scraper.extract_convocatorias_with_llm = lambda html, url, budget=None: llm_calls.append(url) or []
+        
+        convocatorias, metodo = agents.scraper.extract_page(html, settings["url"], settings)
+        expected = [
+            {"titulo": "Convocatoria de IA", "url": "https://test.example.com/convocatorias/ia", "resumen": "Financiación para proyectos de analítica"},
+            {"titulo": "Programa BI", "url": "https://otro.example.com/bi", "resumen": ""}
+        ]
+        if convocatorias != expected or metodo != "local" or llm_calls:
+            logger.error(f"❌ Extracción CSS incorrecta ({metodo}): {convocatorias}")
+            return False
+        logger.info("✅ Extractor CSS sin llamar al LLM")
+        
+        # Un selector que no encuentra nada recurre al LLM
+        settings["extractor"]["item"] = "div.no-existe"
+        _, metodo = agents.scraper.extract_page(html, settings["url"], settings)
+        if metodo != "llm" or len(llm_calls) != 1:
+            logger.error("❌ No se recurrió al LLM con un selector vacío")
+            return False
+        logger.info("✅ Fallback al LLM cuando las reglas no encuentran nada")
+        
+        # Plugins registrados por nombre
+        @register_extractor("prueba")
+        def plugin(html_content, base_url, rules):
+            return [{"titulo": rules["titulo"], "url": base_url, "resumen": ""}]
+        
+        settings["extractor"] = {"type": "prueba", "titulo": "Desde plugin"}
+        convocatorias, metodo = agents.scraper.extract_page(html, settings["url"], settings)
+        EXTRACTORS.pop("prueba", None)
+        if metodo != "local" or convocatorias[0]["titulo"] != "Desde plugin":
+            logger.error("❌ El plugin registrado no se utilizó")
+            return False
+        logger.info("✅ Plugin de extracción registrado y utilizado")
+        
+        return True
+        
+    except Exception as e:
+        logger.error(f"❌ Error en prueba de extractores locales: {e}")
+        return False
+    
+    finally:
+        if original_llm_extract:
+            agents.scraper.extract_convocatorias_with_llm = original_llm_extract
+
+def test_learned_templates():
+    """Prueba el aprendizaje de plantillas por portal a partir del LLM."""
+    logger.info("=== PRUEBA 16: PLANTILLAS APRENDIDAS ===")
+    
+    import agents.database
+    test_db = f"test_plantillas_{datetime.now().timestamp()}.db"
+    original_db_file = agents.database.DB_FILE
+    original_llm_extract = None
+    
+    try:
+        import agents.scraper
+        agents.database.DB_FILE = test_db
+        agents.database.init_db()
+        
+        def listing(clase, n=5):
+            rows = "".join(
+                f'<li class="{clase} fila-{i % 2}"><h3><a href="/c/{i}">Convocatoria {i}</a></h3>'
+                f'<p class="bajada">Financiación para proyectos de datos número {i}</p>'
+                + ('<span class="nueva">Nueva</span>' if i == 5 else "") + '</li>'
+                for i in range(n)
+            )
+            return f'<html><body><nav><a href="/">Inicio</a></nav><ul id="listado">{rows}</ul></body></html>'
+        
+        base_url = "https://test.example.com/listado"
+        expected = [
+            {"titulo": f"Convocatoria {i}", "url": f"https://test.example.com/c/{i}", "resumen": f"Financiación para proyectos de datos número {i}"}
+            for i in range(5)
+        ]
+        
+        llm_calls = []
+        original_llm_extract = agents.scraper.extract_convocatorias_with_llm
+        agents.scraper.extract_convocatorias_with_llm = lambda html, url, budget=None: llm_calls.append(url) or expected
+        
+        _, metodo = agents.scraper.extract_page(listing("item"), base_url, {"url": base_url}, "prueba")
+        if metodo != "llm" or not agents.database.get_portal_template("prueba"):
+            logger.error("❌ No se aprendió la plantilla tras la extracción con el LLM")
+            return False
+        logger.info("✅ Plantilla aprendida tras la primera extracción")
+        
+        convocatorias, metodo = agents.scraper.extract_page(listing("item"), base_url, {"url": base_url}, "prueba")
+        if metodo != "plantilla" or convocatorias != expected or len(llm_calls) != 1:
+            logger.error(f"❌ La plantilla no sustituyó al LLM ({metodo}): {convocatorias}")
+            return False
+        logger.info("✅ Segunda extracción con la plantilla, sin llamar al LLM")
+        
+        # Una convocatoria nueva (con un campo opcional) no cambia la huella
+        convocatorias, metodo = agents.scraper.extract_page(listing("item", n=6), base_url, {"url": base_url}, "prueba")
+        if metodo != "plantilla" or len(convocatorias) != 6 or len(llm_calls) != 1:
+            logger.error(f"❌ Una tarjeta más invalidó la plantilla ({metodo}, {len(convocatorias)} convocatorias)")
+            return False
+        logger.info("✅ Una convocatoria más en el listado sigue usando la plantilla")
+        
+        # Un cambio de maqueta invalida la huella y se vuelve a aprender
+        _, metodo = agents.scraper.extract_page(listing("tarjeta"), base_url, {"url": base_url}, "prueba")
+        template = agents.database.get_portal_template("prueba")
+        if metodo != "llm" or len(llm_calls) != 2 or "tarjeta" not in template["reglas"]["item"]:
+            logger.error(f"❌ No se re-aprendió la plantilla tras el cambio de estructura: {template}")
+            return False
+        logger.info("✅ Cambio de estructura detectado y plantilla re-aprendida")
+        
+        return True
+        
+    except Exception as e:
+        logger.error(f"❌ Error en prueba de plantillas aprendidas: {e}")
+        return False
+    
+    finally:
+        if original_llm_extract:
+            agents.scraper.extract_convocatorias_with_llm = original_llm_extract
+        agents.database.close_db()
+        agents.database.DB_FILE = original_db_file
+        if os.path.exists(test_db):
+            os.remove(test_db)
+
+def test_feed_sources():
+    """Prueba los portales de tipo feed y sitemap con filtrado incremental."""
+    logger.info("=== PRUEBA 17: FEEDS Y SITEMAPS ===")
+    
+    import gzip
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    import agents.database
+    
+    documents = {
+        "/rss.xml": b"""<?xml version="1.0"?><rss version="2.0"><channel><title>Fondo</title>
+            <item><title>Convocatoria de IA</title><link>https://test.example.com/c/ia</link>
+            <description>&lt;p&gt;Proyectos de &lt;b&gt;anal&#237;tica&lt;/b&gt;&lt;/p&gt;</description>
+            <pubDate>Mon, 04 Mar 2024 10:00:00 +0000</pubDate></item>
+            <item><title>Convocatoria antigua</title><link>https://test.example.com/c/vieja</link>
+            <pubDate>Fri, 01 Dec 2023 10:00:00 +0000</pubDate></item>
+            </channel></rss>""",
+        "/atom.xml": b"""<feed xmlns="http://www.w3.org/2005/Atom"><title>Fondo</title>
+            <entry><title>Programa BI</title><link rel="alternate" href="/c/bi"/>
+            <updated>2024-03-05T08:00:00Z</updated><summary>Inteligencia de negocios</summary></entry>
+            </feed>""",
+        "/sitemap_index.xml": b"""<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+            <sitemap><loc>/sitemap-convocatorias.xml.gz</loc><lastmod>2024-03-06</lastmod></sitemap>
+            <sitemap><loc>/sitemap-blog.xml</loc><lastmod>2023-01-01</lastmod></sitemap>
+            </sitemapindex>""",
+        "/sitemap-convocatorias.xml.gz": gzip.compress(b"""<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+            <url><loc>https://test.example.com/convocatorias/fondo-datos-2024</loc><lastmod>2024-03-06</lastmod></url>
+            <url><loc>https://test.example.com/contacto</loc><lastmod>2024-03-06</lastmod></url>
+            </urlset>"""),
+        "/sitemap-blog.xml": b"""<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+            <url><loc>https://test.example.com/convocatorias/de-blog</loc><lastmod>2023-01-01</lastmod></url>
+            </urlset>"""
+    }
+    requested = []
+    # Documentos servidos con Content-Encoding: gzip (requests los descomprime)
+    encoded = set()
+    
+    class FeedHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requested.append(self.path)
+            body = documents.get(self.path)
+            self.send_response(200 if body else 404)
+            if self.path in encoded:
+                self.send_header("Content-Encoding", "gzip")
+            self.send_header("Content-Length", str(len(body or b"")))
+            self.end_headers()
+            self.wfile.write(body or b"")
+        
+        def log_message(self, *args):
+            pass
+    
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FeedHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    
+    test_db = f"test_feeds_{datetime.now().timestamp()}.db"
+    original_db_file = agents.database.DB_FILE
+    original_llm_extract = None
+    
+    try:
+        import agents.scraper
+        agents.database.DB_FILE = test_db
+        agents.database.init_db()
+        
+        llm_calls = []
+        original_llm_extract = agents.scraper.extract_convocatorias_with_llm
+        agents.scraper.extract_convocatorias_with_llm = lambda html, url, budget=None: llm_calls.append(url) or []
+        
+        portales = {
+            "rss": {"type": "feed", "url": f"{base}/rss.xml"},
+            "atom": {"type": "feed", "url": f"{base}/atom.xml"},
+            "mapa": {"type": "sitemap", "url": f"{base}/sitemap_index.xml", "url_pattern": "/convocatorias/"}
+        }
+        convocatorias, timings = agents.scraper.scrape_portals_with_timings(portales=portales, concurrent=False)
+        by_url = {c["url"]: c for c in convocatorias}
+        
+        expected = {
+            "https://test.example.com/c/ia": ("Convocatoria de IA", "Proyectos de analítica", "rss"),
+            "https://test.example.com/c/vieja": ("Convocatoria antigua", "", "rss"),
+            f"{base}/c/bi": ("Programa BI", "Inteligencia de negocios", "atom"),
+            "https://test.example.com/convocatorias/fondo-datos-2024": ("Fondo datos 2024", "", "mapa"),
+            "https://test.example.com/convocatorias/de-blog": ("De blog", "", "mapa")
+        }
+        actual = {url: (c["titulo"], c["resumen"], c["fuente"]) for url, c in by_url.items()}
+        if actual != expected or llm_calls:
+            logger.error(f"❌ Entradas leídas incorrectas: {actual}")
+            return False
+        logger.info(f"✅ RSS, Atom y sitemaps leídos sin LLM ({[t['metodo'] for t in timings]})")
+        
+        # El lastmod no se guarda hasta que las convocatorias están en la BD
+        if agents.database.get_feed_lastmod("rss"):
+            logger.error("❌ Lastmod guardado antes de persistir las convocatorias")
+            return False
+        agents.database.add_urls_bulk(convocatorias)
+        if agents.scraper.confirm_checkpoints(timings) != 3:
+            logger.error("❌ No se confirmó el lastmod de los feeds persistidos")
+            return False
+        
+        # Segunda ejecución: nada nuevo desde el último lastmod
+        requested.clear()
+        convocatorias = agents.scraper.scrape_portals(portales=portales, concurrent=False)
+        if convocatorias or "/sitemap-blog.xml" in requested:
+            logger.error(f"❌ Se repitieron entradas ya procesadas: {convocatorias} ({requested})")
+            return False
+        logger.info("✅ Sin entradas ni sitemaps hijos repetidos en la segunda ejecución")
+        
+        # Una entrada modificada después del último lastmod vuelve a aparecer
+        documents["/rss.xml"] = documents["/rss.xml"].replace(b"Fri, 01 Dec 2023", b"Thu, 07 Mar 2024")
+        convocatorias = agents.scraper.scrape_portals(portales={"rss": portales["rss"]}, concurrent=False)
+        if [c["url"] for c in convocatorias] != ["https://test.example.com/c/vieja"]:
+            logger.error(f"❌ Filtrado incremental incorrecto: {convocatorias}")
+            return False
+        logger.info("✅ Filtrado incremental por lastmod correcto")
+        
+        # Con max_items se toman las más antiguas; las recortadas llegan en la siguiente ejecución
+        documents["/lote.xml"] = ("<rss version='2.0'><channel><title>Lote</title>" + "".join(
+            f"<item><title>Lote {day}</title><link>https://test.example.com/lote/{day}</link>"
+            f"<pubDate>{day:02d} Mar 2024 10:00:00 +0000</pubDate></item>" for day in (3, 1, 2)
+        ) + "</channel></rss>").encode()
+        lote = {"lote": {"type": "feed", "url": f"{base}/lote.xml", "max_items": 2}}
+        recibidas = []
+        for _ in range(2):
+            convocatorias, timings = agents.scraper.scrape_portals_with_timings(portales=lote, concurrent=False)
+            recibidas.append([c["url"].rsplit("/", 1)[1] for c in convocatorias])
+            agents.database.add_urls_bulk(convocatorias)
+            agents.scraper.confirm_checkpoints(timings)
+        if recibidas != [["1", "2"], ["3"]]:
+            logger.error(f"❌ Entradas recortadas por max_items perdidas: {recibidas}")
+            return False
+        logger.info("✅ max_items toma las entradas más antiguas y deja el resto para la siguiente ejecución")
+        
+        # Un .xml.gz con Content-Encoding: gzip llega ya descomprimido
+        documents["/codificado.xml.gz"] = gzip.compress(b"""<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+            <url><loc>https://test.example.com/convocatorias/codificada</loc></url></urlset>""")
+        encoded.add("/codificado.xml.gz")
+        convocatorias = agents.scraper.scrape_portals(portales={"codificado": {"type": "sitemap", "url": f"{base}/codificado.xml.gz"}}, concurrent=False)
+        if [c["url"] for c in convocatorias] != ["https://test.example.com/convocatorias/codificada"]:
+            logger.error(f"❌ Sitemap .gz con Content-Encoding mal leído: {convocatorias}")
+            return False
+        logger.info("✅ Sitemaps .gz descomprimidos según su contenido, no su extensión")
+        
+        return True
+        
+    except Exception as e:
+        logger.error(f"❌ Error en prueba de feeds y sitemaps: {e}")
+        return False
+    
+    finally:
+        if original_llm_extract:
+            agents.scraper.extract_convocatorias_with_llm = original_llm_extract
+        agents.database.close_db()
+        agents.database.DB_FILE = original_db_file
+        if os.path.exists(test_db):
+            os.remove(test_db)
+        server.shutdown()
+
+def test_streaming_pipeline():
+    """Prueba el pipeline en streaming: solapamiento de etapas y resultados."""
+    logger.info("=== PRUEBA 18: PIPELINE EN STREAMING ===")
+    
+    import time
+    import threading
+    import agents.database
+    
+    test_db = f"test_pipeline_{datetime.now().timestamp()}.db"
+    original_db_file = agents.database.DB_FILE
+    originals = {}
+    
+    try:
+        import agents.pipeline
+        agents.database.DB_FILE = test_db
+        agents.database.init_db()
+        agents.database.add_urls_bulk([{"url": "https://test.example.com/rapido/0"}])
+        
+        def fake_scrape(key, portal, host_limiter=None):
+            time.sleep(portal)
+            convocatorias = [
+                {"titulo": f"{key} {i}", "url": f"https://test.example.com/{key}/{i}", "resumen": "", "fuente": key}
+                for i in range(4)
+            ]
+            # Una URL repetida en dos portales solo se procesa una vez
+            convocatorias.append({"titulo": "Compartida", "url": "https://test.example.com/compartida", "resumen": "", "fuente": key})
+            return convocatorias, {"portal": key, "fetch": 0.0, "extract": 0.0, "total": portal, "convocatorias": 5,
+                                   "paginas": 1, "metodo": "llm", "sin_cambios": False, "error": None}
+        
+        start = time.perf_counter()
+        sent = []
+        sent_lock = threading.Lock()
+        
+        from agents.channels import NotificationChannel
+        
+        class RecordingChannel(NotificationChannel):
+            format = "prueba"
+            
+            def format_item(self, convocatoria):
+                return convocatoria["url"]
+            
+            def send(self, items):
+                if self.name != "prueba":
+                    return [True] * len(items)
+                with sent_lock:
+                    sent.extend((url, time.perf_counter() - start) for url in items)
+                return [True] * len(items)
+        
+        digests = []
+        
+        class DigestChannel(RecordingChannel):
+            digest = True
+            
+            def send(self, items):
+                digests.append(len(items))
+                return [True] * len(items)
+        
+        patches = {
+            "scrape_single_portal": fake_scrape,
+            # Relevantes: las de índice par
+            "classify_convocatorias": lambda convs, batch_size=None: [c for c in convs if c["url"][-1] in "02a"],
+            "summarize_convocatoria": lambda c, rate_limiter=None: {**c, "resumen": f"Resumen de {c['titulo']}"}
+        }
+        for name, func in patches.items():
+            originals[name] = getattr(agents.pipeline, name)
+            setattr(agents.pipeline, name, func)
+        
+        result = agents.pipeline.run_streaming_pipeline(
+            portales={"rapido": 0.05, "lento": 1.5}, queue_size=2, batch_wait=0.1,
+            channels={"prueba": RecordingChannel("prueba", {}), "lento": RecordingChannel("lento", {"fuentes": ["lento"]}),
+                      "resumen": DigestChannel("resumen", {})}
+        )
+        
+        expected = {
+            "https://test.example.com/rapido/2", "https://test.example.com/lento/0",
+            "https://test.example.com/lento/2", "https://test.example.com/compartida"
+        }
+        urls = [url for url, _ in sent]
+        if set(urls) != expected or len(urls) != len(expected):
+            logger.error(f"❌ Notificaciones incorrectas: {sorted(urls)}")
+            return False
+        logger.info("✅ Notificadas solo las convocatorias nuevas y relevantes, sin duplicados")
+        
+        if agents.database.filter_new_urls(expected):
+            logger.error("❌ Las convocatorias notificadas no se guardaron")
+            return False
+        logger.info(f"✅ {result['guardadas']} convocatorias guardadas")
+        
+        # Con varios canales hay más notificaciones que convocatorias resumidas
+        if result["fallidas"] or result["notificadas"] != result["encoladas"] or result["encoladas"] <= result["resumidas"]:
+            logger.error(f"❌ Notificaciones por canal mal contadas: {result['notificadas']}/{result['encoladas']}, {result['fallidas']} fallidas")
+            return False
+        logger.info(f"✅ {result['notificadas']} notificaciones entregadas para {result['resumidas']} convocatorias en 3 canales")
+        
+        if digests != [len(expected)]:
+            logger.error(f"❌ El canal digest recibió varios envíos: {digests}")
+            return False
+        logger.info(f"✅ Canal digest: un solo envío con {digests[0]} convocatorias al final de la ejecución")
+        
+        if result["primera_notificacion"] is None or result["primera_notificacion"] >= 1.5:
+            logger.error(f"❌ La primera notificación esperó al portal más lento ({result['primera_notificacion']})")
+            return False
+        logger.info(f"✅ Primera notificación a los {result['primera_notificacion']:.2f}s, antes de terminar el portal lento")
+        
+        return True
+        
+    except Exception as e:
+        logger.error(f"❌ Error en prueba de pipeline en streaming: {e}")
+        return False
+    
+    finally:
+        for name, func in originals.items():
+            setattr(agents.pipeline, name, func)
+        agents.database.close_db()
+        agents.database.DB_FILE = original_db_file
+        if os.path.exists(test_db):
+            os.remove(test_db)
+
+def test_discord_batching():
+    """Prueba el agrupado de embeds por mensaje y el reenvío de los fallidos."""
+    logger.info("=== PRUEBA 19: AGRUPADO DE EMBEDS EN DISCORD ===")
+    
+    original_send = None
+    
+    try:
+        import agents.notifier
+        from agents.notifier import pack_embeds, send_embeds, embed_length, create_embed
+        
+        cortos = [create_embed({"titulo": f"Convocatoria {i}", "resumen": "Resumen breve", "url": f"https://test.example.com/{i}"}) for i in range(23)]
+        mensajes = pack_embeds(cortos)
+        if [len(m) for m in mensajes] != [10, 10, 3]:
+            logger.error(f"❌ Agrupado por número de embeds incorrecto: {[len(m) for m in mensajes]}")
+            return False
+        logger.info("✅ 23 embeds agrupados en 3 mensajes (máximo 10 por mensaje)")
+        
+        largos = [create_embed({"titulo": f"Larga {i}", "resumen": "x" * 2500, "url": f"https://test.example.com/l{i}"}) for i in range(5)]
+        mensajes = pack_embeds(largos + cortos[:3])
+        sizes = [sum(embed_length((largos + cortos[:3])[i]) for i in m) for m in mensajes]
+        if len(mensajes) != 3 or max(sizes) > 6000 or sorted(i for m in mensajes for i in m) != list(range(8)):
+            logger.error(f"❌ Agrupado por caracteres incorrecto: {mensajes} ({sizes})")
+            return False
+        logger.info(f"✅ Límite de 6000 caracteres respetado ({sizes})")
+        
+        payloads = []
+        def fake_send(webhook_url, payload):
+            titles = [e["title"] for e in payload["embeds"]]
+            payloads.append(titles)
+            # Discord rechaza el mensaje completo si un embed no es válido
+            return "Rechazada" not in titles
+        
+        original_send = agents.notifier.send_discord_message
+        agents.notifier.send_discord_message = fake_send
+        
+        embeds = cortos[:11]
+        embeds[3] = create_embed({"titulo": "Rechazada", "resumen": "Embed inválido", "url": "https://test.example.com/mal"})
+        delivered = send_embeds("https://discord.com/api/webhooks/1/test", embeds, max_rounds=3)
+        
+        if delivered != [i != 3 for i in range(11)]:
+            logger.error(f"❌ Estado por embed incorrecto: {delivered}")
+            return False
+        
+        sent_counts = {}
+        for titles in payloads:
+            for title in titles:
+                sent_counts[title] = sent_counts.get(title, 0) + 1
+        # Ronda 1: 2 mensajes; ronda 2: los 10 del mensaje fallido uno a uno; ronda 3: solo el rechazado
+        if len(payloads) != 13 or sent_counts["Convocatoria 10"] != 1 or sent_counts["Rechazada"] != 3:
+            logger.error(f"❌ Reenvíos incorrectos: {payloads}")
+            return False
+        logger.info("✅ Solo se reenviaron los embeds del mensaje fallido y el rechazado quedó aislado")
+        
+        return True
+        
+    except Exception as e:
+        logger.error(f"❌ Error en prueba de agrupado de embeds: {e}")
+        return False
+    
+    finally:
+        if original_send:
+            agents.notifier.send_discord_message = original_send
+
+def test_discord_rate_limiter():
+    """Prueba el limitador guiado por cabeceras contra un webhook simulado."""
+    logger.info("=== PRUEBA 20: RATE LIMIT DE DISCORD ===")
+    
+    import json
+    import time
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    
+    # Webhook simulado: cubo de 5 peticiones que se reinicia cada segundo
+    state = {"window_start": None, "used": 0, "rate_limited": 0, "global_pending": False}
+    state_lock = threading.Lock()
+    
+    class WebhookHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            with state_lock:
+                now = time.monotonic()
+                if state["global_pending"]:
+                    state["global_pending"] = False
+                    state["rate_limited"] += 1
+                    self._reply(429, {"X-RateLimit-Global": "true"}, {"retry_after": 0.3, "global": True})
+                    return
+                if state["window_start"] is None or now - state["window_start"] >= 1.0:
+                    state["window_start"] = now
+                    state["used"] = 0
+                reset_after = f"{max(0.0, 1.0 - (now - state['window_start'])):.3f}"
+                if state["used"] >= 5:
+                    state["rate_limited"] += 1
+                    self._reply(429, {"Retry-After": reset_after, "X-RateLimit-Remaining": "0",
+                                      "X-RateLimit-Reset-After": reset_after}, {"retry_after": float(reset_after)})
+                    return
+                state["used"] += 1
+                self._reply(204, {"X-RateLimit-Limit": "5", "X-RateLimit-Remaining": str(5 - state["used"]),
+                                  "X-RateLimit-Reset-After": reset_after})
+        
+        def _reply(self, status, headers, body=None):
+            data = json.dumps(body).encode() if body else b""
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        
+        def log_message(self, *args):
+            pass
+    
+    server = ThreadingHTTPServer(("127.0.0.1", 0), WebhookHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    webhook_url = f"http://127.0.0.1:{server.server_address[1]}/api/webhooks/1/test"
+    
+    try:
+        from agents.notifier import send_discord_message
+        
+        start = time.perf_counter()
+        results = [send_discord_message(webhook_url, {"content": f"mensaje {i}"}) for i in range(12)]
+        elapsed = time.perf_counter() - start
+        
+        if not all(results):
+            logger.error(f"❌ Mensajes no entregados: {results}")
+            return False
+        if state["rate_limited"]:
+            logger.error(f"❌ El limitador no evitó {state['rate_limited']} respuestas 429")
+            return False
+        # 12 mensajes con cubos de 5 por segundo: dos reinicios de cubo, sin pausas fijas
+        if not 1.8 <= elapsed < 3.0:
+            logger.error(f"❌ Tiempo de envío inesperado: {elapsed:.2f}s")
+            return False
+        logger.info(f"✅ 12 mensajes en {elapsed:.2f}s sin ningún 429")
+        
+        # Un 429 global se respeta y se reintenta una sola vez tras retry_after
+        time.sleep(1.0)
+        state["global_pending"] = True
+        start = time.perf_counter()
+        ok = send_discord_message(webhook_url, {"content": "tras límite global"})
+        elapsed = time.perf_counter() - start
+        if not ok or state["rate_limited"] != 1 or not 0.3 <= elapsed < 0.9:
+            logger.error(f"❌ Límite global mal gestionado ({ok}, {state['rate_limited']} 429, {elapsed:.2f}s)")
+            return False
+        logger.info(f"✅ Límite global respetado: reintento tras {elapsed:.2f}s")
+        
+        return True
+        
+    except Exception as e:
+        logger.error(f"❌ Error en prueba de rate limit de Discord: {e}")
+        return False
+    
+    finally:
+        server.shutdown()
+
+def test_notification_outbox():
+    """Prueba el outbox de notificaciones: reintentos y reanudación tras un crash."""
+    logger.info("=== PRUEBA 21: OUTBOX DE NOTIFICACIONES ===")
+    
+    import agents.database
+    test_db = f"test_outbox_{datetime.now().timestamp()}.db"
+    original_db_file = agents.database.DB_FILE
+    try:
+        import agents.outbox
+        from agents.channels import NotificationChannel
+        agents.database.DB_FILE = test_db
+        agents.database.init_db()
+        
+        convocatorias = [
+            {"titulo": f"Convocatoria {i}", "url": f"https://test.example.com/{i}", "resumen": f"Resumen {i}", "fuente": "test"}
+            for i in range(3)
+        ]
+        
+        sent = []
+        failing = {"https://test.example.com/1"}
+        
+        class FakeDiscord(NotificationChannel):
+            format = "prueba"
+            
+            def format_item(self, convocatoria):
+                return convocatoria["url"]
+            
+            def send(self, items):
+                sent.extend(items)
+                return [url not in failing for url in items]
+        
+        channels = {"discord": FakeDiscord("discord", {})}
+        
+        encoladas = agents.database.enqueue_notifications(convocatorias)
+        if len(encoladas) != 3 or agents.database.filter_new_urls(c["url"] for c in convocatorias):
+            logger.error("❌ URLs y notificaciones no se guardaron juntas")
+            return False
+        if agents.database.enqueue_notifications(convocatorias):
+            logger.error("❌ Se encolaron notificaciones duplicadas")
+            return False
+        logger.info("✅ URLs y outbox guardados en la misma transacción, sin duplicados")
+        
+        result = agents.outbox.drain_outbox(max_attempts=2, channels=channels)
+        if result != {"enviadas": 2, "fallidas": 1, "pendientes": 1}:
+            logger.error(f"❌ Resultado del drenado incorrecto: {result}")
+            return False
+        logger.info("✅ Envío fallido conservado como pendiente")
+        
+        # Crash simulado: notificaciones encoladas que nunca se enviaron
+        agents.database.enqueue_notifications([{"titulo": "Tras crash", "url": "https://test.example.com/crash", "resumen": "", "fuente": "test"}])
+        sent.clear()
+        failing.clear()
+        result = agents.outbox.drain_outbox(max_attempts=2, channels=channels)
+        if sorted(sent) != ["https://test.example.com/1", "https://test.example.com/crash"] or result["pendientes"]:
+            logger.error(f"❌ Reanudación incorrecta: {sent} ({result})")
+            return False
+        logger.info("✅ Reanudación: solo se enviaron las pendientes, sin repetir las ya entregadas")
+        
+        # Una notificación que falla en todos los intentos pasa a 'failed'
+        failing.add("https://test.example.com/mala")
+        agents.database.enqueue_notifications([{"titulo": "Mala", "url": "https://test.example.com/mala", "resumen": "", "fuente": "test"}])
+        agents.outbox.drain_outbox(max_attempts=2, channels=channels)
+        agents.outbox.drain_outbox(max_attempts=2, channels=channels)
+        sent.clear()
+        agents.outbox.drain_outbox(max_attempts=2, channels=channels)
+        stats = agents.database.get_outbox_stats()
+        if sent or stats != {"sent": 4, "failed": 1}:
+            logger.error(f"❌ Estados del outbox incorrectos: {stats}")
+            return False
+        logger.info(f"✅ Estados finales del outbox: {stats}")
+        
+        return True
+        
+    except Exception as e:
+        logger.error(f"❌ Error en prueba del outbox: {e}")
+        return False
+    
+    finally:
+        agents.database.close_db()
+        agents.database.DB_FILE = original_db_file
+        if os.path.exists(test_db):
+            os.remove(test_db)
+
+def test_channel_fanout():
+    """Prueba el envío concurrente a varios canales con filtros y fallos aislados."""
+    logger.info("=== PRUEBA 22: CANALES DE NOTIFICACIÓN ===")
+    
+    import json
+    import time
+    import threading
+    
+    path = os.path.join(tempfile.mkdtemp(), "notificaciones.jsonl")
+    
+    try:
+        from agents.channels import NotificationChannel, FileChannel, dispatch, route_convocatoria
+        
+        # Un canal sin format_item o sin send no se puede instanciar
+        class IncompleteChannel(NotificationChannel):
+            def send(self, items):
+                return [True] * len(items)
+        try:
+            IncompleteChannel("incompleto", {})
+            logger.error("❌ Se instanció un canal sin format_item")
+            return False
+        except TypeError:
+            pass
+        
+        format_calls = []
+        calls_lock = threading.Lock()
+        
+        class SlowChannel(NotificationChannel):
+            format = "prueba"
+            
+            def format_item(self, convocatoria):
+                with calls_lock:
+                    format_calls.append(convocatoria["url"])
+                return convocatoria["url"]
+            
+            def send(self, items):
+                time.sleep(self.config.get("delay", 0))
+                return [True] * len(items)
+        
+        class BrokenChannel(NotificationChannel):
+            format = "roto"
+            
+            def format_item(self, convocatoria):
+                return convocatoria
+            
+            def send(self, items):
+                raise ConnectionError("servicio caído")
+        
+        channels = {
+            "archivo": FileChannel("archivo", {"path": path, "fuentes": ["minciencias"]}),
+            "lento": SlowChannel("lento", {"delay": 1.0}),
+            "espejo": SlowChannel("espejo", {"excluir_fuentes": ["botnar"]}),
+            "roto": BrokenChannel("roto", {})
+        }
+        convocatorias = [
+            {"titulo": "A", "url": "https://test.example.com/a", "resumen": "", "fuente": "minciencias"},
+            {"titulo": "B", "url": "https://test.example.com/b", "resumen": "", "fuente": "botnar"}
+        ]
+        
+        routes = {c["url"]: route_convocatoria(c, channels) for c in convocatorias}
+        if routes != {"https://test.example.com/a": ["archivo", "lento", "espejo", "roto"],
+                      "https://test.example.com/b": ["lento", "roto"]}:
+            logger.error(f"❌ Filtros por fuente incorrectos: {routes}")
+            return False
+        logger.info("✅ Filtros por fuente aplicados a cada canal")
+        
+        start = time.perf_counter()
+        done_at = {}
+        assignments = {name: [c for c in convocatorias if name in routes[c["url"]]] for name in channels}
+        results = dispatch(assignments, channels, on_channel_done=lambda name, delivered: done_at.setdefault(name, time.perf_counter() - start))
+        
+        if results["roto"]["delivered"] != [False, False] or not results["roto"]["error"]:
+            logger.error(f"❌ El fallo del canal roto no quedó registrado: {results['roto']}")
+            return False
+        if results["archivo"]["delivered"] != [True] or results["lento"]["delivered"] != [True, True]:
+            logger.error(f"❌ Un canal afectó a los demás: {results}")
+            return False
+        logger.info("✅ Fallo de un canal aislado del resto")
+        
+        if done_at["archivo"] >= 0.5 or results["lento"]["latency"] < 1.0:
+            logger.error(f"❌ El canal lento retrasó a los rápidos: {done_at}")
+            return False
+        logger.info(f"✅ Canales en paralelo: archivo en {done_at['archivo']:.2f}s, lento en {done_at['lento']:.2f}s")
+        
+        if sorted(format_calls) != ["https://test.example.com/a", "https://test.example.com/b"]:
+            logger.error(f"❌ Elementos construidos más de una vez por formato: {format_calls}")
+            return False
+        logger.info("✅ Cada elemento se construyó una sola vez por formato")
+        
+        with open(path, encoding="utf-8") as f:
+            lines = [json.loads(line) for line in f]
+        if [line["url"] for line in lines] != ["https://test.example.com/a"]:
+            logger.error(f"❌ Contenido del fichero JSONL incorrecto: {lines}")
+            return False
+        logger.info("✅ Canal de fichero JSONL escrito")
+        
+        return True
+        
+    except Exception as e:
+        logger.error(f"❌ Error en prueba de canales de notificación: {e}")
+        return False
+    
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+        os.rmdir(os.path.dirname(path))
+
+def test_near_duplicates():
+    """Prueba la URL canónica y la detección de casi duplicados con SimHash."""
+    logger.info("=== PRUEBA 23: CASI DUPLICADOS ===")
+    
+    import time
+    import random
+    import sqlite3
+    import agents.database
+    test_db = f"test_dedup_{datetime.now().timestamp()}.db"
+    original_db_file = agents.database.DB_FILE
+    try:
+        from utils.urls import canonicalize_url
+        from utils.simhash import simhash, to_signed, from_signed
+        from agents.dedup import Deduplicator
+        
+        variantes = [
+            "https://www.worldbank.org/calls/123/?utm_source=newsletter&b=2&a=1",
+            "http://worldbank.org/calls/123?a=1&b=2&fbclid=abc#inicio",
+            "https://WORLDBANK.org:443/calls/123/?a=1&b=2"
+        ]
+        if len({canonicalize_url(u) for u in variantes}) != 1:
+            logger.error(f"❌ Variantes con distinta URL canónica: {[canonicalize_url(u) for u in variantes]}")
+            return False
+        if (canonicalize_url("https://x.org/c?id=1") == canonicalize_url("https://x.org/c?id=2")
+                or canonicalize_url("https://x.org/c?ref=2024-017") == canonicalize_url("https://x.org/c?ref=2024-018")):
+            logger.error("❌ La URL canónica descartó un parámetro significativo")
+            return False
+        logger.info("✅ Variantes de URL reducidas a la misma forma canónica")
+        
+        fingerprint = simhash("Convocatoria de innovación para pymes colombianas")
+        if fingerprint is None or from_signed(to_signed(fingerprint)) != fingerprint or simhash("Convocatoria abierta") is not None:
+            logger.error("❌ Huellas SimHash incorrectas")
+            return False
+        
+        # Base de datos anterior a la deduplicación: se migra conservando las URLs
+        conn = sqlite3.connect(test_db)
+        conn.execute("CREATE TABLE convocatorias (url TEXT PRIMARY KEY, titulo TEXT, fuente TEXT, fecha_agregado TIMESTAMP DEFAULT CURRENT_TIMESTAMP)")
+        conn.execute("INSERT INTO convocatorias (url, titulo, fuente) VALUES (?, ?, ?)", (variantes[0], "World Bank", "worldbank"))
+        conn.commit()
+        conn.close()
+        agents.database.DB_FILE = test_db
+        agents.database.init_db()
+        if agents.database.filter_new_urls(variantes[1:]):
+            logger.error("❌ La migración no calculó la URL canónica de las filas existentes")
+            return False
+        logger.info("✅ Migración: URLs existentes comparadas por forma canónica")
+        
+        texto = ("Financiación de proyectos de transformación digital para pequeñas y medianas empresas "
+                 "con cofinanciación de hasta el 70% del valor total.")
+        agents.database.add_urls_bulk([
+            {"titulo": "Convocatoria de innovación para pymes 2025", "url": "https://innpulsa.example.com/c/1", "resumen": texto, "fuente": "innpulsa"}
+        ])
+        
+        convocatorias = [
+            # Mismo texto publicado en otro portal, con otra puntuación
+            {"titulo": "CONVOCATORIA DE INNOVACION PARA PYMES 2025 -", "url": "https://idb.example.com/x/9", "resumen": texto.rstrip("."), "fuente": "idb"},
+            # Variante de URL ya guardada
+            {"titulo": "World Bank", "url": variantes[1], "resumen": "", "fuente": "worldbank"},
+            # Nueva, y su réplica en otro portal dentro de la misma ejecución
+            {"titulo": "Call for proposals: climate resilience in Latin America", "url": "https://a.example.com/climate",
+             "resumen": "Grants for NGOs working on adaptation projects in the Andes region.", "fuente": "a"},
+            {"titulo": "Call for proposals - Climate resilience in Latin America", "url": "https://b.example.com/climate?utm_campaign=x",
+             "resumen": "Grants for NGOs working on adaptation projects in the Andes region", "fuente": "b"},
+            # Nueva y distinta
+            {"titulo": "Premio nacional de ciencia para investigadores jóvenes", "url": "https://c.example.com/premio",
+             "resumen": "Estancias en universidades europeas y apoyo económico para biotecnología.", "fuente": "c"}
+        ]
+        deduplicator = Deduplicator()
+        nuevas = deduplicator.filter(convocatorias)
+        urls = [c["url"] for c in nuevas]
+        if urls != ["https://a.example.com/climate", "https://c.example.com/premio"] or deduplicator.near_duplicates_found != 2:
+            logger.error(f"❌ Deduplicación incorrecta: {urls} ({deduplicator.near_duplicates_found} casi duplicadas)")
+            return False
+        logger.info("✅ Casi duplicados suprimidos contra el histórico y dentro de la ejecución")
+        
+        # Las casi duplicadas quedan guardadas: no se vuelven a procesar en otra ejecución
+        if agents.database.filter_new_urls([convocatorias[0]["url"], convocatorias[3]["url"]]):
+            logger.error("❌ Las casi duplicadas no se guardaron como vistas")
+            return False
+        if agents.database.get_stats()["por_estado"].get(agents.database.ESTADO_DUPLICADA) != 2:
+            logger.error(f"❌ Estados guardados incorrectos: {agents.database.get_stats()['por_estado']}")
+            return False
+        logger.info("✅ Casi duplicadas guardadas con estado 'duplicada'")
+        
+        # La huella calculada al deduplicar se guarda aunque el resumen cambie después
+        resumidas = [dict(c, resumen="Resumen generado por el LLM") for c in nuevas]
+        encoladas = agents.database.enqueue_notifications(resumidas)
+        if any("simhash" in row["convocatoria"] for row in encoladas):
+            logger.error("❌ La huella se filtró a la notificación")
+            return False
+        replica = dict(convocatorias[4], url="https://d.example.com/premio-espejo")
+        if Deduplicator().filter([replica]):
+            logger.error("❌ No se detectó la réplica de una convocatoria recién guardada")
+            return False
+        logger.info("✅ Huella original guardada con la convocatoria")
+        
+        # Una descartada por el clasificador cuenta como vista y su huella detecta réplicas
+        descartada = {"titulo": "Subvenciones para explotaciones ganaderas en Castilla y León",
+                      "url": "https://e.example.com/ganaderia", "fuente": "e",
+                      "resumen": "Ayudas a la modernización de granjas de vacuno y ovino en la comunidad autónoma."}
+        agents.database.add_urls_bulk([descartada], estado=agents.database.ESTADO_DESCARTADA)
+        replica = dict(descartada, url="https://f.example.com/ganaderia-copia")
+        if Deduplicator().filter([dict(descartada), replica]):
+            logger.error("❌ Una convocatoria descartada se volvería a clasificar")
+            return False
+        if agents.database.get_stats()["por_fuente"].get("e"):
+            logger.error("❌ Las descartadas cuentan como convocatorias relevantes en las estadísticas")
+            return False
+        logger.info("✅ Descartadas guardadas: ni ellas ni sus réplicas vuelven al clasificador")
+        
+        # La búsqueda usa el índice de bandas, no un recorrido del histórico
+        rng = random.Random(7)
+        with agents.database.get_db_connection() as conn:
+            agents.database._insert_convocatorias(conn, [
+                {"url": f"https://hist.example.com/{i}", "simhash": rng.getrandbits(64)} for i in range(20000)
+            ])
+            conn.commit()
+            plan = " ".join(row[-1] for row in conn.execute(
+                "EXPLAIN QUERY PLAN SELECT url FROM simhash_bandas WHERE banda = 0 AND valor = 1"
+            ).fetchall())
+        start = time.perf_counter()
+        found = agents.database.find_near_duplicates({"https://nueva.example.com": rng.getrandbits(64)}, 3)
+        elapsed = time.perf_counter() - start
+        if "SCAN" in plan or found or elapsed > 0.5:
+            logger.error(f"❌ Búsqueda de casi duplicados sin índice ({plan}, {elapsed:.3f}s)")
+            return False
+        logger.info(f"✅ Búsqueda por bandas en {elapsed * 1000:.1f}ms con 20000 huellas guardadas")
+        
+        return True
+        
+    except Exception as e:
+        logger.error(f"❌ Error en prueba de casi duplicados: {e}")
+        return False
+    
+    finally:
+        agents.database.close_db()
+        agents.database.DB_FILE = original_db_file
+        if os.path.exists(test_db):
+            os.remove(test_db)
+
+def test_relevance_prefilter():
+    """Prueba el prefiltro TF-IDF que descarta sin LLM las convocatorias ajenas al perfil."""
+    logger.info("=== PRUEBA 24: PREFILTRO DE RELEVANCIA ===")
+    
+    original_invoke = None
+    
+    try:
+        import agents.classifier
+        from agents.prefilter import get_prefilter, load_labeled, evaluate_thresholds
+        original_invoke = agents.classifier.cached_llm_invoke
+        
+        # Regresión sobre el conjunto con el que se ajustó el umbral (no es una evaluación independiente)
+        metrics = evaluate_thresholds(get_prefilter(), load_labeled())
+        if metrics["recall"] < 1.0 or metrics["al_llm"] > 0.7:
+            logger.error(f"❌ El umbral por defecto cambió de comportamiento en el conjunto de ajuste: {metrics}")
+            return False
+        logger.info(f"✅ Conjunto de ajuste: ninguna relevante descartada, {metrics['al_llm']:.0%} al LLM")
+        
+        prompts = []
+        
+        def fake_invoke(llm, prompt, rate_limiter=None):
+            prompts.append(prompt)
+            return '{"1": "SI", "2": "SI", "3": "NO"}'
+        
+        agents.classifier.cached_llm_invoke = fake_invoke
+        
+        convocatorias = [
+            {"titulo": "Estímulos para compañías de teatro y danza", "url": "https://test.com/teatro",
+             "resumen": "El Ministerio de Cultura otorga estímulos a la creación de obras de artes escénicas."},
+            # Muy afín al perfil (puntuación alta) y sin reglas que la decidan
+            {"titulo": "Dashboards interactivos y visualización para mipymes", "url": "https://test.com/datos",
+             "resumen": "Servicios de analítica, Power BI, Tableau y bases de datos en la nube para pequeñas empresas."},
+            {"titulo": "Reto de innovación para el sector energético", "url": "https://test.com/energia",
+             "resumen": "Soluciones tecnológicas de monitoreo de redes eléctricas con datos."},
+            {"titulo": "IA aplicada", "url": "https://test.com/ia", "resumen": ""}
+        ]
+        relevantes = agents.classifier.classify_convocatorias(convocatorias, batch_size=10)
+        urls = [c["url"] for c in relevantes]
+        
+        if len(prompts) != 1 or "teatro" in prompts[0]:
+            logger.error("❌ El LLM recibió convocatorias que el prefiltro debía descartar")
+            return False
+        # Una muy afín al perfil también pasa por el LLM, que comprueba la elegibilidad
+        if "mipymes" not in prompts[0] or "energético" not in prompts[0] or "IA aplicada" not in prompts[0]:
+            logger.error("❌ Las convocatorias afines, dudosas o con poco texto no llegaron al LLM")
+            return False
+        if urls != ["https://test.com/datos", "https://test.com/energia"]:
+            logger.error(f"❌ Convocatorias relevantes incorrectas: {urls}")
+            return False
+        logger.info("✅ El prefiltro solo descarta; el resto se decide en el LLM")
+        
+        return True
+        
+    except Exception as e:
+        logger.error(f"❌ Error en prueba del prefiltro de relevancia: {e}")
+        return False
+    
+    finally:
+        if original_invoke:
+            agents.classifier.cached_llm_invoke = original_invoke
+
+def test_rule_classifier():
+    """Prueba el clasificador por reglas de palabras clave."""
+    logger.info("=== PRUEBA 25: REGLAS DE CLASIFICACIÓN ===")
+    
+    import time
+    original_invoke = None
+    original_engine = None
+    
+    try:
+        import agents.rules
+        import agents.classifier
+        from agents.rules import RuleEngine, load_rules_config
+        original_invoke = agents.classifier.cached_llm_invoke
+        original_engine = agents.rules._engine
+        
+        shipped = RuleEngine(load_rules_config())
+        if not shipped.rules:
+            logger.error("❌ reglas_clasificacion.json no produjo reglas")
+            return False
+        
+        engine = RuleEngine({
+            "positivas": {"ia": ["inteligencia artificial", "machine learning"], "datos": ["ciencia de datos"]},
+            "negativas": {"artes": ["artes escenicas", "teatro"]},
+            "elegibilidad": {"solo_espana": ["exclusiv[oa]s? para empresas espanolas"]}
+        })
+        casos = [
+            # Las positivas no aceptan: marcan la convocatoria como afín para el LLM
+            ({"titulo": "Retos de Inteligencia Artificial", "resumen": ""}, (None, "positivas.ia")),
+            ({"titulo": "Ayudas a la CIENCIA DE DATOS", "resumen": ""}, (None, "positivas.datos")),
+            ({"titulo": "Estímulos a las artes escénicas", "resumen": ""}, (False, "negativas.artes")),
+            ({"titulo": "Machine learning en salud", "resumen": "Exclusivo para empresas españolas"}, (False, "elegibilidad.solo_espana")),
+            ({"titulo": "Machine learning para compañías de teatro", "resumen": ""}, (None, None)),
+            ({"titulo": "Teatrolandia: convocatoria de cofinanciación", "resumen": ""}, (None, None))
+        ]
+        for convocatoria, esperado in casos:
+            if engine.decide(convocatoria) != esperado:
+                logger.error(f"❌ Decisión incorrecta para '{convocatoria['titulo']}': {engine.decide(convocatoria)}")
+                return False
+        logger.info("✅ Prioridad de elegibilidad, conflictos y palabras completas sin tildes")
+        
+        texto = {"titulo": "Convocatoria de innovación abierta para pymes del sector energético",
+                 "resumen": "Cofinanciación de proyectos de eficiencia energética y monitoreo de redes " * 3}
+        start = time.perf_counter()
+        for _ in range(2000):
+            shipped.decide(texto)
+        per_item = (time.perf_counter() - start) / 2000
+        if per_item > 0.0005:
+            logger.error(f"❌ Reglas demasiado lentas: {per_item * 1e6:.0f}µs por convocatoria")
+            return False
+        logger.info(f"✅ {len(shipped.rules)} reglas en una sola regex: {per_item * 1e6:.0f}µs por convocatoria")
+        
+        prompts = []
+        limiters = []
+        
+        def fake_invoke(llm, prompt, rate_limiter=None):
+            prompts.append(prompt)
+            limiters.append(rate_limiter)
+            return '{"1": "SI", "2": "SI"}'
+        
+        agents.classifier.cached_llm_invoke = fake_invoke
+        agents.rules._engine = engine
+        # Prefiltro que descarta todo texto suficientemente largo
+        from agents.prefilter import RelevancePrefilter
+        original_prefilter = agents.classifier.get_prefilter
+        agents.classifier.get_prefilter = lambda: RelevancePrefilter(agents.classifier.COMPANY_PROFILE, low=1.1)
+        
+        convocatorias = [
+            {"titulo": "Retos de inteligencia artificial para pymes", "url": "https://test.com/ia",
+             "resumen": "Cofinanciación de soluciones de automatización en empresas manufactureras."},
+            {"titulo": "Festival de teatro", "url": "https://test.com/teatro", "resumen": ""},
+            {"titulo": "Innovación abierta", "url": "https://test.com/abierta", "resumen": ""},
+            {"titulo": "Ferias gastronómicas regionales", "url": "https://test.com/ferias",
+             "resumen": "Reconocimiento a cocineros tradicionales y mercados campesinos del Caribe."}
+        ]
+        try:
+            relevantes = agents.classifier.classify_convocatorias(convocatorias, batch_size=10)
+        finally:
+            agents.classifier.get_prefilter = original_prefilter
+        origen = {c["url"]: c.get("clasificado_por") for c in convocatorias}
+        
+        if len(prompts) != 1 or "teatro" in prompts[0].lower() or "gastronómicas" in prompts[0]:
+            logger.error("❌ El LLM recibió convocatorias descartadas por reglas o prefiltro")
+            return False
+        # La afín por regla positiva llega al LLM aunque el prefiltro la habría descartado
+        if "Retos de inteligencia artificial" not in prompts[0] or "Innovación abierta" not in prompts[0]:
+            logger.error("❌ Una convocatoria con regla positiva no pasó por el LLM")
+            return False
+        if [c["url"] for c in relevantes] != ["https://test.com/ia", "https://test.com/abierta"]:
+            logger.error(f"❌ Convocatorias relevantes incorrectas: {[c['url'] for c in relevantes]}")
+            return False
+        from utils.rate_limit import get_gemini_rate_limiter
+        if limiters != [get_gemini_rate_limiter()]:
+            logger.error("❌ La clasificación no usa el limitador compartido de Gemini")
+            return False
+        if origen != {"https://test.com/ia": "llm", "https://test.com/teatro": "regla:negativas.artes",
+                      "https://test.com/abierta": "llm", "https://test.com/ferias": "prefiltro"}:
+            logger.error(f"❌ Etapa de clasificación mal registrada: {origen}")
+            return False
+        logger.info("✅ Las reglas solo descartan; las afines las decide el LLM sin pasar por el prefiltro")
+        
+        return True
+        
+    except Exception as e:
+        logger.error(f"❌ Error en prueba de reglas de clasificación: {e}")
+        return False
+    
+    finally:
+        if original_invoke:
+            agents.classifier.cached_llm_invoke = original_invoke
+            agents.rules._engine = original_engine
+
+def test_portal_scheduler():
+    """Prueba el estado por portal y el planificador de ejecuciones incrementales."""
+    logger.info("=== PRUEBA 26: PLANIFICADOR DE PORTALES ===")
+    
+    from datetime import timedelta, timezone
+    import agents.database
+    test_db = f"test_scheduler_{datetime.now().timestamp()}.db"
+    original_db_file = agents.database.DB_FILE
+    try:
+        from agents.scraper import listing_fingerprint
+        from agents.scheduler import (SCHEDULER_MIN_HOURS, SCHEDULER_MAX_HOURS, next_portal_state,
+                                      record_portal_runs, due_portals, select_portals)
+        agents.database.DB_FILE = test_db
+        agents.database.init_db()
+        
+        a = listing_fingerprint([{"url": "https://x.org/1"}, {"url": "https://x.org/2?utm_source=n"}])
+        b = listing_fingerprint([{"url": "https://www.x.org/2"}, {"url": "https://x.org/1/"}])
+        if a != b or a == listing_fingerprint([{"url": "https://x.org/1"}]):
+            logger.error("❌ La huella del listado depende del orden o de variantes de URL")
+            return False
+        
+        def timing(huella=None, error=None, total=1.0):
+            return {"portal": "p", "total": total, "convocatorias": 3, "huella": huella, "error": error}
+        
+        now = datetime.now(timezone.utc)
+        state = next_portal_state(None, timing("h1", total=2.0), now=now)
+        if state["intervalo_horas"] != SCHEDULER_MIN_HOURS or state["latencia_media"] != 2.0:
+            logger.error(f"❌ Estado inicial incorrecto: {state}")
+            return False
+        
+        # Un portal que no cambia se visita cada vez menos, hasta una vez por semana
+        for _ in range(10):
+            state = next_portal_state(state, timing(None, total=1.0), now=now)
+        if state["intervalo_horas"] != SCHEDULER_MAX_HOURS or state["huella"] != "h1" or not 1.0 < state["latencia_media"] < 1.1:
+            logger.error(f"❌ Intervalo de un portal estático incorrecto: {state}")
+            return False
+        
+        # Un cambio acorta el intervalo; los errores seguidos se reintentan con espera creciente
+        changed = next_portal_state(state, timing("h2"), now=now)
+        failed = next_portal_state(changed, timing(error="timeout"), now=now)
+        failed = next_portal_state(failed, timing(error="timeout"), now=now)
+        retry_hours = (datetime.fromisoformat(failed["proxima_ejecucion"]) - now).total_seconds() / 3600
+        if changed["intervalo_horas"] != SCHEDULER_MAX_HOURS / 2 or failed["errores_seguidos"] != 2 \
+                or retry_hours != 2 * SCHEDULER_MIN_HOURS or failed["huella"] != "h2":
+            logger.error(f"❌ Cambio o racha de errores mal gestionados: {changed}, {failed}")
+            return False
+        fixed = next_portal_state(changed, timing(None), {"url": "https://x.org", "interval_hours": 12}, now=now)
+        if fixed["intervalo_horas"] != 12:
+            logger.error(f"❌ Intervalo fijo del portal ignorado: {fixed}")
+            return False
+        logger.info("✅ Intervalos adaptativos, espera tras errores e intervalo fijo")
+        
+        portales = {"rapido": "https://rapido.example.com", "estatico": "https://estatico.example.com",
+                    "nuevo": "https://nuevo.example.com"}
+        record_portal_runs([dict(timing("r1"), portal="rapido")], portales)
+        estados = agents.database.get_portal_states()
+        estados["estatico"] = dict(estados["rapido"], intervalo_horas=SCHEDULER_MAX_HOURS,
+                                   proxima_ejecucion=(now + timedelta(days=7)).isoformat())
+        agents.database.save_portal_states({"estatico": estados["estatico"]})
+        
+        ahora = list(due_portals(portales, now=now))
+        despues = list(due_portals(portales, now=now + timedelta(hours=SCHEDULER_MIN_HOURS)))
+        if ahora != ["nuevo"] or despues != ["rapido", "nuevo"]:
+            logger.error(f"❌ Portales pendientes incorrectos: {ahora}, {despues}")
+            return False
+        if list(select_portals(portales, mode="full")) != list(portales):
+            logger.error("❌ El modo completo no incluye todos los portales")
+            return False
+        logger.info("✅ Solo se visitan los portales pendientes y los nunca vistos")
+        
+        return True
+        
+    except Exception as e:
+        logger.error(f"❌ Error en prueba del planificador: {e}")
+        return False
+    
+    finally:
+        agents.database.close_db()
+        agents.database.DB_FILE = original_db_file
+        if os.path.exists(test_db):
+            os.remove(test_db)
+
+def test_circuit_breaker():
+    """Prueba los cortacircuitos por host, el timeout adaptativo y el límite de la ejecución."""
+    logger.info("=== PRUEBA 27: CORTACIRCUITOS Y TIMEOUTS ADAPTATIVOS ===")
+    
+    import time
+    import threading
+    import requests
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    import utils.http_cache
+    import utils.retry
+    import utils.circuit_breaker as cb
+    
+    hits = []
+    healthy = threading.Event()
+    
+    class FlakyHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            hits.append(self.path)
+            status = 200 if healthy.is_set() or self.path == "/ok" else 503
+            body = b"<html><body>ok</body></html>"
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def log_message(self, *args):
+            pass
+    
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FlakyHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    
+    test_cache = f"test_http_{datetime.now().timestamp()}.db"
+    test_state = f"test_hosts_{datetime.now().timestamp()}.db"
+    original_cache_file = utils.http_cache.HTTP_CACHE_FILE
+    original_state_file = cb.CIRCUIT_STATE_FILE
+    original_sleep = utils.retry.time.sleep
+    utils.http_cache.HTTP_CACHE_FILE = test_cache
+    cb.CIRCUIT_STATE_FILE = test_state
+    # Sin esperas entre reintentos; se anota si el hueco del host está libre durante cada espera
+    slot = threading.Semaphore(1)
+    slot_free = []
+    utils.retry.time.sleep = lambda seconds: slot_free.append(slot.acquire(blocking=False) and (slot.release() or True))
+    utils.retry.reset_retry_budget()
+    cb.reset_circuits()
+    
+    try:
+        # Cada llamada, con todos sus reintentos, cuenta como un fallo; la que
+        # abre el circuito devuelve su error (el planificador la cuenta como fallo)
+        circuit = cb.get_circuit(base)
+        for call in range(cb.CIRCUIT_FAILURE_THRESHOLD):
+            try:
+                utils.retry.robust_http_request(f"{base}/fallo", slot=slot)
+                logger.error("❌ Un host que devuelve 503 no produjo error")
+                return False
+            except cb.CircuitOpenError:
+                logger.error(f"❌ La llamada {call + 1} se omitió en lugar de fallar")
+                return False
+            except requests.HTTPError:
+                pass
+            if circuit.failures != call + 1:
+                logger.error(f"❌ Fallos contados por reintento y no por llamada: {circuit.failures} tras {call + 1} llamadas")
+                return False
+        if not slot_free or not all(slot_free):
+            logger.error(f"❌ El hueco del host sigue ocupado durante las esperas entre reintentos: {slot_free}")
+            return False
+        intentos = len(hits)
+        if intentos <= cb.CIRCUIT_FAILURE_THRESHOLD or circuit.state != "abierto":
+            logger.error(f"❌ El circuito no se abrió tras {cb.CIRCUIT_FAILURE_THRESHOLD} llamadas reintentadas: {hits}")
+            return False
+        try:
+            utils.retry.robust_http_request(f"{base}/ok")
+            logger.error("❌ Una petición con el circuito abierto no se omitió")
+            return False
+        except cb.CircuitOpenError:
+            pass
+        if len(hits) != intentos:
+            logger.error(f"❌ Peticiones con el circuito abierto: {hits}")
+            return False
+        logger.info(f"✅ Circuito abierto tras {cb.CIRCUIT_FAILURE_THRESHOLD} llamadas ({intentos} intentos); las siguientes no salen")
+        
+        # Pasada la espera, una petición de prueba sin reintentos: si falla se reabre, si funciona se cierra
+        circuit.open_until = time.time() - 1
+        try:
+            utils.retry.robust_http_request(f"{base}/fallo")
+        except requests.HTTPError:
+            pass
+        if len(hits) != intentos + 1 or circuit.state != "abierto" or circuit.probing:
+            logger.error(f"❌ Petición de prueba fallida mal gestionada: {hits}, {circuit.state}")
+            return False
+        healthy.set()
+        circuit.open_until = time.time() - 1
+        utils.retry.robust_http_request(f"{base}/fallo")
+        if circuit.state != "cerrado" or circuit.failures:
+            logger.error(f"❌ El circuito no se cerró tras una prueba correcta: {circuit.state}")
+            return False
+        logger.info("✅ Estado semiabierto: la prueba fallida reabre y la correcta cierra")
+        
+        # El timeout sigue al percentil de latencia del host, entre los límites
+        for _ in range(cb.LATENCY_MIN_SAMPLES):
+            utils.retry.robust_http_request(f"{base}/ok")
+        lento = cb.HostCircuit("lento.example.com", latencies=[3.0] * 9 + [6.0])
+        esperado = min(cb.HTTP_TIMEOUT_MAX, max(cb.HTTP_TIMEOUT_MIN, cb.percentile(lento.latencies, cb.HTTP_TIMEOUT_PERCENTILE) * cb.HTTP_TIMEOUT_FACTOR))
+        if circuit.timeout() != cb.HTTP_TIMEOUT_MIN or lento.timeout() != esperado \
+                or cb.HostCircuit("nuevo.example.com").timeout() != cb.HTTP_TIMEOUT_MAX:
+            logger.error(f"❌ Timeouts adaptativos incorrectos: {circuit.timeout()}, {lento.timeout()}")
+            return False
+        logger.info(f"✅ Timeout adaptativo: {circuit.timeout():.1f}s local, {lento.timeout():.1f}s para un host lento")
+        
+        # El estado se conserva entre ejecuciones, aunque se borre la caché HTTP
+        caido = cb.get_circuit("https://caido.example.com/convocatorias")
+        for _ in range(cb.CIRCUIT_FAILURE_THRESHOLD):
+            caido.record_failure()
+        cb.save_circuits()
+        cb.reset_circuits()
+        if os.path.exists(test_cache):
+            os.remove(test_cache)
+        if cb.get_circuit("https://caido.example.com/").state != "abierto" \
+                or len(cb.get_circuit(base).latencies) != len(circuit.latencies):
+            logger.error("❌ El estado de los hosts no se recuperó de la caché")
+            return False
+        logger.info("✅ Circuitos y latencias recuperados en una nueva ejecución")
+        
+        # Agotado el límite de la ejecución, los portales pendientes se omiten sin contar como error
+        from agents.scraper import scrape_single_portal
+        cb.start_run_deadline(0.01)
+        original_sleep(0.05)
+        _, timing = scrape_single_portal("tardio", f"{base}/ok")
+        if not timing["omitido"] or timing["error"]:
+            logger.error(f"❌ Portal tras el límite de la ejecución: {timing}")
+            return False
+        logger.info("✅ Tras el límite de la ejecución los portales se omiten")
+        
+        return True
+        
+    except Exception as e:
+        logger.error(f"❌ Error en prueba de cortacircuitos: {e}")
+        return False
+    
+    finally:
+        cb.start_run_deadline(0)
+        cb.reset_circuits()
+        utils.retry.time.sleep = original_sleep
+        utils.http_cache.HTTP_CACHE_FILE = original_cache_file
+        cb.CIRCUIT_STATE_FILE = original_state_file
+        for path in (test_cache, test_state):
+            if os.path.exists(path):
+                os.remove(path)
+        server.shutdown()
+
+def test_retry_policies():
+    """Prueba los reintentos con jitter, Retry-After, clasificación de errores y presupuesto."""
+    logger.info("=== PRUEBA 28: POLÍTICAS DE REINTENTO ===")
+    
+    import json
+    import asyncio
+    import requests
+    import utils.retry
+    from utils.retry import retry_with_backoff, is_transient_error, reset_retry_budget
+    
+    delays = []
+    original_sleep = utils.retry.time.sleep
+    original_uniform = utils.retry.random.uniform
+    utils.retry.time.sleep = delays.append
+    # Jitter determinista: siempre el máximo del intervalo
+    utils.retry.random.uniform = lambda low, high: high
+    reset_retry_budget()
+    
+    def http_error(status, headers=None):
+        response = requests.Response()
+        response.status_code = status
+        response.headers.update(headers or {})
+        return requests.HTTPError(f"{status}", response=response)
+    
+    try:
+        # Corrutinas: se reintentan sin bloquear el bucle de eventos
+        calls = []
+        
+        @retry_with_backoff(max_retries=3, base_delay=0.01, retryable=is_transient_error)
+        async def flaky_coroutine():
+            calls.append(1)
+            if len(calls) < 3:
+                raise ConnectionError("conexión reiniciada")
+            return "ok"
+        
+        if not asyncio.iscoroutinefunction(flaky_coroutine) or asyncio.run(flaky_coroutine()) != "ok" or len(calls) != 3:
+            logger.error(f"❌ Reintentos de corrutinas incorrectos: {len(calls)} intentos")
+            return False
+        logger.info("✅ Corrutina reintentada con asyncio.sleep")
+        
+        # Clasificación: solo los errores pasajeros se reintentan
+        from google.api_core import exceptions as google_exceptions
+        cases = {
+            "503": (http_error(503), True),
+            "429": (google_exceptions.ResourceExhausted("cuota"), True),
+            "timeout": (requests.Timeout("lento"), True),
+            "404": (http_error(404), False),
+            "clave inválida": (google_exceptions.PermissionDenied("API key not valid"), False),
+            "JSON": (json.JSONDecodeError("inválido", "{", 0), False)
+        }
+        wrong = [name for name, (error, expected) in cases.items() if is_transient_error(error) != expected]
+        attempts = []
+        
+        @retry_with_backoff(max_retries=3, base_delay=0.01, retryable=is_transient_error)
+        def parse_response():
+            attempts.append(1)
+            raise json.JSONDecodeError("inválido", "{", 0)
+        
+        try:
+            parse_response()
+        except json.JSONDecodeError:
+            pass
+        if wrong or len(attempts) != 1:
+            logger.error(f"❌ Clasificación de errores incorrecta: {wrong}, {len(attempts)} intentos")
+            return False
+        logger.info("✅ 429/5xx/red se reintentan; 404, clave inválida y JSON inválido no")
+        
+        # Full jitter acotado por el backoff exponencial; Retry-After sustituye
+        # al jitter aunque este fuera mayor (el cuarto backoff sería 8s)
+        delays.clear()
+        failures = [http_error(503), http_error(503), http_error(503), http_error(429, {"Retry-After": "7"})]
+        
+        @retry_with_backoff(max_retries=4, base_delay=1.0, max_delay=30.0, retryable=is_transient_error)
+        def rate_limited():
+            if failures:
+                raise failures.pop(0)
+            return "ok"
+        
+        rate_limited()
+        if delays != [1.0, 2.0, 4.0, 7.0]:
+            logger.error(f"❌ Esperas incorrectas: {delays}")
+            return False
+        logger.info(f"✅ Esperas con jitter {[round(d, 2) for d in delays[:3]]} y Retry-After de {delays[3]:.0f}s")
+        
+        # Presupuesto global: agotado, los fallos se propagan sin reintentar
+        budget = reset_retry_budget(ratio=0.0, minimum=2)
+        attempts.clear()
+        
+        @retry_with_backoff(max_retries=5, base_delay=0.01)
+        def always_failing():
+            attempts.append(1)
+            raise ValueError("fallo")
+        
+        try:
+            always_failing()
+        except ValueError:
+            pass
+        if len(attempts) != 3 or budget.stats() != {"llamadas": 1, "reintentos": 2, "denegados": 1}:
+            logger.error(f"❌ Presupuesto de reintentos ignorado: {len(attempts)} intentos, {budget.stats()}")
+            return False
+        logger.info("✅ Presupuesto de reintentos agotado: el error se propaga al momento")
+        
+        return True
+        
+    except Exception as e:
+        logger.error(f"❌ Error en prueba de políticas de reintento: {e}")
+        return False
+    
+    finally:
+        utils.retry.time.sleep = original_sleep
+        utils.retry.random.uniform = original_uniform
+        reset_retry_budget()
+
 def main():
     """Ejecuta todas las pruebas básicas."""
     logger.info("🧪 Iniciando pruebas básicas del sistema FundBot...")
@@ -253,7 +2308,30 @@ def main():
         ("Base de datos", test_database_operations),
         ("Configuración", test_config_loading),
         ("Webhook validation", test_webhook_validation),
-        ("Retry decorator", test_retry_decorator)
+        ("Retry decorator", test_retry_decorator),
+        ("Scraping concurrente", test_concurrent_scraping),
+        ("Sesión HTTP", test_http_session_reuse),
+        ("Caché HTTP", test_conditional_get_cache),
+        ("Caché LLM", test_llm_cache),
+        ("Clasificación por lotes", test_batched_classification),
+        ("Resúmenes en paralelo", test_parallel_summarization),
+        ("Reducción de HTML", test_html_reduction),
+        ("Extracción por fragmentos", test_chunked_extraction),
+        ("Paginación", test_pagination_crawler),
+        ("Extractores locales", test_local_extractors),
+        ("Plantillas aprendidas", test_learned_templates),
+        ("Feeds y sitemaps", test_feed_sources),
+        ("Pipeline en streaming", test_streaming_pipeline),
+        ("Agrupado de embeds", test_discord_batching),
+        ("Rate limit de Discord", test_discord_rate_limiter),
+        ("Outbox de notificaciones", test_notification_outbox),
+        ("Canales de notificación", test_channel_fanout),
+        ("Casi duplicados", test_near_duplicates),
+        ("Prefiltro de relevancia", test_relevance_prefilter),
+        ("Reglas de clasificación", test_rule_classifier),
+        ("Planificador de portales", test_portal_scheduler),
+        ("Cortacircuitos por host", test_circuit_breaker),
+        ("Políticas de reintento", test_retry_policies)
     ]
     
     results = []
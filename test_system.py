@@ -67,6 +67,7 @@ def test_database():
         logger.info(f"✅ Estadísticas: {stats}")
         
         # Limpiar
+        agents.database.close_db()
         if os.path.exists(test_db):
             os.remove(test_db)
         
@@ -0,0 +1,232 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# Estado de los cortacircuitos y latencias por host, independiente de la caché HTTP
+CIRCUIT_STATE_FILE = os.getenv("CIRCUIT_STATE_FILE", "circuit_state.db")
+
+# Llamadas fallidas seguidas (error de red, timeout o 5xx tras los reintentos) que abren el circuito de un host
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "3"))
+# Segundos que un circuito permanece abierto antes de dejar pasar una petición de prueba
+CIRCUIT_COOLDOWN_SECONDS = float(os.getenv("CIRCUIT_COOLDOWN_SECONDS", "3600"))
+# Límites del timeout adaptativo por host: percentil de latencia observada × factor
+HTTP_TIMEOUT_MIN = float(os.getenv("HTTP_TIMEOUT_MIN", "5"))
+HTTP_TIMEOUT_MAX = float(os.getenv("HTTP_TIMEOUT_MAX", "20"))
+HTTP_TIMEOUT_PERCENTILE = float(os.getenv("HTTP_TIMEOUT_PERCENTILE", "95"))
+HTTP_TIMEOUT_FACTOR = float(os.getenv("HTTP_TIMEOUT_FACTOR", "3"))
+# Segundos de la ejecución en los que se pueden lanzar descargas (0 = sin límite)
+RUN_DEADLINE_SECONDS = float(os.getenv("RUN_DEADLINE_SECONDS", "1200"))
+# Latencias recordadas por host y mínimo para calcular el percentil
+LATENCY_SAMPLES = 50
+LATENCY_MIN_SAMPLES = 5
+
+class RequestSkipped(Exception):
+    """Petición no realizada: no cuenta como fallo del portal ni se reintenta."""
+
+class CircuitOpenError(RequestSkipped):
+    """El circuito del host está abierto tras varios fallos seguidos."""
+
+class DeadlineExceeded(RequestSkipped):
+    """Se agotó el tiempo de la ejecución (RUN_DEADLINE_SECONDS)."""
+
+def percentile(values: List[float], q: float) -> float:
+    """Percentil q (0-100) con interpolación lineal."""
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+class HostCircuit:
+    """
+    Cortacircuitos y latencias de un host.
+
+    - Cerrado: las peticiones pasan; CIRCUIT_FAILURE_THRESHOLD fallos seguidos
+      lo abren durante CIRCUIT_COOLDOWN_SECONDS
+    - Abierto: las peticiones se rechazan sin tocar la red
+    - Semiabierto (pasada la espera): una sola petición de prueba; si funciona
+      el circuito se cierra y si falla vuelve a abrirse
+
+    La hora de reapertura es absoluta para que el estado sirva entre ejecuciones.
+    """
+
+    def __init__(self, host: str, failures: int = 0, open_until: Optional[float] = None, latencies: Optional[List[float]] = None):
+        self.host = host
+        self.failures = failures
+        self.open_until = open_until
+        self.latencies = list(latencies or [])[-LATENCY_SAMPLES:]
+        self.probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.open_until is None:
+            return "cerrado"
+        return "abierto" if time.time() < self.open_until else "semiabierto"
+
+    def before_request(self) -> None:
+        """Lanza CircuitOpenError si el host no admite peticiones ahora."""
+        with self._lock:
+            if self.open_until is None:
+                return
+            if time.time() < self.open_until:
+                raise CircuitOpenError(
+                    f"circuito abierto para {self.host} hasta {time.strftime('%H:%M', time.localtime(self.open_until))}"
+                )
+            if self.probing:
+                raise CircuitOpenError(f"circuito semiabierto para {self.host}: petición de prueba en curso")
+            self.probing = True
+            logger.info(f"🔌 {self.host}: circuito semiabierto, petición de prueba")
+
+    def timeout(self) -> float:
+        """Percentil HTTP_TIMEOUT_PERCENTILE de las latencias × HTTP_TIMEOUT_FACTOR, entre los límites."""
+        if len(self.latencies) < LATENCY_MIN_SAMPLES:
+            return HTTP_TIMEOUT_MAX
+        observed = percentile(self.latencies, HTTP_TIMEOUT_PERCENTILE) * HTTP_TIMEOUT_FACTOR
+        return min(HTTP_TIMEOUT_MAX, max(HTTP_TIMEOUT_MIN, observed))
+
+    def record_success(self, latency: float) -> None:
+        with self._lock:
+            if self.open_until is not None:
+                logger.info(f"🔌 {self.host}: circuito cerrado")
+            self.failures = 0
+            self.open_until = None
+            self.probing = False
+            self.latencies = (self.latencies + [latency])[-LATENCY_SAMPLES:]
+
+    def release(self) -> None:
+        """Libera la petición de prueba si al final no se hizo (p.ej. sin tiempo)."""
+        with self._lock:
+            self.probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.probing or self.failures >= CIRCUIT_FAILURE_THRESHOLD:
+                self.open_until = time.time() + CIRCUIT_COOLDOWN_SECONDS
+                logger.warning(
+                    f"🔌 {self.host}: circuito abierto tras {self.failures} fallos seguidos, "
+                    f"sin peticiones durante {CIRCUIT_COOLDOWN_SECONDS / 60:.0f} min"
+                )
+            self.probing = False
+
+_circuits: Optional[Dict[str, HostCircuit]] = None
+_circuits_lock = threading.Lock()
+_deadline: Optional[float] = None
+
+def host_of(url: str) -> str:
+    return urlparse(url).netloc.lower()
+
+@contextmanager
+def get_state_connection():
+    """Context manager para conexiones a la base de estado de los hosts."""
+    conn = None
+    try:
+        conn = sqlite3.connect(CIRCUIT_STATE_FILE, timeout=30.0)
+        conn.row_factory = sqlite3.Row
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS estado_hosts (
+            host TEXT PRIMARY KEY,
+            fallos_seguidos INTEGER DEFAULT 0,
+            abierto_hasta REAL,
+            latencias TEXT,
+            actualizado TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """)
+        yield conn
+    except sqlite3.Error as e:
+        if conn:
+            conn.rollback()
+        logger.error(f"Error en el estado de los hosts: {e}")
+        raise
+    finally:
+        if conn:
+            conn.close()
+
+def load_circuits() -> Dict[str, HostCircuit]:
+    """Estado de los hosts guardado por ejecuciones anteriores."""
+    if not os.path.exists(CIRCUIT_STATE_FILE):
+        return {}
+    try:
+        with get_state_connection() as conn:
+            rows = conn.execute("SELECT host, fallos_seguidos, abierto_hasta, latencias FROM estado_hosts").fetchall()
+    except Exception as e:
+        logger.error(f"Error leyendo el estado de los hosts: {e}")
+        return {}
+    return {
+        row["host"]: HostCircuit(row["host"], row["fallos_seguidos"], row["abierto_hasta"], json.loads(row["latencias"] or "[]"))
+        for row in rows
+    }
+
+def get_circuit(url: str) -> HostCircuit:
+    """Circuito del host de una URL; el estado guardado se carga la primera vez."""
+    global _circuits
+    host = host_of(url)
+    with _circuits_lock:
+        if _circuits is None:
+            _circuits = load_circuits()
+        if host not in _circuits:
+            _circuits[host] = HostCircuit(host)
+        return _circuits[host]
+
+def save_circuits() -> None:
+    """Guarda el estado de los hosts usados en esta ejecución."""
+    with _circuits_lock:
+        circuits = list((_circuits or {}).values())
+    if not circuits:
+        return
+    try:
+        with get_state_connection() as conn:
+            conn.executemany(
+                """
+                INSERT OR REPLACE INTO estado_hosts (host, fallos_seguidos, abierto_hasta, latencias, actualizado)
+                VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+                """,
+                [(c.host, c.failures, c.open_until, json.dumps([round(l, 3) for l in c.latencies])) for c in circuits]
+            )
+            conn.commit()
+        abiertos = [c.host for c in circuits if c.open_until is not None]
+        if abiertos:
+            logger.info(f"🔌 Circuitos abiertos: {', '.join(abiertos)}")
+    except Exception as e:
+        logger.error(f"Error guardando el estado de los hosts: {e}")
+
+def reset_circuits() -> None:
+    """Olvida el estado en memoria (se volverá a cargar de CIRCUIT_STATE_FILE)."""
+    global _circuits
+    with _circuits_lock:
+        _circuits = None
+
+def start_run_deadline(seconds: Optional[float] = None) -> None:
+    """Fija el límite de la ejecución a partir de ahora (0 lo desactiva)."""
+    global _deadline
+    seconds = RUN_DEADLINE_SECONDS if seconds is None else seconds
+    _deadline = time.monotonic() + seconds if seconds > 0 else None
+
+def remaining_time() -> Optional[float]:
+    """Segundos que quedan hasta el límite de la ejecución, o None si no hay límite."""
+    return None if _deadline is None else _deadline - time.monotonic()
+
+def request_timeout(circuit: HostCircuit, timeout: Optional[float] = None) -> float:
+    """
+    Timeout de una petición: el indicado o el adaptativo del host, recortado
+    al tiempo que le queda a la ejecución.
+
+    Raises:
+        DeadlineExceeded: si ya no queda tiempo
+    """
+    timeout = circuit.timeout() if timeout is None else timeout
+    remaining = remaining_time()
+    if remaining is not None:
+        if remaining <= 0:
+            raise DeadlineExceeded(f"límite de la ejecución alcanzado, no se descarga {circuit.host}")
+        timeout = min(timeout, remaining)
+    return timeout
@@ -0,0 +1,188 @@
+import re
+import html
+import zlib
+import itertools
+import logging
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Iterable, Iterator, Optional
+from urllib.parse import urljoin, urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Elementos que representan una entrada: RSS (item), Atom (entry),
+# sitemap (url) e índice de sitemaps (sitemap)
+ENTRY_TAGS = {"item", "entry", "url", "sitemap"}
+DATE_TAGS = ("lastmod", "updated", "published", "pubDate", "date", "publication_date")
+SUMMARY_TAGS = ("description", "summary", "content")
+# Extensiones de sitemap cuyos títulos no son los de la página
+IGNORED_SUBTREES = {"image", "video"}
+
+MAX_SUMMARY_CHARS = 500
+# Firma de un flujo gzip
+GZIP_MAGIC = b"\x1f\x8b"
+
+def _local(tag: Any) -> str:
+    """Nombre de una etiqueta sin el espacio de nombres."""
+    return tag.rsplit("}", 1)[-1] if isinstance(tag, str) else ""
+
+def _clean(text: Optional[str]) -> str:
+    """Texto plano de un campo que puede traer HTML escapado."""
+    if not text:
+        return ""
+    text = html.unescape(re.sub(r"<[^>]+>", " ", html.unescape(text)))
+    return " ".join(text.split())
+
+def parse_date(value: Optional[str]) -> Optional[datetime]:
+    """
+    Convierte una fecha RFC 822 (RSS) o ISO 8601 (Atom, sitemaps) a datetime UTC.
+
+    Las fechas sin zona horaria se consideran UTC. Devuelve None si no se
+    reconoce el formato.
+    """
+    if not value or not value.strip():
+        return None
+    value = value.strip()
+
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        try:
+            parsed = parsedate_to_datetime(value)
+        except (TypeError, ValueError, IndexError):
+            logger.debug(f"Fecha no reconocida: {value}")
+            return None
+
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+def title_from_url(url: str) -> str:
+    """Título legible a partir del último segmento de la ruta (para sitemaps)."""
+    segments = [s for s in urlsplit(url).path.split("/") if s]
+    if not segments:
+        return url
+    slug = re.sub(r"\.\w+$", "", segments[-1])
+    words = re.sub(r"[-_+]+", " ", slug).strip()
+    return words[:1].upper() + words[1:] if words else url
+
+def _entry_link(element: ET.Element, base_url: str) -> str:
+    kind = _local(element.tag)
+    for child in element:
+        name = _local(child.tag)
+        if kind in ("url", "sitemap") and name == "loc" and child.text:
+            return urljoin(base_url, child.text.strip())
+        if name == "link":
+            # Atom: <link rel="alternate" href="..."/>; RSS: <link>url</link>
+            if child.get("href") and child.get("rel", "alternate") == "alternate":
+                return urljoin(base_url, child.get("href").strip())
+            if child.text and child.text.strip():
+                return urljoin(base_url, child.text.strip())
+
+    for child in element:
+        if _local(child.tag) == "guid" and child.get("isPermaLink", "true") != "false":
+            guid = (child.text or "").strip()
+            if guid.startswith(("http://", "https://")):
+                return guid
+    return ""
+
+def _entry_from_element(element: ET.Element, base_url: str) -> Optional[Dict[str, Any]]:
+    """Convierte un elemento de entrada en un diccionario de convocatoria."""
+    url = _entry_link(element, base_url)
+    if not url:
+        # p.ej. <image><url> del canal RSS, que no es una entrada
+        return None
+
+    ignored = set()
+    for child in element:
+        if _local(child.tag) in IGNORED_SUBTREES:
+            ignored.update(id(e) for e in child.iter())
+
+    fields: Dict[str, str] = {}
+    for child in element.iter():
+        name = _local(child.tag)
+        if child is element or id(child) in ignored or name in fields:
+            continue
+        if (child.text or "").strip():
+            fields[name] = child.text
+
+    lastmod = None
+    for name in DATE_TAGS:
+        lastmod = parse_date(fields.get(name))
+        if lastmod:
+            break
+
+    resumen = ""
+    for name in SUMMARY_TAGS:
+        resumen = _clean(fields.get(name))
+        if resumen:
+            break
+
+    kind = _local(element.tag)
+    return {
+        "titulo": _clean(fields.get("title")) or title_from_url(url),
+        "url": url,
+        "resumen": resumen[:MAX_SUMMARY_CHARS],
+        "lastmod": lastmod,
+        "sitemap": kind == "sitemap"
+    }
+
+def gunzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Descomprime en streaming un sitemap .xml.gz."""
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = decompressor.decompress(chunk)
+        if data:
+            yield data
+    tail = decompressor.flush()
+    if tail:
+        yield tail
+
+def gunzip_if_compressed(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """
+    Descomprime en streaming solo si el cuerpo empieza por la firma gzip.
+
+    Un .xml.gz servido con Content-Encoding: gzip llega ya descomprimido
+    por requests, así que la extensión de la URL no basta.
+    """
+    chunks = iter(chunks)
+    head = b""
+    for chunk in chunks:
+        head += chunk
+        if len(head) >= len(GZIP_MAGIC):
+            break
+    body = itertools.chain([head], chunks)
+    if head.startswith(GZIP_MAGIC):
+        yield from gunzip_chunks(body)
+    else:
+        yield from body
+
+def iter_feed_entries(chunks: Iterable[bytes], base_url: str) -> Iterator[Dict[str, Any]]:
+    """
+    Recorre en streaming las entradas de un feed RSS/Atom o de un sitemap.
+
+    El XML se procesa por fragmentos a medida que llega y cada entrada se
+    libera tras leerla, así que la memoria no crece con el tamaño del
+    documento. El formato se detecta por las etiquetas, no por configuración.
+
+    Yields:
+        Diccionarios con titulo, url, resumen, lastmod (datetime UTC o None)
+        y sitemap (True si la entrada apunta a otro sitemap de un índice)
+    """
+    parser = ET.XMLPullParser(events=("end",))
+
+    def drain() -> Iterator[Dict[str, Any]]:
+        for _, element in parser.read_events():
+            if _local(element.tag) not in ENTRY_TAGS:
+                continue
+            entry = _entry_from_element(element, base_url)
+            element.clear()
+            if entry:
+                yield entry
+
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from drain()
+    parser.close()
+    yield from drain()
@@ -0,0 +1,183 @@
+import re
+import logging
+from html.parser import HTMLParser
+from typing import Iterable, List, Optional
+from urllib.parse import urljoin
+
+logger = logging.getLogger(__name__)
+
+# Elementos cuyo contenido nunca aporta convocatorias
+SKIP_TAGS = {"head", "script", "style", "noscript", "template", "svg", "canvas", "iframe", "nav", "footer", "aside", "select"}
+SKIP_ROLES = {"navigation", "contentinfo", "search", "banner"}
+
+# Elementos que inician una nueva línea en el texto reducido
+BLOCK_TAGS = {
+    "p", "div", "li", "ul", "ol", "tr", "table", "section", "article", "main", "header",
+    "h1", "h2", "h3", "h4", "h5", "h6", "dt", "dd", "dl", "br", "hr", "blockquote", "figure", "figcaption"
+}
+HEADING_TAGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+IGNORED_HREF_PREFIXES = ("#", "javascript:", "mailto:", "tel:")
+
+class HTMLReducer(HTMLParser):
+    """
+    Convierte HTML en texto compacto conservando los enlaces.
+
+    Procesa el documento en streaming (feed por fragmentos) y descarta
+    scripts, estilos, navegación y pies de página. Cada bloque queda en una
+    línea y los enlaces se escriben como [texto](url absoluta), de modo que
+    el LLM ve cada enlace junto al texto que lo rodea.
+    """
+
+    def __init__(self, base_url: str):
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.lines: List[str] = []
+        self._current: List[str] = []
+        self._skip_tag: Optional[str] = None
+        self._skip_depth = 0
+        self._link_href: Optional[str] = None
+        self._link_text: List[str] = []
+        self._heading = False
+
+    def handle_starttag(self, tag, attrs):
+        if self._skip_tag:
+            if tag == self._skip_tag:
+                self._skip_depth += 1
+            return
+
+        attributes = dict(attrs)
+        if tag in SKIP_TAGS or (attributes.get("role") or "").lower() in SKIP_ROLES:
+            if tag not in VOID_TAGS:
+                self._skip_tag = tag
+                self._skip_depth = 1
+            return
+
+        if tag in BLOCK_TAGS:
+            self._break_line()
+        if tag in HEADING_TAGS:
+            self._heading = True
+
+        if tag == "a":
+            href = (attributes.get("href") or "").strip()
+            if href and not href.lower().startswith(IGNORED_HREF_PREFIXES):
+                self._link_href = urljoin(self.base_url, href)
+                self._link_text = []
+
+    def handle_endtag(self, tag):
+        if self._skip_tag:
+            if tag == self._skip_tag:
+                self._skip_depth -= 1
+                if self._skip_depth == 0:
+                    self._skip_tag = None
+            return
+
+        if tag == "a" and self._link_href:
+            text = " ".join("".join(self._link_text).split())
+            if text:
+                self._current.append(f" [{text}]({self._link_href}) ")
+            self._link_href = None
+            self._link_text = []
+        elif tag in BLOCK_TAGS:
+            self._break_line()
+
+    def handle_data(self, data):
+        if self._skip_tag:
+            return
+        if self._link_href:
+            self._link_text.append(data)
+        else:
+            self._current.append(data)
+
+    def _break_line(self):
+        line = " ".join("".join(self._current).split())
+        self._current = []
+        if line:
+            if self._heading:
+                line = f"## {line}"
+            # Evitar repetir líneas idénticas consecutivas (menús duplicados, etc.)
+            if not self.lines or self.lines[-1] != line:
+                self.lines.append(line)
+        self._heading = False
+
+    def get_text(self) -> str:
+        self._break_line()
+        return "\n".join(self.lines)
+
+def reduce_html_stream(chunks: Iterable[str], base_url: str) -> str:
+    """Reduce HTML recibido por fragmentos a texto compacto con enlaces."""
+    reducer = HTMLReducer(base_url)
+    for chunk in chunks:
+        reducer.feed(chunk)
+    reducer.close()
+    return reducer.get_text()
+
+def reduce_html(html_content: str, base_url: str) -> str:
+    """
+    Reduce un documento HTML a texto compacto con enlaces absolutos.
+
+    Args:
+        html_content: HTML de la página
+        base_url: URL de la página, para resolver enlaces relativos
+
+    Returns:
+        Texto con un bloque por línea y enlaces como [texto](url)
+    """
+    try:
+        return reduce_html_stream([html_content], base_url)
+    except Exception as e:
+        # HTMLParser es tolerante, pero un documento muy roto no debe tumbar el portal
+        logger.warning(f"No se pudo reducir el HTML de {base_url}: {e}")
+        return re.sub(r"\s+", " ", re.sub(r"<[^>]+>", " ", html_content)).strip()
+
+class NextLinkFinder(HTMLParser):
+    """Busca el enlace a la página siguiente de un listado paginado."""
+
+    NEXT_TEXTS = {"siguiente", "siguiente ›", "siguiente »", "next", "next ›", "next »", "›", "»", ">"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.rel_next: Optional[str] = None
+        self.text_next: Optional[str] = None
+        self._href: Optional[str] = None
+        self._text: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        attributes = dict(attrs)
+        rel = (attributes.get("rel") or "").lower().split()
+        href = attributes.get("href")
+        if tag in ("a", "link") and href and "next" in rel and not self.rel_next:
+            self.rel_next = href
+        if tag == "a" and href:
+            self._href = href
+            self._text = []
+
+    def handle_data(self, data):
+        if self._href:
+            self._text.append(data)
+
+    def handle_endtag(self, tag):
+        if tag == "a" and self._href:
+            text = " ".join("".join(self._text).split()).lower()
+            if text in self.NEXT_TEXTS and not self.text_next:
+                self.text_next = self._href
+            self._href = None
+
+def find_next_page_url(html_content: str, base_url: str) -> Optional[str]:
+    """
+    Devuelve la URL absoluta de la página siguiente, si la hay.
+
+    Prioriza rel="next" y, si no existe, un enlace con texto tipo
+    "Siguiente"/"Next".
+    """
+    finder = NextLinkFinder()
+    try:
+        finder.feed(html_content)
+        finder.close()
+    except Exception as e:
+        logger.debug(f"No se pudo analizar la paginación de {base_url}: {e}")
+    href = finder.rel_next or finder.text_next
+    if not href or href.lower().startswith(IGNORED_HREF_PREFIXES):
+        return None
+    return urljoin(base_url, href)
@@ -0,0 +1,115 @@
+import os
+import sqlite3
+import hashlib
+import logging
+from contextlib import contextmanager
+from typing import Dict, Optional
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Caché de validadores HTTP (ETag / Last-Modified / hash del cuerpo) por URL
+HTTP_CACHE_FILE = os.getenv("HTTP_CACHE_FILE", "http_cache.db")
+HTTP_CACHE_ENABLED = os.getenv("HTTP_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+
+@contextmanager
+def get_cache_connection():
+    """Context manager para conexiones a la caché HTTP."""
+    conn = None
+    try:
+        conn = sqlite3.connect(HTTP_CACHE_FILE, timeout=30.0)
+        conn.row_factory = sqlite3.Row
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS http_cache (
+            url TEXT PRIMARY KEY,
+            etag TEXT,
+            last_modified TEXT,
+            body_hash TEXT,
+            actualizado TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """)
+        yield conn
+    except sqlite3.Error as e:
+        if conn:
+            conn.rollback()
+        logger.error(f"Error de caché HTTP: {e}")
+        raise
+    finally:
+        if conn:
+            conn.close()
+
+def hash_body(content: bytes) -> str:
+    """Calcula el hash SHA-256 del cuerpo de una respuesta."""
+    return hashlib.sha256(content).hexdigest()
+
+def get_cache_entry(url: str) -> Optional[Dict[str, str]]:
+    """Devuelve los validadores guardados para una URL, si existen."""
+    if not HTTP_CACHE_ENABLED:
+        return None
+    try:
+        with get_cache_connection() as conn:
+            row = conn.execute(
+                "SELECT etag, last_modified, body_hash FROM http_cache WHERE url = ?", (url,)
+            ).fetchone()
+            return dict(row) if row else None
+    except Exception as e:
+        logger.error(f"Error leyendo caché HTTP para {url}: {e}")
+        return None
+
+def conditional_headers(entry: Optional[Dict[str, str]]) -> Dict[str, str]:
+    """Construye las cabeceras de una petición condicional a partir de una entrada."""
+    headers = {}
+    if entry:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+def mark_response(response: requests.Response, entry: Optional[Dict[str, str]]) -> requests.Response:
+    """
+    Anota en la respuesta si el contenido cambió respecto a la caché.
+
+    Añade los atributos:
+        not_modified: True si el servidor devolvió 304 o el cuerpo es idéntico
+        cache_validators: validadores a guardar con remember_response
+    """
+    if response.status_code == 304 and entry:
+        response.not_modified = True
+        response.cache_validators = entry
+        return response
+
+    body_hash = hash_body(response.content)
+    response.not_modified = bool(entry) and entry.get("body_hash") == body_hash
+    response.cache_validators = {
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "body_hash": body_hash
+    }
+    return response
+
+def remember_validators(url: str, validators: Optional[Dict[str, str]]) -> None:
+    """Guarda los validadores de una URL (ver mark_response)."""
+    if not HTTP_CACHE_ENABLED or not validators:
+        return
+    try:
+        with get_cache_connection() as conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO http_cache (url, etag, last_modified, body_hash, actualizado)
+                VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+                """,
+                (url, validators.get("etag"), validators.get("last_modified"), validators.get("body_hash"))
+            )
+            conn.commit()
+    except Exception as e:
+        logger.error(f"Error guardando caché HTTP para {url}: {e}")
+
+def remember_response(url: str, response: requests.Response) -> None:
+    """
+    Guarda los validadores de una respuesta ya procesada.
+    
+    Se llama después de procesar el contenido con éxito, para que un fallo
+    en la extracción no deje la página marcada como vista.
+    """
+    remember_validators(url, getattr(response, "cache_validators", None))
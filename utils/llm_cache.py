@@ -0,0 +1,196 @@
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+from langchain.schema import HumanMessage
+from utils.rate_limit import RateLimiter, estimate_tokens
+from utils.retry import is_transient_error, retry_with_backoff
+
+logger = logging.getLogger(__name__)
+
+# Caché persistente de respuestas del LLM (clave: modelo + hash del prompt)
+LLM_CACHE_FILE = os.getenv("LLM_CACHE_FILE", "llm_cache.db")
+LLM_CACHE_DISABLED = os.getenv("LLM_CACHE_DISABLED", "false").lower() in ("1", "true", "yes")
+LLM_CACHE_TTL_DAYS = float(os.getenv("LLM_CACHE_TTL_DAYS", "30"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "20000"))
+
+# Tokens de salida estimados por llamada, para el presupuesto de tokens por minuto
+LLM_OUTPUT_TOKENS_ESTIMATE = int(os.getenv("LLM_OUTPUT_TOKENS_ESTIMATE", "300"))
+
+# Reintentos de una llamada al modelo ante errores pasajeros (cuota, 5xx, red);
+# los modelos se crean con max_retries=1 para que no reintenten por su cuenta
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+
+# La expiración y el recorte se hacen cada cierto número de escrituras
+EVICTION_INTERVAL = 100
+
+_stats = {"hits": 0, "misses": 0, "writes": 0}
+_stats_lock = threading.Lock()
+
+@contextmanager
+def get_cache_connection():
+    """Context manager para conexiones a la caché del LLM."""
+    conn = None
+    try:
+        conn = sqlite3.connect(LLM_CACHE_FILE, timeout=30.0)
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS llm_cache (
+            clave TEXT PRIMARY KEY,
+            modelo TEXT,
+            respuesta TEXT,
+            creado REAL,
+            ultimo_acceso REAL
+        )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_acceso ON llm_cache(ultimo_acceso)")
+        yield conn
+    except sqlite3.Error as e:
+        if conn:
+            conn.rollback()
+        logger.error(f"Error de caché LLM: {e}")
+        raise
+    finally:
+        if conn:
+            conn.close()
+
+def get_model_id(llm: Any) -> str:
+    """Identifica el modelo y su configuración para la clave de caché."""
+    model = getattr(llm, "model", None) or getattr(llm, "model_name", None) or type(llm).__name__
+    temperature = getattr(llm, "temperature", None)
+    return f"{model}|t={temperature}"
+
+def make_cache_key(model_id: str, prompt: str) -> str:
+    """Clave direccionada por contenido: hash del modelo y del prompt."""
+    return hashlib.sha256(f"{model_id}\n{prompt}".encode("utf-8")).hexdigest()
+
+def _record(stat: str) -> int:
+    with _stats_lock:
+        _stats[stat] += 1
+        return _stats[stat]
+
+def _lookup(key: str) -> Any:
+    now = time.time()
+    min_created = now - LLM_CACHE_TTL_DAYS * 86400
+    with get_cache_connection() as conn:
+        row = conn.execute(
+            "SELECT respuesta FROM llm_cache WHERE clave = ? AND creado >= ?",
+            (key, min_created)
+        ).fetchone()
+        if row:
+            conn.execute("UPDATE llm_cache SET ultimo_acceso = ? WHERE clave = ?", (now, key))
+            conn.commit()
+            return row[0]
+    return None
+
+def _store(key: str, model_id: str, respuesta: str) -> None:
+    now = time.time()
+    with get_cache_connection() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO llm_cache (clave, modelo, respuesta, creado, ultimo_acceso) VALUES (?, ?, ?, ?, ?)",
+            (key, model_id, respuesta, now, now)
+        )
+        conn.commit()
+
+    if _record("writes") % EVICTION_INTERVAL == 0:
+        evict_cache()
+
+def evict_cache() -> int:
+    """
+    Elimina las entradas expiradas y recorta la caché a LLM_CACHE_MAX_ENTRIES,
+    descartando primero las de acceso más antiguo.
+
+    Returns:
+        Número de entradas eliminadas
+    """
+    try:
+        with get_cache_connection() as conn:
+            cursor = conn.execute(
+                "DELETE FROM llm_cache WHERE creado < ?",
+                (time.time() - LLM_CACHE_TTL_DAYS * 86400,)
+            )
+            removed = cursor.rowcount
+            cursor = conn.execute(
+                """
+                DELETE FROM llm_cache WHERE clave IN (
+                    SELECT clave FROM llm_cache ORDER BY ultimo_acceso DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (LLM_CACHE_MAX_ENTRIES,)
+            )
+            removed += cursor.rowcount
+            conn.commit()
+
+        if removed:
+            logger.debug(f"Caché LLM: {removed} entradas eliminadas")
+        return removed
+    except Exception as e:
+        logger.error(f"Error depurando caché LLM: {e}")
+        return 0
+
+@retry_with_backoff(max_retries=LLM_MAX_RETRIES, base_delay=1.0, retryable=is_transient_error)
+def _invoke(llm: Any, prompt: str, rate_limiter: Optional[RateLimiter]) -> str:
+    if rate_limiter:
+        rate_limiter.acquire(estimate_tokens(prompt) + LLM_OUTPUT_TOKENS_ESTIMATE)
+    return llm.invoke([HumanMessage(content=prompt)]).content
+
+def cached_llm_invoke(llm: Any, prompt: str, bypass: bool = False, rate_limiter: Optional[RateLimiter] = None) -> str:
+    """
+    Invoca el LLM con un único mensaje, reutilizando respuestas previas.
+
+    Solo es válido para prompts deterministas (temperature=0). Las respuestas
+    vacías no se guardan.
+
+    Args:
+        llm: Modelo de LangChain
+        prompt: Texto del mensaje
+        bypass: Ignorar la caché (ni se lee ni se escribe)
+        rate_limiter: Limitador a respetar antes de consultar el modelo;
+            los aciertos de caché no consumen presupuesto
+
+    Returns:
+        Contenido textual de la respuesta
+    """
+    if bypass or LLM_CACHE_DISABLED:
+        return _invoke(llm, prompt, rate_limiter)
+
+    model_id = get_model_id(llm)
+    key = make_cache_key(model_id, prompt)
+
+    try:
+        cached = _lookup(key)
+    except Exception as e:
+        logger.warning(f"Caché LLM no disponible, se consulta el modelo: {e}")
+        cached = None
+
+    if cached is not None:
+        _record("hits")
+        return cached
+
+    _record("misses")
+    respuesta = _invoke(llm, prompt, rate_limiter)
+
+    if respuesta and respuesta.strip():
+        try:
+            _store(key, model_id, respuesta)
+        except Exception as e:
+            logger.warning(f"No se pudo guardar la respuesta en la caché LLM: {e}")
+
+    return respuesta
+
+def invalidate_cached_response(llm: Any, prompt: str) -> None:
+    """Elimina la respuesta guardada para un prompt (p.ej. si no se pudo interpretar)."""
+    try:
+        with get_cache_connection() as conn:
+            conn.execute("DELETE FROM llm_cache WHERE clave = ?", (make_cache_key(get_model_id(llm), prompt),))
+            conn.commit()
+    except Exception as e:
+        logger.error(f"Error invalidando caché LLM: {e}")
+
+def get_cache_stats() -> Dict[str, int]:
+    """Devuelve los contadores de aciertos y fallos de la ejecución actual."""
+    with _stats_lock:
+        return dict(_stats)
@@ -0,0 +1,181 @@
+import os
+import time
+import logging
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, Mapping, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Relación aproximada caracteres/token para textos en español e inglés
+CHARS_PER_TOKEN = 4
+
+# Cuota por minuto de Gemini, compartida por extracción, clasificación y resúmenes
+GEMINI_RPM = int(os.getenv("GEMINI_RPM", "15"))
+GEMINI_TPM = int(os.getenv("GEMINI_TPM", "1000000"))
+
+def estimate_tokens(text: str) -> int:
+    """Estimación aproximada de tokens a partir de la longitud del texto."""
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+class RateLimiter:
+    """
+    Limitador de peticiones y tokens por minuto con ventana deslizante.
+
+    Garantiza que en ningún intervalo de `window` segundos se superen los
+    presupuestos, igual que las cuotas por minuto de Gemini. Es seguro para
+    usar desde varios hilos: acquire() bloquea solo el tiempo necesario.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: Optional[int] = None, window: float = 60.0):
+        self.requests_per_minute = max(1, int(requests_per_minute))
+        self.tokens_per_minute = int(tokens_per_minute) if tokens_per_minute else None
+        self.window = window
+        self._events: Deque[Tuple[float, int]] = deque()  # (instante, tokens)
+        self._tokens_in_window = 0
+        self._lock = threading.Lock()
+
+    def _expire(self, now: float) -> None:
+        while self._events and self._events[0][0] <= now - self.window:
+            _, tokens = self._events.popleft()
+            self._tokens_in_window -= tokens
+
+    def _wait_time(self, now: float, tokens: int) -> float:
+        wait = 0.0
+        if len(self._events) >= self.requests_per_minute:
+            # Hay que esperar a que salga de la ventana la petición que sobra
+            oldest = self._events[len(self._events) - self.requests_per_minute][0]
+            wait = oldest + self.window - now
+        if self.tokens_per_minute and self._tokens_in_window + tokens > self.tokens_per_minute:
+            excess = self._tokens_in_window + tokens - self.tokens_per_minute
+            freed = 0
+            for timestamp, event_tokens in self._events:
+                freed += event_tokens
+                if freed >= excess:
+                    wait = max(wait, timestamp + self.window - now)
+                    break
+        return wait
+
+    def acquire(self, tokens: int = 0) -> float:
+        """
+        Reserva una petición y `tokens` tokens, esperando si hace falta.
+
+        Returns:
+            Segundos esperados
+        """
+        waited = 0.0
+        if self.tokens_per_minute:
+            # Una petición mayor que el presupuesto completo no podría pasar nunca
+            tokens = min(tokens, self.tokens_per_minute)
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._expire(now)
+                wait = self._wait_time(now, tokens)
+                if wait <= 0:
+                    self._events.append((now, tokens))
+                    self._tokens_in_window += tokens
+                    return waited
+
+            logger.debug(f"Límite de tasa alcanzado, esperando {wait:.2f}s")
+            time.sleep(wait)
+            waited += wait
+
+_gemini_limiter: Optional[RateLimiter] = None
+_gemini_limiter_lock = threading.Lock()
+
+def get_gemini_rate_limiter() -> RateLimiter:
+    """Limitador único de la ejecución para la cuota de Gemini (GEMINI_RPM / GEMINI_TPM)."""
+    global _gemini_limiter
+    with _gemini_limiter_lock:
+        if _gemini_limiter is None:
+            _gemini_limiter = RateLimiter(GEMINI_RPM, GEMINI_TPM)
+        return _gemini_limiter
+
+def _header_float(headers: Mapping[str, str], name: str) -> Optional[float]:
+    try:
+        value = headers.get(name)
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+class HeaderRateLimiter:
+    """
+    Limitador guiado por las cabeceras de rate limit de Discord.
+
+    Lleva la cuenta del cubo que anuncia el servidor (X-RateLimit-Remaining
+    hasta X-RateLimit-Reset-After) y de los límites globales de las
+    respuestas 429. Mientras quedan peticiones en el cubo no espera nada;
+    cuando se agota, acquire() espera exactamente hasta el reinicio.
+    """
+
+    def __init__(self):
+        self._remaining: Optional[int] = None  # None: desconocido, se permite la petición
+        self._reset_at = 0.0
+        self._global_reset_at = 0.0
+        self._lock = threading.Lock()
+
+    def _wait_time(self, now: float) -> float:
+        wait = self._global_reset_at - now
+        if self._remaining is not None and self._remaining <= 0:
+            wait = max(wait, self._reset_at - now)
+        return wait
+
+    def acquire(self) -> float:
+        """
+        Reserva una petición del cubo, esperando al reinicio si está agotado.
+
+        Returns:
+            Segundos esperados
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if self._remaining is not None and now >= self._reset_at:
+                    # El cubo se ha reiniciado; la próxima respuesta dirá cuánto queda
+                    self._remaining = None
+                wait = self._wait_time(now)
+                if wait <= 0:
+                    if self._remaining is not None:
+                        self._remaining -= 1
+                    return waited
+
+            logger.debug(f"Cubo de rate limit agotado, esperando {wait:.2f}s")
+            time.sleep(wait)
+            waited += wait
+
+    def update(self, status_code: int, headers: Mapping[str, str], body: Optional[Dict[str, Any]] = None) -> Optional[float]:
+        """
+        Actualiza el estado del cubo con la respuesta de una petición.
+
+        Returns:
+            Segundos a esperar antes de reintentar si la respuesta fue 429, o None
+        """
+        body = body or {}
+        now = time.monotonic()
+        remaining = _header_float(headers, "X-RateLimit-Remaining")
+        reset_after = _header_float(headers, "X-RateLimit-Reset-After")
+
+        with self._lock:
+            if remaining is not None and reset_after is not None:
+                self._remaining = int(remaining)
+                self._reset_at = now + reset_after
+
+            if status_code != 429:
+                return None
+
+            retry_after = _header_float(body, "retry_after")
+            if retry_after is None:
+                retry_after = _header_float(headers, "Retry-After")
+            if retry_after is None:
+                retry_after = reset_after if reset_after is not None else 1.0
+
+            is_global = bool(body.get("global")) or str(headers.get("X-RateLimit-Global", "")).lower() == "true"
+            if is_global:
+                self._global_reset_at = max(self._global_reset_at, now + retry_after)
+            else:
+                self._remaining = 0
+                self._reset_at = max(self._reset_at, now + retry_after)
+            return retry_after
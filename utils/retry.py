@@ -1,20 +1,228 @@
+import os
 import time
+import random
+import asyncio
 import logging
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from contextlib import nullcontext
 from functools import wraps
-from typing import Any, Callable, Optional, Tuple, Type
+from typing import Any, Callable, ContextManager, Dict, Optional, Tuple, Type
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from utils import http_cache
+from utils.circuit_breaker import HostCircuit, RequestSkipped, get_circuit, remaining_time, request_timeout
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_USER_AGENT = 'Mozilla/5.0 (compatible; FundBot/1.0)'
+
+# Configuración del pool de conexiones HTTP compartido
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "20"))  # Hosts con pool en caché
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "4"))           # Conexiones keep-alive por host
+HTTP_TRANSPORT_RETRIES = int(os.getenv("HTTP_TRANSPORT_RETRIES", "1")) # Reintentos de conexión a nivel de transporte
+# Tamaños de pool específicos por host, p.ej. "ec.europa.eu=8,discord.com=2"
+HTTP_HOST_POOL_SIZES = os.getenv("HTTP_HOST_POOL_SIZES", "")
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+def parse_host_pool_sizes(value: str) -> Dict[str, int]:
+    """Convierte "host=n,host2=m" en un diccionario host -> tamaño de pool."""
+    sizes = {}
+    for item in value.split(","):
+        if "=" not in item:
+            continue
+        host, size = item.split("=", 1)
+        try:
+            sizes[host.strip().lower()] = int(size)
+        except ValueError:
+            logger.warning(f"Tamaño de pool inválido para {host.strip()}: {size}")
+    return sizes
+
+def _build_adapter(pool_maxsize: int, transport_retries: int) -> HTTPAdapter:
+    """Crea un adaptador con pool keep-alive y reintentos de transporte."""
+    # Solo se reintentan fallos de conexión: los reintentos por estado HTTP
+    # o timeouts de lectura los gestiona retry_with_backoff.
+    retries = Retry(total=transport_retries, connect=transport_retries, read=0, status=0, redirect=5)
+    return HTTPAdapter(
+        pool_connections=HTTP_POOL_CONNECTIONS,
+        pool_maxsize=pool_maxsize,
+        max_retries=retries
+    )
+
+def create_http_session(
+    pool_maxsize: Optional[int] = None,
+    transport_retries: Optional[int] = None,
+    host_pool_sizes: Optional[Dict[str, int]] = None
+) -> requests.Session:
+    """
+    Crea una sesión HTTP con conexiones persistentes.
+    
+    Args:
+        pool_maxsize: Conexiones keep-alive por host
+        transport_retries: Reintentos de conexión del adaptador
+        host_pool_sizes: Tamaños de pool específicos por host
+    
+    Returns:
+        Sesión configurada
+    """
+    pool_maxsize = HTTP_POOL_MAXSIZE if pool_maxsize is None else pool_maxsize
+    transport_retries = HTTP_TRANSPORT_RETRIES if transport_retries is None else transport_retries
+    if host_pool_sizes is None:
+        host_pool_sizes = parse_host_pool_sizes(HTTP_HOST_POOL_SIZES)
+    
+    session = requests.Session()
+    session.headers.update({
+        'User-Agent': DEFAULT_USER_AGENT,
+        'Connection': 'keep-alive'
+    })
+    
+    default_adapter = _build_adapter(pool_maxsize, transport_retries)
+    session.mount("http://", default_adapter)
+    session.mount("https://", default_adapter)
+    
+    # requests elige el prefijo montado más largo, así que estos tienen prioridad
+    for host, size in host_pool_sizes.items():
+        adapter = _build_adapter(size, transport_retries)
+        session.mount(f"http://{host}", adapter)
+        session.mount(f"https://{host}", adapter)
+    
+    return session
+
+def get_http_session() -> requests.Session:
+    """Devuelve la sesión HTTP compartida, creándola si hace falta."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = create_http_session()
+                logger.debug("Sesión HTTP compartida inicializada")
+    return _session
+
+def close_http_session() -> None:
+    """Cierra la sesión compartida y libera sus conexiones."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+# Presupuesto global de reintentos por ejecución: como mucho
+# RETRY_BUDGET_MIN + RETRY_BUDGET_RATIO × llamadas. Durante una caída del
+# proveedor las llamadas fallan una vez en lugar de multiplicar la latencia.
+RETRY_BUDGET_RATIO = float(os.getenv("RETRY_BUDGET_RATIO", "0.2"))
+RETRY_BUDGET_MIN = int(os.getenv("RETRY_BUDGET_MIN", "10"))
+# Estados HTTP que indican un fallo pasajero
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+class RetryBudget:
+    """Reintentos disponibles en la ejecución, compartidos por todas las funciones decoradas."""
+
+    def __init__(self, ratio: Optional[float] = None, minimum: Optional[int] = None):
+        self.ratio = RETRY_BUDGET_RATIO if ratio is None else ratio
+        self.minimum = RETRY_BUDGET_MIN if minimum is None else minimum
+        self.calls = 0
+        self.retries = 0
+        self.denied = 0
+        self._lock = threading.Lock()
+
+    def record_call(self) -> None:
+        with self._lock:
+            self.calls += 1
+
+    def try_spend(self) -> bool:
+        """Reserva un reintento si queda presupuesto."""
+        with self._lock:
+            if self.retries < self.minimum + self.ratio * self.calls:
+                self.retries += 1
+                return True
+            self.denied += 1
+            if self.denied == 1:
+                logger.warning(f"Presupuesto de reintentos agotado ({self.retries} reintentos en {self.calls} llamadas)")
+            return False
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"llamadas": self.calls, "reintentos": self.retries, "denegados": self.denied}
+
+_retry_budget = RetryBudget()
+
+def get_retry_budget() -> RetryBudget:
+    return _retry_budget
+
+def reset_retry_budget(ratio: Optional[float] = None, minimum: Optional[int] = None) -> RetryBudget:
+    """Empieza un presupuesto nuevo (una ejecución o una prueba)."""
+    global _retry_budget
+    _retry_budget = RetryBudget(ratio, minimum)
+    return _retry_budget
+
+def error_status(exc: BaseException) -> Optional[int]:
+    """Estado HTTP de un error de requests o de google.api_core, si lo tiene."""
+    status = getattr(getattr(exc, "response", None), "status_code", None)
+    if status is None:
+        status = getattr(exc, "code", None)
+    return int(status) if isinstance(status, int) else None
+
+def is_transient_error(exc: BaseException) -> bool:
+    """
+    Clasifica un error como pasajero (merece reintento) o definitivo.
+
+    - Con estado HTTP: solo 408, 425, 429 y 5xx (una clave inválida o un 404 no se reintentan)
+    - Errores de red y timeouts: pasajeros
+    - Errores de datos (JSON inválido, tipos, claves) y peticiones omitidas
+      por el cortacircuitos: definitivos
+    - Errores que envuelven a otro se clasifican por su causa
+    """
+    if isinstance(exc, RequestSkipped):
+        return False
+    status = error_status(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    if isinstance(exc, (ValueError, TypeError, KeyError, AttributeError)):
+        return False
+    if isinstance(exc, OSError):
+        return True
+    if exc.__cause__ is not None:
+        return is_transient_error(exc.__cause__)
+    return False
+
+def retry_after_seconds(exc: BaseException) -> Optional[float]:
+    """Espera pedida por el servidor (atributo retry_after o cabecera Retry-After, en segundos o fecha HTTP)."""
+    value = getattr(exc, "retry_after", None)
+    if value is None:
+        headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+        value = headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
 def retry_with_backoff(
     max_retries: int = 3,
     base_delay: float = 1.0,
     max_delay: float = 60.0,
     exponential_base: float = 2.0,
-    exceptions: Tuple[Type[Exception], ...] = (Exception,)
+    exceptions: Tuple[Type[Exception], ...] = (Exception,),
+    retryable: Optional[Callable[[BaseException], bool]] = None,
+    jitter: bool = True,
+    budget: Optional[RetryBudget] = None
 ):
     """
-    Decorator para reintentos con backoff exponencial.
+    Decorator para reintentos con backoff exponencial, para funciones y corrutinas.
+    
+    La espera es aleatoria entre 0 y el backoff exponencial (full jitter),
+    salvo que el error traiga Retry-After, que se respeta hasta max_delay.
+    No se reintenta si la espera supera el límite de la ejecución o si se
+    agotó el presupuesto global de reintentos.
     
     Args:
         max_retries: Número máximo de reintentos
@@ -22,28 +230,64 @@ def retry_with_backoff(
         max_delay: Delay máximo en segundos
         exponential_base: Base para el backoff exponencial
         exceptions: Tupla de excepciones que deben reintentar
+        retryable: Predicado que decide si un error capturado merece reintento
+            (p.ej. is_transient_error); por defecto, todos
+        jitter: Espera aleatoria (full jitter) en lugar de exponencial exacta
+        budget: Presupuesto de reintentos (por defecto, el global de la ejecución)
     """
+    def next_delay(func: Callable, attempt: int, error: Exception) -> Optional[float]:
+        """Espera antes del siguiente intento, o None si hay que propagar el error."""
+        if attempt == max_retries:
+            logger.error(f"Función {func.__name__} falló después de {max_retries} reintentos: {error}")
+            return None
+        if retryable is not None and not retryable(error):
+            logger.debug(f"Error no reintentable en {func.__name__}: {error}")
+            return None
+        
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            delay = min(retry_after, max_delay)
+        else:
+            delay = min(base_delay * (exponential_base ** attempt), max_delay)
+            if jitter:
+                delay = random.uniform(0, delay)
+        
+        remaining = remaining_time()
+        if remaining is not None and delay >= remaining:
+            logger.warning(f"Sin tiempo para reintentar {func.__name__}: {error}")
+            return None
+        if not (budget or _retry_budget).try_spend():
+            return None
+        
+        logger.warning(f"Intento {attempt + 1} falló para {func.__name__}: {error}. Reintentando en {delay:.2f}s")
+        return delay
+    
     def decorator(func: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs) -> Any:
+                (budget or _retry_budget).record_call()
+                for attempt in range(max_retries + 1):
+                    try:
+                        return await func(*args, **kwargs)
+                    except exceptions as e:
+                        delay = next_delay(func, attempt, e)
+                        if delay is None:
+                            raise
+                        await asyncio.sleep(delay)
+            return async_wrapper
+        
         @wraps(func)
         def wrapper(*args, **kwargs) -> Any:
-            last_exception = None
-            
+            (budget or _retry_budget).record_call()
             for attempt in range(max_retries + 1):
                 try:
                     return func(*args, **kwargs)
                 except exceptions as e:
-                    last_exception = e
-                    
-                    if attempt == max_retries:
-                        logger.error(f"Función {func.__name__} falló después de {max_retries} reintentos: {e}")
-                        raise e
-                    
-                    delay = min(base_delay * (exponential_base ** attempt), max_delay)
-                    logger.warning(f"Intento {attempt + 1} falló para {func.__name__}: {e}. Reintentando en {delay:.2f}s")
+                    delay = next_delay(func, attempt, e)
+                    if delay is None:
+                        raise
                     time.sleep(delay)
-            
-            if last_exception:
-                raise last_exception
                 
         return wrapper
     return decorator
@@ -51,28 +295,91 @@ def retry_with_backoff(
 @retry_with_backoff(
     max_retries=3,
     base_delay=2.0,
-    exceptions=(requests.RequestException, requests.Timeout, requests.ConnectionError)
+    exceptions=(requests.RequestException, requests.Timeout, requests.ConnectionError),
+    retryable=is_transient_error
 )
-def robust_http_request(url: str, timeout: int = 20, **kwargs) -> requests.Response:
+def _http_attempt(
+    url: str,
+    circuit: HostCircuit,
+    timeout: Optional[float],
+    slot: Optional[ContextManager],
+    **kwargs
+) -> requests.Response:
+    """Un intento de robust_http_request; lanza HTTPError con 4xx y 5xx."""
+    attempt_timeout = request_timeout(circuit, timeout)
+    logger.debug(f"Realizando petición HTTP a: {url} (timeout {attempt_timeout:.1f}s)")
+    with slot or nullcontext():
+        response = get_http_session().get(url, timeout=attempt_timeout, **kwargs)
+    response.raise_for_status()
+    return response
+
+def robust_http_request(
+    url: str,
+    timeout: Optional[float] = None,
+    conditional: bool = False,
+    slot: Optional[ContextManager] = None,
+    **kwargs
+) -> requests.Response:
     """
     Realiza una petición HTTP con reintentos automáticos.
     
+    Usa la sesión compartida, por lo que las conexiones a un mismo host
+    se reutilizan entre portales y reintentos. Cada host tiene un
+    cortacircuitos: con el circuito abierto, o agotado el límite de la
+    ejecución, se lanza RequestSkipped sin reintentar.
+    
+    La llamada completa, con sus reintentos, cuenta como un solo fallo o
+    éxito del host; la llamada que abre el circuito propaga su propio error.
+    La petición de prueba de un circuito semiabierto no se reintenta.
+    
     Args:
         url: URL a consultar
-        timeout: Timeout en segundos
-        **kwargs: Argumentos adicionales para requests.get
+        timeout: Timeout en segundos (por defecto, el adaptativo del host)
+        conditional: Enviar If-None-Match/If-Modified-Since desde la caché HTTP
+            y marcar la respuesta con `not_modified`
+        slot: Hueco del límite por host (p.ej. HostLimiter.for_url), ocupado
+            solo mientras dura cada intento y no durante las esperas entre
+            reintentos
+        **kwargs: Argumentos adicionales para Session.get
     
     Returns:
         Response object
     """
-    headers = kwargs.get('headers', {})
-    if 'User-Agent' not in headers:
-        headers['User-Agent'] = 'Mozilla/5.0 (compatible; FundBot/1.0)'
+    circuit = get_circuit(url)
+    request_timeout(circuit, timeout)
+    circuit.before_request()
+    
+    entry = None
+    if conditional:
+        entry = http_cache.get_cache_entry(url)
+        headers = dict(kwargs.get('headers') or {})
+        headers.update(http_cache.conditional_headers(entry))
         kwargs['headers'] = headers
     
-    logger.debug(f"Realizando petición HTTP a: {url}")
-    response = requests.get(url, timeout=timeout, **kwargs)
-    response.raise_for_status()
+    attempt = _http_attempt.__wrapped__ if circuit.probing else _http_attempt
+    try:
+        response = attempt(url, circuit, timeout, slot, **kwargs)
+    except RequestSkipped:
+        circuit.release()
+        raise
+    except requests.HTTPError as e:
+        # Un 4xx es un problema de la URL, no del host
+        status = error_status(e)
+        if status is not None and status < 500:
+            circuit.record_success(e.response.elapsed.total_seconds())
+        else:
+            circuit.record_failure()
+        raise
+    except Exception:
+        circuit.record_failure()
+        raise
+    circuit.record_success(response.elapsed.total_seconds())
+    
+    if conditional:
+        http_cache.mark_response(response, entry)
+        if response.not_modified:
+            logger.debug(f"Contenido sin cambios ({response.status_code}): {url}")
+            return response
     
     logger.debug(f"Petición exitosa: {response.status_code} - {len(response.content)} bytes")
-    return response
\ No newline at end of file
+    return response
@@ -0,0 +1,88 @@
+import re
+import hashlib
+import unicodedata
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+# Huellas de 64 bits divididas en bandas de 16 bits: dos huellas a distancia
+# de Hamming menor que el número de bandas coinciden en al menos una banda
+SIMHASH_BITS = 64
+SIMHASH_BANDS = 4
+BAND_BITS = SIMHASH_BITS // SIMHASH_BANDS
+# Textos con menos palabras significativas no reciben huella (demasiado genéricos)
+SIMHASH_MIN_TOKENS = 4
+
+MASK = (1 << SIMHASH_BITS) - 1
+BAND_MASK = (1 << BAND_BITS) - 1
+
+def tokenize(text: str) -> List[str]:
+    """Palabras en minúsculas y sin tildes, descartando las de menos de 3 caracteres."""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    return [word for word in re.findall(r"\w+", text) if len(word) > 2]
+
+def _feature_hash(feature: str) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+
+def simhash(text: str) -> Optional[int]:
+    """
+    Huella SimHash de 64 bits de un texto (título + resumen).
+
+    Las características son las palabras y los pares de palabras
+    consecutivos, ponderadas por frecuencia. Textos casi iguales producen
+    huellas a poca distancia de Hamming. Devuelve None si el texto tiene
+    menos de SIMHASH_MIN_TOKENS palabras.
+    """
+    tokens = tokenize(text)
+    if len(tokens) < SIMHASH_MIN_TOKENS:
+        return None
+
+    features = Counter(tokens)
+    features.update(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+
+    weights = [0] * SIMHASH_BITS
+    for feature, count in features.items():
+        h = _feature_hash(feature)
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += count if h >> bit & 1 else -count
+
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin((a ^ b) & MASK).count("1")
+
+def simhash_bands(fingerprint: int) -> List[Tuple[int, int]]:
+    """Pares (banda, valor) con los que se indexa una huella."""
+    return [(band, fingerprint >> (band * BAND_BITS) & BAND_MASK) for band in range(SIMHASH_BANDS)]
+
+def to_signed(fingerprint: int) -> int:
+    """Huella como entero con signo de 64 bits, el rango de INTEGER en SQLite."""
+    return fingerprint - (1 << SIMHASH_BITS) if fingerprint >> (SIMHASH_BITS - 1) else fingerprint
+
+def from_signed(value: int) -> int:
+    return value & MASK
+
+class SimHashIndex:
+    """
+    Índice en memoria de huellas por bandas.
+
+    Una búsqueda solo compara con las huellas que comparten alguna banda,
+    no con todas las indexadas.
+    """
+
+    def __init__(self):
+        self._buckets: Dict[Tuple[int, int], List[Tuple[int, Any]]] = {}
+
+    def add(self, fingerprint: int, value: Any) -> None:
+        for band in simhash_bands(fingerprint):
+            self._buckets.setdefault(band, []).append((fingerprint, value))
+
+    def find(self, fingerprint: int, max_distance: int) -> Optional[Any]:
+        """Valor de la huella indexada más cercana a `max_distance` o menos, o None."""
+        best = None
+        for band in simhash_bands(fingerprint):
+            for other, value in self._buckets.get(band, ()):
+                distance = hamming_distance(fingerprint, other)
+                if distance <= max_distance and (best is None or distance < best[0]):
+                    best = (distance, value)
+        return best[1] if best else None
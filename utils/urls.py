@@ -0,0 +1,67 @@
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# Parámetros de seguimiento que no cambian el contenido de la página. No se
+# incluye "ref": en algunos portales identifica la convocatoria (?ref=2024-017)
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "msclkid", "yclid", "igshid", "mc_cid", "mc_eid",
+    "_ga", "_gl", "_hsenc", "_hsmi", "mkt_tok", "ref_src", "trk"
+}
+TRACKING_PREFIXES = ("utm_", "pk_", "hsa_")
+# Documentos índice equivalentes al directorio que los contiene
+INDEX_PAGES = ("index.html", "index.htm", "index.php", "default.aspx")
+
+def normalize_url(url: str) -> str:
+    """
+    Normaliza una URL para comparar convocatorias.
+
+    Pasa esquema y host a minúsculas, quita el puerto por defecto, el
+    fragmento y la barra final de la ruta. La query se conserva.
+    """
+    if not url:
+        return ""
+
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((scheme, host, path, parts.query, ""))
+
+def is_tracking_param(name: str) -> bool:
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+def canonicalize_url(url: str) -> str:
+    """
+    Forma canónica de una URL para detectar la misma convocatoria publicada
+    con variantes de enlace.
+
+    Además de normalize_url, trata http y https como el mismo recurso, quita
+    el prefijo "www.", los parámetros de seguimiento (utm_*, fbclid, ...) y
+    los documentos índice, y ordena la query. No sirve para descargar la
+    página: solo como clave de comparación.
+    """
+    normalized = normalize_url(url)
+    if not normalized:
+        return ""
+
+    parts = urlsplit(normalized)
+    host = parts.netloc
+    if host.startswith("www."):
+        host = host[4:]
+
+    path = parts.path
+    if path.lower().endswith(INDEX_PAGES):
+        path = path.rsplit("/", 1)[0] or "/"
+
+    query = sorted(
+        (name, value)
+        for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not is_tracking_param(name)
+    )
+    scheme = "https" if parts.scheme in ("http", "https") else parts.scheme
+    return urlunsplit((scheme, host, path, urlencode(query), ""))